@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from starlette.responses import JSONResponse
+from config import settings
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_QUEUE_WAIT, ADMISSION_SHED
+
+class Lane:
+    """Classe de routes : budget de concurrence, priorité et attente maximale en file"""
+
+    def __init__(self, name: str, priority: int, limit: int, target_ms: float):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.target = target_ms / 1000
+        self.active = 0
+        # (heure d'arrivée, future accordée à l'admission)
+        self.waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self.last_timeout = float("-inf")
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+
+    def as_dict(self) -> Dict:
+        return {
+            "priority": self.priority,
+            "limit": self.limit,
+            "target_ms": self.target * 1000,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "shed": dict(self.shed)
+        }
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Classe d'une requête ; None pour les routes hors budget (santé, métriques, flux SSE)"""
+    if not path.startswith("/api/") or path.startswith("/api/health") or path.endswith("/stream"):
+        return None
+    if path.startswith("/api/admin/"):
+        return "admin"
+    if method == "POST" and path == "/api/social/track":
+        return "track"
+    if method == "POST" and path in ("/api/auth/login", "/api/auth/register"):
+        return "auth"
+    return "api"
+
+class AdmissionController:
+    """
+    Limitation de concurrence par classe de routes, avec délestage.
+
+    Une requête s'exécute si sa classe est sous son budget et le worker sous
+    le budget global ; sinon elle attend en file. Quand une place se libère,
+    les files sont servies par priorité : l'administration, puis les lectures
+    des tableaux de bord, puis login/register, puis le tracking. Une requête
+    dont l'attente dépasse la cible de sa classe est délestée (503 +
+    Retry-After) ; tant qu'une classe vient de délester et a encore une file,
+    les nouvelles arrivées sont refusées tout de suite plutôt que d'attendre
+    un délestage certain.
+    """
+
+    def __init__(self, lanes: List[Lane], global_limit: int, max_queue: int, retry_after: int):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self._by_priority = sorted(lanes, key=lambda lane: lane.priority)
+        self.global_limit = global_limit
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.active = 0
+
+    def _can_run(self, lane: Lane) -> bool:
+        return lane.active < lane.limit and self.active < self.global_limit
+
+    def _higher_priority_waiting(self, lane: Lane) -> bool:
+        """Une file plus prioritaire n'attend que le budget global (pas le sien)"""
+        return any(
+            other.waiters and other.active < other.limit
+            for other in self._by_priority if other.priority < lane.priority
+        )
+
+    def _grant(self, lane: Lane, waited: float):
+        lane.active += 1
+        lane.admitted += 1
+        self.active += 1
+        ADMISSION_IN_FLIGHT.labels(lane.name).inc()
+        ADMISSION_QUEUE_WAIT.labels(lane.name).observe(waited)
+
+    def _shed(self, lane: Lane, reason: str):
+        lane.shed[reason] = lane.shed.get(reason, 0) + 1
+        ADMISSION_SHED.labels(lane.name, reason).inc()
+
+    async def acquire(self, lane: Lane) -> bool:
+        """Vrai quand la requête peut s'exécuter, faux si elle est délestée"""
+        if not lane.waiters and self._can_run(lane) and not self._higher_priority_waiting(lane):
+            self._grant(lane, 0.0)
+            return True
+
+        now = time.monotonic()
+        if len(lane.waiters) >= self.max_queue:
+            self._shed(lane, "queue_full")
+            return False
+        if lane.waiters and now - lane.last_timeout < lane.target:
+            self._shed(lane, "overloaded")
+            return False
+
+        entry = (now, asyncio.get_running_loop().create_future())
+        lane.waiters.append(entry)
+        ADMISSION_QUEUED.labels(lane.name).inc()
+        try:
+            await asyncio.wait({entry[1]}, timeout=lane.target)
+        except asyncio.CancelledError:
+            # Client parti pendant l'attente : rendre la place si elle a été accordée
+            if entry[1].done():
+                self.release(lane)
+            else:
+                self._dequeue(lane, entry)
+            raise
+        if entry[1].done():
+            return True
+
+        self._dequeue(lane, entry)
+        lane.last_timeout = time.monotonic()
+        self._shed(lane, "queue_timeout")
+        return False
+
+    def _dequeue(self, lane: Lane, entry: Tuple[float, asyncio.Future]):
+        lane.waiters.remove(entry)
+        entry[1].cancel()
+        ADMISSION_QUEUED.labels(lane.name).dec()
+
+    def release(self, lane: Lane):
+        lane.active -= 1
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.labels(lane.name).dec()
+        self._wake()
+
+    def _wake(self):
+        """Attribue les places libres aux files, par ordre de priorité"""
+        now = time.monotonic()
+        for lane in self._by_priority:
+            while lane.waiters and self._can_run(lane):
+                enqueued, future = lane.waiters.popleft()
+                ADMISSION_QUEUED.labels(lane.name).dec()
+                self._grant(lane, now - enqueued)
+                future.set_result(True)
+            if self.active >= self.global_limit:
+                return
+
+    def report(self) -> Dict:
+        return {
+            "global_limit": self.global_limit,
+            "active": self.active,
+            "lanes": {name: lane.as_dict() for name, lane in self.lanes.items()}
+        }
+
+class AdmissionMiddleware:
+    """Middleware ASGI : admission par classe de routes, 503 + Retry-After si délestée"""
+
+    def __init__(self, app, controller: AdmissionController, enabled: bool = True):
+        self.app = app
+        self.controller = controller
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        lane_name = classify(scope["method"], scope["path"]) if self.enabled and scope["type"] == "http" else None
+        if lane_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.controller.lanes[lane_name]
+        if not await self.controller.acquire(lane):
+            response = JSONResponse(
+                {"detail": "Service momentanément surchargé, réessayez plus tard"},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane)
+
+admission = AdmissionController(
+    [
+        Lane("admin", 0, settings.ADMISSION_ADMIN_LIMIT, settings.ADMISSION_ADMIN_TARGET_MS),
+        Lane("api", 1, settings.ADMISSION_API_LIMIT, settings.ADMISSION_API_TARGET_MS),
+        Lane("auth", 2, settings.ADMISSION_AUTH_LIMIT, settings.ADMISSION_AUTH_TARGET_MS),
+        Lane("track", 3, settings.ADMISSION_TRACK_LIMIT, settings.ADMISSION_TRACK_TARGET_MS),
+    ],
+    global_limit=settings.ADMISSION_GLOBAL_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS
+)
@@ -0,0 +1,244 @@
+import asyncio
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, List, Optional
+from models import SocialPlatform
+from repositories import Storage
+
+# numpy est importé au premier calcul, pas au démarrage du worker
+# (voir HEAVY_MODULES dans benchmarks/startup.py). Les calculs tournent dans un
+# thread : sur toute la plateforme, ils ne doivent pas bloquer la boucle.
+
+PLATFORMS = [p.value for p in SocialPlatform]
+PERCENTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+
+def periods_ending(period: str, months: int) -> List[str]:
+    """Les `months` périodes YYYY-MM qui se terminent par `period`, dans l'ordre"""
+    year, month = int(period[:4]), int(period[5:7])
+    index = year * 12 + month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index - months + 1, index + 1)]
+
+def version_bucket(latest_update: Optional[str], resolution: int) -> Optional[int]:
+    """
+    Version grossière des données : la dernière mise à jour arrondie à
+    `resolution` secondes. Sur toute la plateforme, les stats changent à chaque
+    événement ; l'analyse est alors recalculée au plus une fois par intervalle.
+    """
+    if not latest_update:
+        return None
+    return int(datetime.fromisoformat(latest_update).timestamp() // resolution)
+
+def _percentile_key(q: float) -> str:
+    return f"p{round(q * 100)}"
+
+def _to_list(values, digits: int = 4) -> List[Optional[float]]:
+    """Tableau numpy -> liste JSON (NaN et infinis -> None)"""
+    import numpy as np
+    array = np.round(np.asarray(values, dtype=float), digits)
+    finite = np.isfinite(array)
+    return [value if ok else None for value, ok in zip(array.tolist(), finite.tolist())]
+
+# Les documents chargés ont tous les champs projetés (valeurs par défaut des
+# modèles) : une colonne s'extrait en un seul passage map/itemgetter.
+
+def _codes(records: List[Dict], field: str, index: Dict[str, int]):
+    """Colonne `field` encodée en entiers d'après `index` (-1 si inconnue)"""
+    import numpy as np
+    values = map(itemgetter(field), records)
+    return np.fromiter(map(lambda value: index.get(value, -1), values), dtype=np.int64, count=len(records))
+
+def _counts(records: List[Dict], field: str):
+    import numpy as np
+    return np.fromiter(map(itemgetter(field), records), dtype=np.float64, count=len(records))
+
+def _ratio(numerator, denominator):
+    """Division terme à terme, NaN là où le dénominateur est nul"""
+    import numpy as np
+    return np.divide(
+        numerator, denominator,
+        out=np.full(np.shape(numerator), np.nan), where=np.asarray(denominator) > 0
+    )
+
+def _sums(codes, weights, size: int):
+    """Sommes de `weights` par code (codes négatifs ignorés)"""
+    import numpy as np
+    valid = codes >= 0
+    return np.bincount(codes[valid], weights=weights[valid], minlength=size)
+
+def _percentiles(values) -> Dict[str, Optional[float]]:
+    import numpy as np
+    if not len(values):
+        return {_percentile_key(q): None for q in PERCENTILES}
+    return dict(zip(map(_percentile_key, PERCENTILES), _to_list(np.quantile(values, PERCENTILES))))
+
+# ============================================================================
+# Calculs vectorisés (synchrones)
+# ============================================================================
+
+def compute_platforms(records: List[Dict]) -> Dict:
+    """
+    Vues, clics et CTR par plateforme, part des vues, et percentiles du CTR
+    des projets (projets sans vue exclus) sur chaque plateforme.
+    """
+    import numpy as np
+    platforms = _codes(records, "platform", {p: i for i, p in enumerate(PLATFORMS)})
+    views, clicks = _counts(records, "views"), _counts(records, "clicks")
+
+    projects = _sums(platforms, np.ones_like(views), len(PLATFORMS))
+    platform_views = _sums(platforms, views, len(PLATFORMS))
+    platform_clicks = _sums(platforms, clicks, len(PLATFORMS))
+    total_views, total_clicks = int(platform_views.sum()), int(platform_clicks.sum())
+    platform_ctr = _to_list(_ratio(platform_clicks, platform_views))
+    view_share = _to_list(platform_views / total_views if total_views else platform_views * 0)
+
+    # CTR de chaque (projet, plateforme) ayant au moins une vue
+    viewed = views > 0
+    project_ctr = _ratio(clicks, views)
+
+    return {
+        "projects": len(set(map(itemgetter("project_id"), records))),
+        "total_views": total_views,
+        "total_clicks": total_clicks,
+        "ctr": round(total_clicks / total_views, 4) if total_views else None,
+        "platforms": [
+            {
+                "platform": platform,
+                "projects": int(projects[i]),
+                "views": int(platform_views[i]),
+                "clicks": int(platform_clicks[i]),
+                "ctr": platform_ctr[i],
+                "view_share": view_share[i],
+                "project_ctr": _percentiles(project_ctr[viewed & (platforms == i)])
+            }
+            for i, platform in enumerate(PLATFORMS)
+        ]
+    }
+
+def _moving_average(values, window: int):
+    """Moyenne mobile sur `window` lignes (moins au début de la série)"""
+    import numpy as np
+    cumulative = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)[:, None]
+
+def _growth(values):
+    """Croissance relative d'une ligne sur la précédente (NaN si précédente nulle)"""
+    import numpy as np
+    growth = np.full(values.shape, np.nan)
+    growth[1:] = _ratio(values[1:] - values[:-1], values[:-1])
+    return growth
+
+def compute_trends(records: List[Dict], periods: List[str], window: int) -> Dict:
+    """
+    Séries mensuelles par plateforme et au total : vues, clics, CTR, taux de
+    croissance d'un mois sur l'autre et moyennes mobiles sur `window` mois.
+    """
+    import numpy as np
+    period_codes = _codes(records, "period", {p: i for i, p in enumerate(periods)})
+    platform_codes = _codes(records, "platform", {p: i for i, p in enumerate(PLATFORMS)})
+    # Une cellule par (période, plateforme), toutes remplies d'un seul bincount
+    cells = np.where(
+        (period_codes >= 0) & (platform_codes >= 0),
+        period_codes * len(PLATFORMS) + platform_codes, -1
+    )
+    shape = (len(periods), len(PLATFORMS))
+    views = _sums(cells, _counts(records, "views"), shape[0] * shape[1]).reshape(shape)
+    clicks = _sums(cells, _counts(records, "clicks"), shape[0] * shape[1]).reshape(shape)
+    # Colonne 0 : toutes plateformes confondues
+    views = np.hstack([views.sum(axis=1, keepdims=True), views])
+    clicks = np.hstack([clicks.sum(axis=1, keepdims=True), clicks])
+
+    ctr = _ratio(clicks, views)
+    views_growth, clicks_growth = _growth(views), _growth(clicks)
+    views_average = _moving_average(views, window)
+    clicks_average = _moving_average(clicks, window)
+
+    return {
+        "periods": periods,
+        "window": window,
+        "series": {
+            name: {
+                "views": views[:, i].astype(int).tolist(),
+                "clicks": clicks[:, i].astype(int).tolist(),
+                "ctr": _to_list(ctr[:, i]),
+                "views_growth": _to_list(views_growth[:, i]),
+                "clicks_growth": _to_list(clicks_growth[:, i]),
+                "views_moving_avg": _to_list(views_average[:, i], 2),
+                "clicks_moving_avg": _to_list(clicks_average[:, i], 2)
+            }
+            for i, name in enumerate(["all"] + PLATFORMS)
+        }
+    }
+
+def compute_cohorts(projects: List[Dict], records: List[Dict], metric: str) -> Dict:
+    """
+    Percentiles d'une métrique par projet (vues, clics ou CTR, toutes
+    plateformes confondues), par cohorte de mois de création des projets.
+    """
+    import numpy as np
+    project_codes = _codes(records, "project_id", {p["id"]: i for i, p in enumerate(projects)})
+    views = _sums(project_codes, _counts(records, "views"), len(projects))
+    clicks = _sums(project_codes, _counts(records, "clicks"), len(projects))
+    values = {"views": views, "clicks": clicks, "ctr": _ratio(clicks, views)}[metric]
+
+    months = [str(p.get("created_at"))[:7] for p in projects]
+    cohorts = sorted(set(months))
+    cohort_codes = np.fromiter(map({c: i for i, c in enumerate(cohorts)}.get, months), dtype=np.int64, count=len(months))
+    # Tri par cohorte : chaque cohorte devient une tranche contiguë
+    order = np.argsort(cohort_codes, kind="stable")
+    bounds = np.searchsorted(cohort_codes[order], np.arange(len(cohorts) + 1))
+
+    result = []
+    for i, cohort in enumerate(cohorts):
+        cohort_values = values[order[bounds[i]:bounds[i + 1]]]
+        measured = cohort_values[np.isfinite(cohort_values)]
+        result.append({
+            "cohort": cohort,
+            "projects": int(bounds[i + 1] - bounds[i]),
+            "measured": len(measured),
+            "mean": _to_list([measured.mean()])[0] if len(measured) else None,
+            **_percentiles(measured)
+        })
+    return {"metric": metric, "cohorts": result}
+
+# ============================================================================
+# Chargement en bloc puis calcul
+# ============================================================================
+
+async def _counters(storage: Storage, project_ids: Optional[List[str]]) -> List[Dict]:
+    if project_ids is not None and not project_ids:
+        return []
+    return await storage.stats.list_counters(project_ids)
+
+async def platform_report(storage: Storage, project_ids: Optional[List[str]]) -> Dict:
+    records = await _counters(storage, project_ids)
+    return await asyncio.to_thread(compute_platforms, records)
+
+async def trends_report(
+    storage: Storage,
+    project_ids: Optional[List[str]],
+    periods: List[str],
+    window: int
+) -> Dict:
+    """
+    Séries lues dans les buckets mensuels du classement, cumulés par le
+    stockage : au plus une ligne par (période, plateforme).
+    """
+    records = []
+    if project_ids is None or project_ids:
+        records = await storage.leaderboard.bucket_totals(periods[0], periods[-1], project_ids)
+    return await asyncio.to_thread(compute_trends, records, periods, window)
+
+async def cohort_report(storage: Storage, projects: Optional[List[Dict]], metric: str) -> Dict:
+    """
+    `projects` : projets (id, date de création) déjà chargés pour la portée
+    d'un utilisateur, ou None pour toute la plateforme.
+    """
+    if projects is None:
+        projects = await storage.projects.list_created()
+        project_ids = None
+    else:
+        project_ids = [p["id"] for p in projects]
+    records = await _counters(storage, project_ids)
+    return await asyncio.to_thread(compute_cohorts, projects, records, metric)
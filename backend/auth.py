@@ -6,7 +6,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config import settings
 from models import User
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from timing import span
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -34,9 +34,10 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncIOMotorDatabase = None) -> User:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), users=None) -> User:
     token = credentials.credentials
-    payload = decode_token(token)
+    with span("jwt_decode"):
+        payload = decode_token(token)
     
     if payload is None:
         raise HTTPException(
@@ -53,7 +54,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_data = await db.users.find_one({"id": user_id})
+    with span("user_lookup"):
+        user_data = await users.get_by_id(user_id)
     if user_data is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
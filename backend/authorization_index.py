@@ -0,0 +1,163 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = "visual:authorizations"
+# Attente avant de se réabonner après une coupure Redis (doublée à chaque échec)
+RECONNECT_DELAY_SECONDS = 1.0
+RECONNECT_MAX_DELAY_SECONDS = 30.0
+
+class AuthorizationIndex:
+    """
+    Index en mémoire des paires (projet, plateforme) autorisées à la diffusion.
+
+    Il permet à POST /social/track d'écarter sans accès à la base les
+    événements d'un projet inconnu, jamais autorisé ou révoqué. Un ensemble
+    exact plutôt qu'un filtre de Bloom : une révocation doit retirer la paire
+    immédiatement, ce qu'un Bloom ne sait pas faire, et quelques octets par
+    projet restent modestes.
+
+    Chargé au démarrage depuis social_authorizations, puis tenu à jour par
+    authorize/revoke. Avec Redis, chaque changement est relayé aux autres
+    workers ; un rechargement complet périodique rattrape les messages perdus.
+    Sans Redis, une autorisation faite sur un autre worker n'arrive qu'au
+    rechargement suivant : `check` confirme donc chaque absence par une
+    lecture de la base. Une révocation faite ailleurs reste, elle, visible
+    au plus tard après AUTHORIZATION_INDEX_REFRESH_SECONDS.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._platforms: Dict[str, FrozenSet[str]] = {}
+        # Changements reçus pendant un rechargement, réappliqués ensuite
+        self._pending: Optional[Dict[str, FrozenSet[str]]] = None
+        self._redis: Any = None
+        self._origin = uuid.uuid4().hex
+        self.loaded = False
+        self.rejected = 0
+        self.fallback_lookups = 0
+
+    async def check(self, storage, project_id: str, platform: str) -> bool:
+        """
+        Paire autorisée ? Répond depuis l'index ; sans relais Redis, une
+        absence est vérifiée en base (autorisation faite sur un autre worker)
+        et apprise si elle existe.
+        """
+        if platform in self._platforms.get(project_id, ()):
+            return True
+        if self._redis is None:
+            self.fallback_lookups += 1
+            authorization = await storage.authorizations.get_active_for_project(project_id)
+            if authorization is not None:
+                self._apply(project_id, frozenset(authorization["platforms"]))
+                if platform in authorization["platforms"]:
+                    return True
+        self.rejected += 1
+        return False
+
+    def _apply(self, project_id: str, platforms: FrozenSet[str]):
+        if platforms:
+            self._platforms[project_id] = platforms
+        else:
+            self._platforms.pop(project_id, None)
+        if self._pending is not None:
+            self._pending[project_id] = platforms
+
+    async def update(self, project_id: str, platforms: Iterable[str]):
+        """Plateformes autorisées d'un projet (aucune = révoqué), relayées aux autres workers"""
+        platforms = frozenset(platforms)
+        self._apply(project_id, platforms)
+        if self._redis is not None:
+            message = {"origin": self._origin, "project_id": project_id, "platforms": sorted(platforms)}
+            try:
+                await self._redis.publish(REDIS_CHANNEL, json.dumps(message))
+            except Exception:
+                logger.warning("Authorization index: Redis publish failed", exc_info=True)
+
+    async def load(self, storage):
+        """Rechargement complet depuis les autorisations actives"""
+        self._pending = {}
+        try:
+            active = await storage.authorizations.all_active_platforms()
+        finally:
+            pending, self._pending = self._pending, None
+        platforms = {project_id: frozenset(p) for project_id, p in active.items() if p}
+        for project_id, changed in pending.items():
+            if changed:
+                platforms[project_id] = changed
+            else:
+                platforms.pop(project_id, None)
+        self._platforms = platforms
+        self.loaded = True
+        logger.info(f"Authorization index loaded: {len(platforms)} projects")
+
+    def _receive(self, message: Dict):
+        try:
+            data = json.loads(message["data"])
+            origin, project_id, platforms = data["origin"], data["project_id"], frozenset(data["platforms"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Authorization index: ignoring malformed relay message")
+            return
+        if origin != self._origin:
+            self._apply(project_id, platforms)
+
+    async def _reload(self, storage):
+        try:
+            await self.load(storage)
+        except Exception:
+            logger.exception("Authorization index reload failed")
+
+    async def _listen(self, storage):
+        """Relais Redis, réabonné après une coupure tant que l'index tourne"""
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(REDIS_CHANNEL)
+                delay = RECONNECT_DELAY_SECONDS
+                # Une fois abonné, un rechargement rattrape les changements publiés
+                # depuis le chargement précédent (ou pendant la coupure)
+                await self._reload(storage)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._receive(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(f"Authorization index: Redis relay lost, resubscribing in {delay:.0f}s", exc_info=True)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+
+    async def run(self, storage, redis_client: Any = None):
+        """Relais Redis (optionnel) et rechargements périodiques"""
+        self._redis = redis_client
+        listener = asyncio.create_task(self._listen(storage)) if redis_client is not None else None
+        try:
+            while True:
+                await asyncio.sleep(self.refresh_interval)
+                await self._reload(storage)
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+    def report(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "projects": len(self._platforms),
+            "pairs": sum(len(p) for p in self._platforms.values()),
+            "rejected": self.rejected,
+            "fallback_lookups": self.fallback_lookups,
+            "relay": "redis" if self._redis is not None else None
+        }
+
+authorization_index = AuthorizationIndex(settings.AUTHORIZATION_INDEX_REFRESH_SECONDS)
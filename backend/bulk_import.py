@@ -0,0 +1,284 @@
+import asyncio
+import codecs
+import json
+import tempfile
+from typing import Any, AsyncIterator, Dict, IO, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from models import Project, ProjectCreate
+from search_index import search_index
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+JSON_TYPES = ("application/json",)
+RESULT_CHUNK_BYTES = 65536
+
+class ImportAborted(Exception):
+    """Corps illisible : les éléments suivants ne peuvent plus être délimités"""
+
+# Élément décodé : (valeur, None) ou (None, message d'erreur)
+Item = Tuple[Any, Optional[str]]
+
+class NdjsonParser:
+    """Un document JSON par ligne ; une ligne invalide n'invalide qu'elle-même"""
+
+    def __init__(self, max_item_bytes: int):
+        self.max_item_bytes = max_item_bytes
+        self._buffer = ""
+
+    def _decode(self, line: str) -> Iterator[Item]:
+        if not line.strip():
+            return
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f"JSON invalide : {e}"
+
+    def _check(self, line: str):
+        # Même limite pour une ligne complète et pour la ligne en cours de
+        # réception : le résultat ne dépend pas du découpage en morceaux
+        if len(line) > self.max_item_bytes:
+            raise ImportAborted(f"Ligne de plus de {self.max_item_bytes} octets")
+
+    def feed(self, text: str) -> Iterator[Item]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._check(line)
+            yield from self._decode(line)
+        self._check(self._buffer)
+
+    def close(self) -> Iterator[Item]:
+        line, self._buffer = self._buffer, ""
+        self._check(line)
+        yield from self._decode(line)
+
+class JsonArrayParser:
+    """
+    Éléments d'un tableau JSON reçu par morceaux. Seul l'élément en cours de
+    réception est gardé en mémoire ; une erreur de syntaxe interrompt
+    l'import, la fin des éléments ne pouvant plus être repérée.
+    """
+
+    def __init__(self, max_item_bytes: int):
+        self.max_item_bytes = max_item_bytes
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        # "start" (avant "["), "value", "first" (après "["), "separator", "end"
+        self._state = "start"
+
+    def _skip_whitespace(self, pos: int) -> int:
+        while pos < len(self._buffer) and self._buffer[pos] in " \t\r\n":
+            pos += 1
+        return pos
+
+    def _parse(self, final: bool) -> Iterator[Item]:
+        pos = 0
+        try:
+            while True:
+                pos = self._skip_whitespace(pos)
+                if pos == len(self._buffer):
+                    break
+                char = self._buffer[pos]
+                if self._state == "end":
+                    raise ImportAborted("Contenu inattendu après la fin du tableau")
+                if self._state == "start":
+                    if char != "[":
+                        raise ImportAborted("Le corps doit être un tableau JSON")
+                    self._state, pos = "first", pos + 1
+                elif self._state == "separator" or (self._state == "first" and char == "]"):
+                    if char not in ",]":
+                        raise ImportAborted(f"',' ou ']' attendu (position {pos})")
+                    self._state, pos = ("value" if char == "," else "end"), pos + 1
+                else:
+                    try:
+                        value, end = self._decoder.raw_decode(self._buffer, pos)
+                    except ValueError as e:
+                        if final:
+                            raise ImportAborted(f"JSON invalide : {e}")
+                        break
+                    # Un nombre en fin de tampon peut encore se prolonger
+                    if end == len(self._buffer) and not final:
+                        break
+                    yield value, None
+                    self._state, pos = "separator", end
+        finally:
+            self._buffer = self._buffer[pos:]
+        if len(self._buffer) > self.max_item_bytes:
+            raise ImportAborted(f"Élément de plus de {self.max_item_bytes} octets")
+
+    def feed(self, text: str) -> Iterator[Item]:
+        self._buffer += text
+        yield from self._parse(final=False)
+
+    def close(self) -> Iterator[Item]:
+        yield from self._parse(final=True)
+        if self._state != "end":
+            raise ImportAborted("Tableau JSON incomplet")
+
+def create_parser(content_type: str, max_item_bytes: int):
+    """Analyseur d'après le Content-Type ; None si le format n'est pas pris en charge"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return NdjsonParser(max_item_bytes)
+    if media_type in JSON_TYPES:
+        return JsonArrayParser(max_item_bytes)
+    return None
+
+async def iter_items(chunks: AsyncIterator[bytes], parser) -> AsyncIterator[Item]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for chunk in chunks:
+            for item in parser.feed(decoder.decode(chunk)):
+                yield item
+        for item in parser.feed(decoder.decode(b"", final=True)):
+            yield item
+        for item in parser.close():
+            yield item
+    except UnicodeDecodeError:
+        raise ImportAborted("Le corps n'est pas en UTF-8")
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'élément'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+class ProjectImport:
+    """
+    Import en masse des projets d'un utilisateur.
+
+    Les éléments sont validés au fil de la lecture et insérés par lots de
+    taille fixe (insert_many non ordonné : un document refusé ne bloque pas
+    les autres). Le résultat de chaque élément est écrit en NDJSON dans un
+    fichier temporaire en mémoire, qui passe sur disque au-delà de
+    BULK_IMPORT_SPOOL_BYTES : la mémoire reste bornée quelle que soit la
+    taille de l'import. Les résultats ne sont renvoyés qu'une fois le corps
+    lu en entier ; pendant la lecture, `stream` n'envoie qu'une courte ligne
+    de progression par intervalle.
+    """
+
+    def __init__(self, storage, user_id: str):
+        self.storage = storage
+        self.user_id = user_id
+        self.batch_size = settings.BULK_IMPORT_BATCH_SIZE
+        self.max_items = settings.BULK_IMPORT_MAX_ITEMS
+        self.results: IO[bytes] = tempfile.SpooledTemporaryFile(max_size=settings.BULK_IMPORT_SPOOL_BYTES)
+        # (index, document à insérer ou None, erreur) : résultats écrits dans l'ordre
+        self._batch: List[Tuple[int, Optional[Dict], Optional[str]]] = []
+        self.received = 0
+        self.created = 0
+        self.failed = 0
+        self.aborted: Optional[str] = None
+
+    def _write(self, result: Dict):
+        self.results.write(json.dumps(result, ensure_ascii=False).encode() + b"\n")
+
+    async def _flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        docs = [doc for _, doc, _ in batch if doc is not None]
+        failed = await self.storage.projects.insert_many(docs) if docs else {}
+        position = 0
+        for index, doc, error in batch:
+            if doc is not None:
+                error = failed.get(position)
+                position += 1
+            if error is not None:
+                self.failed += 1
+                self._write({"index": index, "status": "error", "error": error})
+                continue
+            self.created += 1
+            search_index.add(doc["id"], self.user_id, doc["title"])
+            self._write({"index": index, "status": "created", "id": doc["id"]})
+        # Une version par lot : GET /projects reflète un import interrompu
+        if len(failed) < len(docs):
+            await self.storage.users.bump_projects_version(self.user_id)
+
+    def _prepare(self, value: Any) -> Dict:
+        data = ProjectCreate.model_validate(value)
+        project = Project(user_id=self.user_id, **data.model_dump())
+        project_dict = project.model_dump()
+        project_dict['created_at'] = project_dict['created_at'].isoformat()
+        project_dict['updated_at'] = project_dict['updated_at'].isoformat()
+        return project_dict
+
+    async def run(self, items: AsyncIterator[Item]):
+        """Consomme les éléments ; les lots restants sont insérés même après une erreur fatale"""
+        try:
+            async for value, error in items:
+                index = self.received
+                if index >= self.max_items:
+                    raise ImportAborted(f"Plus de {self.max_items} projets dans un même import")
+                self.received += 1
+                if error is None:
+                    try:
+                        value = self._prepare(value)
+                    except ValidationError as e:
+                        error = _validation_message(e)
+                self._batch.append((index, None if error else value, error))
+                if len(self._batch) >= self.batch_size:
+                    await self._flush()
+        except ImportAborted as e:
+            self.aborted = str(e)
+        finally:
+            await self._flush()
+
+    def summary(self) -> Dict:
+        return {
+            "received": self.received,
+            "created": self.created,
+            "failed": self.failed,
+            "aborted": self.aborted
+        }
+
+    async def stream(self, items: AsyncIterator[Item], progress_interval: float) -> AsyncIterator[bytes]:
+        """
+        Corps de la réponse : lit les éléments dans une tâche et envoie une
+        ligne {"progress": ...} toutes les `progress_interval` secondes tant
+        que la lecture dure (une réponse muette serait coupée par les proxys),
+        puis les résultats par élément et la ligne de synthèse.
+        """
+        task = asyncio.create_task(self.run(items))
+        try:
+            while not (await asyncio.wait({task}, timeout=progress_interval))[0]:
+                yield json.dumps({"progress": self.summary()}, ensure_ascii=False).encode() + b"\n"
+            task.result()
+            logger.info("Bulk import for user %s: %s", self.user_id, self.summary())
+            for chunk in self.iter_results():
+                yield chunk
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            self.results.close()
+
+    def iter_results(self) -> Iterator[bytes]:
+        """Résultats par élément puis ligne de synthèse ; ferme le fichier à la fin"""
+        try:
+            self.results.seek(0)
+            while True:
+                chunk = self.results.read(RESULT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+            yield json.dumps({"summary": self.summary()}, ensure_ascii=False).encode() + b"\n"
+        finally:
+            self.results.close()
+
+class ImportResponse(StreamingResponse):
+    """
+    StreamingResponse envoyée pendant la lecture du corps de la requête.
+    StreamingResponse écoute la déconnexion du client sur `receive`, ce qui
+    consommerait les morceaux du corps encore à lire : cette écoute est
+    retirée, une déconnexion interrompt la lecture du corps (ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,234 @@
+import json
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "visual"
+
+class MemoryBackend:
+    """Backend en mémoire du processus (repli sans Redis), LRU borné avec TTL"""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and self._get(key) is not None:
+            return False
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        return True
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def memory_usage(self, prefix: str) -> int:
+        return sum(
+            len(key) + len(value)
+            for key, (value, _) in list(self._data.items())
+            if key.startswith(prefix)
+        )
+
+    async def close(self):
+        self._data.clear()
+
+class RedisBackend:
+    """Backend Redis partagé entre les workers (redis.asyncio ou fakeredis)"""
+
+    def __init__(self, url: Optional[str] = None, client: Any = None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await self.client.mget(keys)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None, nx: bool = False) -> bool:
+        return bool(await self.client.set(key, value, ex=ttl, nx=nx))
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def memory_usage(self, prefix: str) -> int:
+        total = 0
+        async for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+            total += await self.client.memory_usage(key) or 0
+        return total
+
+    async def close(self):
+        await self.client.aclose()
+
+class NamespaceStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+        self.bytes_written = 0
+
+    def as_dict(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "sets": self.sets,
+            "errors": self.errors,
+            "bytes_written": self.bytes_written
+        }
+
+class Cache:
+    """
+    Cache applicatif à clés préfixées par namespace.
+
+    Les erreurs du backend ne sont jamais propagées : comptées par namespace
+    et loguées avec des gabarits fixes (`%s`), que HotPathFilter limite en
+    débit (LOG_RATE_LIMITS "cache=...") quand Redis est indisponible.
+
+    Chaque namespace a un jeton de version stocké dans le backend : les valeurs
+    sont étiquetées avec ce jeton et relues avec lui dans le même aller-retour
+    (MGET), si bien qu'un `invalidate(namespace)` les rend toutes obsolètes
+    pour tous les workers à la fois. Le jeton est aléatoire : même évincé par
+    la politique LRU de Redis, une ancienne version ne redevient jamais valide.
+    """
+
+    def __init__(self, backend, default_ttl: int = 60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.stats: Dict[str, NamespaceStats] = defaultdict(NamespaceStats)
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    @staticmethod
+    def _version_key(namespace: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:__version__"
+
+    async def _lookup(self, namespace: str, key: str) -> Tuple[Optional[bytes], Optional[Any]]:
+        """Retourne (version courante, valeur) ; valeur None si absente ou obsolète"""
+        stats = self.stats[namespace]
+        try:
+            version, raw = await self.backend.mget([self._version_key(namespace), self._key(namespace, key)])
+        except Exception:
+            stats.errors += 1
+            logger.warning("Cache backend error on get %s:%s", namespace, key, exc_info=True)
+            return None, None
+
+        if raw is not None and version is not None:
+            entry = json.loads(raw)
+            if entry["v"] == _as_text(version):
+                stats.hits += 1
+                return version, entry["d"]
+        stats.misses += 1
+        return version, None
+
+    async def _store(self, namespace: str, key: str, value: Any, version: Optional[bytes], ttl: Optional[int]):
+        stats = self.stats[namespace]
+        try:
+            if version is None:
+                version_key = self._version_key(namespace)
+                await self.backend.set(version_key, uuid.uuid4().hex.encode(), nx=True)
+                version = (await self.backend.mget([version_key]))[0]
+            raw = json.dumps({"v": _as_text(version), "d": value}, default=str).encode()
+            await self.backend.set(self._key(namespace, key), raw, ttl or self.default_ttl)
+        except Exception:
+            stats.errors += 1
+            logger.warning("Cache backend error on set %s:%s", namespace, key, exc_info=True)
+            return
+        stats.sets += 1
+        stats.bytes_written += len(raw)
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Retourne la valeur en cache, ou None (absente, expirée ou invalidée)"""
+        return (await self._lookup(namespace, key))[1]
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """Stocke une valeur JSON-sérialisable pour la version courante du namespace"""
+        try:
+            version = (await self.backend.mget([self._version_key(namespace)]))[0]
+        except Exception:
+            self.stats[namespace].errors += 1
+            logger.warning("Cache backend error on set %s:%s", namespace, key, exc_info=True)
+            return
+        await self._store(namespace, key, value, version, ttl)
+
+    async def get_or_set(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None) -> Any:
+        """
+        Lit la valeur en cache ou la calcule via `loader` puis la stocke.
+        La valeur est étiquetée avec la version lue *avant* le calcul : une
+        invalidation pendant le chargement n'est donc jamais masquée.
+        """
+        version, value = await self._lookup(namespace, key)
+        if value is None:
+            value = await loader()
+            await self._store(namespace, key, value, version, ttl)
+        return value
+
+    async def delete(self, namespace: str, key: str):
+        try:
+            await self.backend.delete(self._key(namespace, key))
+        except Exception:
+            self.stats[namespace].errors += 1
+            logger.warning("Cache backend error on delete %s:%s", namespace, key, exc_info=True)
+
+    async def invalidate(self, namespace: str):
+        """Invalide toutes les clés d'un namespace en changeant son jeton de version"""
+        try:
+            await self.backend.set(self._version_key(namespace), uuid.uuid4().hex.encode())
+        except Exception:
+            self.stats[namespace].errors += 1
+            logger.warning("Cache backend error on invalidate %s", namespace, exc_info=True)
+
+    async def report(self) -> Dict[str, Dict]:
+        """Statistiques par namespace (taux de hit et mémoire occupée)"""
+        report = {}
+        for namespace, stats in list(self.stats.items()):
+            report[namespace] = stats.as_dict()
+            try:
+                report[namespace]["memory_bytes"] = await self.backend.memory_usage(f"{KEY_PREFIX}:{namespace}:")
+            except Exception:
+                report[namespace]["memory_bytes"] = None
+        return report
+
+    async def close(self):
+        await self.backend.close()
+
+def _as_text(version) -> str:
+    return version.decode() if isinstance(version, bytes) else str(version)
+
+def create_cache() -> Cache:
+    """Cache Redis si REDIS_URL est configurée, sinon repli en mémoire"""
+    if settings.REDIS_URL:
+        try:
+            backend = RedisBackend(settings.REDIS_URL)
+            logger.info("Cache backend: redis")
+            return Cache(backend, settings.CACHE_DEFAULT_TTL_SECONDS)
+        except ImportError:
+            logger.warning("redis package not installed. Using in-process cache.")
+    return Cache(MemoryBackend(settings.CACHE_MEMORY_MAX_ENTRIES), settings.CACHE_DEFAULT_TTL_SECONDS)
+
+cache = create_cache()
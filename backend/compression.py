@@ -0,0 +1,210 @@
+import gzip
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Types de contenu qui gagnent à être compressés (text/event-stream exclu :
+# un flux SSE doit partir trame par trame)
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml",
+    "image/svg+xml", "text/html", "text/plain", "text/css", "text/csv",
+)
+
+def _load_brotli():
+    """Module brotli s'il est installé (dépendance optionnelle), sinon None"""
+    try:
+        import brotli
+    except ImportError:
+        logger.info("brotli not installed, responses are compressed with gzip only")
+        return None
+    return brotli
+
+def negotiate(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Encodage retenu d'après l'en-tête Accept-Encoding (valeurs q comprises).
+    À q égal, l'ordre de `available` (du préféré au moins bon) départage.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class CompressionStats:
+    def __init__(self):
+        self.responses = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "responses": self.responses,
+            "cache_hits": self.cache_hits,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0
+        }
+
+class ResponseCompressor:
+    """
+    Compression gzip/brotli des réponses, avec cache des corps précompressés.
+
+    Une réponse qui porte un ETag (leaderboard, listes de projets...) a un
+    corps déterminé par cet ETag : sa version compressée est gardée dans un
+    LRU borné en octets, indexé par (chemin, ETag, encodage). Les hits
+    suivants n'ont plus rien à compresser ; la longueur et le CRC32 du corps
+    sont vérifiés avant de resservir une entrée.
+    """
+
+    def __init__(self, minimum_size: int, gzip_level: int, brotli_quality: int, cache_max_bytes: int):
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_max_bytes = cache_max_bytes
+        self._brotli = _load_brotli()
+        self.encodings = (["br"] if self._brotli else []) + ["gzip"]
+        # (chemin, etag, encodage) -> (longueur, crc32, corps compressé)
+        self._cache: "OrderedDict[tuple[str, str, str], tuple[int, int, bytes]]" = OrderedDict()
+        self._cache_bytes = 0
+        self.stats: Dict[str, CompressionStats] = defaultdict(CompressionStats)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return self._brotli.compress(body, quality=self.brotli_quality, mode=self._brotli.MODE_TEXT)
+        # mtime=0 : sortie identique pour un même corps
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_cached(self, path: str, etag: Optional[str], body: bytes, encoding: str) -> bytes:
+        stats = self.stats[encoding]
+        if etag is None or self.cache_max_bytes <= 0:
+            return self.compress(body, encoding)
+
+        key = (path, etag, encoding)
+        checksum = zlib.crc32(body)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == len(body) and entry[1] == checksum:
+            self._cache.move_to_end(key)
+            stats.cache_hits += 1
+            return entry[2]
+
+        compressed = self.compress(body, encoding)
+        if len(compressed) <= self.cache_max_bytes:
+            if entry is not None:
+                self._cache_bytes -= len(entry[2])
+            self._cache[key] = (len(body), checksum, compressed)
+            self._cache.move_to_end(key)
+            self._cache_bytes += len(compressed)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, (_, _, evicted) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+        return compressed
+
+    def compressible(self, headers: Headers, status_code: int, size: int) -> bool:
+        if status_code != 200 or size < self.minimum_size:
+            return False
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def report(self) -> Dict:
+        return {
+            "encodings": self.encodings,
+            "minimum_size": self.minimum_size,
+            "cache": {
+                "entries": len(self._cache),
+                "bytes": self._cache_bytes,
+                "max_bytes": self.cache_max_bytes
+            },
+            "by_encoding": {encoding: stats.as_dict() for encoding, stats in self.stats.items()}
+        }
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI : compresse les réponses complètes selon Accept-Encoding.
+    Les réponses en flux (SSE, NDJSON) passent telles quelles. Une réponse
+    compressée reçoit `Vary: Accept-Encoding` et un ETag faible (W/"...") :
+    c'est une autre représentation du même contenu, que If-None-Match
+    reconnaît toujours.
+    """
+
+    def __init__(self, app, compressor: ResponseCompressor, enabled: bool = True):
+        self.app = app
+        self.compressor = compressor
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.compressor.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        streaming = False
+
+        async def send_compressed(message):
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                # Retenu jusqu'au premier bloc du corps
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            if self.compressor.compressible(headers, start_message["status"], len(body)):
+                etag = headers.get("etag")
+                compressed = self.compressor.compress_cached(scope["path"], etag, body, encoding)
+                if len(compressed) < len(body):
+                    stats = self.compressor.stats[encoding]
+                    stats.responses += 1
+                    stats.bytes_in += len(body)
+                    stats.bytes_out += len(compressed)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(compressed))
+                    headers.add_vary_header("Accept-Encoding")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+                    body = compressed
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+compressor = ResponseCompressor(
+    settings.COMPRESSION_MIN_SIZE,
+    settings.COMPRESSION_GZIP_LEVEL,
+    settings.COMPRESSION_BROTLI_QUALITY,
+    settings.COMPRESSION_CACHE_MAX_BYTES
+)
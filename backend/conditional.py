@@ -0,0 +1,43 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Optional
+from fastapi import Request, Response
+
+def make_etag(*parts: Any) -> str:
+    """ETag fort dérivé de validateurs peu coûteux (version, date de mise à jour...)"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+def body_etag(payload: Any) -> str:
+    """ETag calculé à partir du contenu d'une réponse JSON"""
+    return make_etag(json.dumps(payload, sort_keys=True, default=str))
+
+def http_date(value: Optional[str]) -> Optional[str]:
+    """Convertit une date ISO (UTC) stockée en base au format HTTP-date"""
+    if not value:
+        return None
+    return format_datetime(datetime.fromisoformat(value).replace(tzinfo=timezone.utc), usegmt=True)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match du client correspond à l'ETag courant"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    return any(c == etag or c == f"W/{etag}" for c in candidates)
+
+def set_validators(response: Response, etag: str, last_modified: Optional[str] = None, public: bool = False):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "public, no-cache" if public else "private, no-cache"
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+def not_modified(etag: str, last_modified: Optional[str] = None, public: bool = False) -> Response:
+    """Réponse 304 sans corps, avec les mêmes validateurs"""
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified, public)
+    return response
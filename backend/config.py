@@ -5,13 +5,131 @@ class Settings(BaseSettings):
     # MongoDB
     MONGO_URL: str
     DB_NAME: str
+    # "mongo" ou "memory" (tests et bancs de mesure, données non persistées)
+    STORAGE_BACKEND: str = "mongo"
     CORS_ORIGINS: str = "*"
     
+    # MongoDB - pool de connexions (préchauffé au démarrage du worker)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    # Liste séparée par des virgules : zstd, snappy, zlib (vide = sans compression)
+    MONGO_COMPRESSORS: str = ""
+    HEALTH_PING_TIMEOUT_SECONDS: float = 2.0
+    
     # JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200
     
+    # Cache (Redis partagé entre workers, repli en mémoire si absent)
+    REDIS_URL: Optional[str] = None
+    CACHE_DEFAULT_TTL_SECONDS: int = 60
+    CACHE_MEMORY_MAX_ENTRIES: int = 10000
+    CACHE_LEADERBOARD_TTL_SECONDS: int = 10
+    CACHE_STATS_TTL_SECONDS: int = 5
+    
+    # Coalescence des lectures concurrentes (0 = pas de rétention du résultat)
+    SINGLEFLIGHT_TTL_SECONDS: float = 0.0
+    
+    # Stats en direct (Server-Sent Events)
+    STATS_STREAM_INTERVAL_SECONDS: float = 1.0
+    STATS_STREAM_QUEUE_SIZE: int = 16
+    STATS_STREAM_KEEPALIVE_SECONDS: float = 15.0
+    
+    # Observabilité
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    SERVER_TIMING_ENABLED: bool = False
+    # Arbre complet des spans (X-Debug-Timing) : expose la structure interne
+    SERVER_TIMING_DEBUG_ENABLED: bool = False
+    
+    # Compression des réponses (gzip, et brotli si le module est installé)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Corps précompressés des réponses à ETag (0 = pas de cache)
+    COMPRESSION_CACHE_MAX_BYTES: int = 8388608
+    
+    # Logs : file non bloquante, JSON, échantillonnage par logger
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" ou "text"
+    LOG_QUEUE_SIZE: int = 10000
+    # "logger=taux,..." : fraction des messages gardés (ex: "leaderboard=0.1")
+    LOG_SAMPLE_RATES: str = ""
+    # "logger=messages/s,..." : débit maximal par gabarit de message
+    # (cache : une panne Redis se loguerait à chaque requête)
+    LOG_RATE_LIMITS: str = "social_service=1,cache=1"
+    
+    # Journal des requêtes lentes
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_LOG_SIZE: int = 500
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    
+    # Profileur statistique à la demande
+    PROFILER_OUTPUT_DIR: str = "/tmp/visual-profiles"
+    PROFILER_INTERVAL_SECONDS: float = 0.005
+    PROFILER_MAX_SECONDS: int = 300
+    
+    # Admission : budgets de concurrence par classe de routes et délestage (503)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_GLOBAL_LIMIT: int = 256
+    ADMISSION_MAX_QUEUE: int = 512
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # Par classe : requêtes simultanées et attente maximale en file (ms)
+    ADMISSION_ADMIN_LIMIT: int = 16
+    ADMISSION_ADMIN_TARGET_MS: float = 2000.0
+    ADMISSION_API_LIMIT: int = 128
+    ADMISSION_API_TARGET_MS: float = 500.0
+    ADMISSION_AUTH_LIMIT: int = 8
+    ADMISSION_AUTH_TARGET_MS: float = 1000.0
+    ADMISSION_TRACK_LIMIT: int = 64
+    ADMISSION_TRACK_TARGET_MS: float = 100.0
+    
+    # Idempotency-Key : durée de conservation des réponses rejouables
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    # Réservation d'une clé pendant la première exécution (reprise si dépassée)
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0
+    # Attente maximale d'un doublon dont la première requête tourne sur un autre worker
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_FRONT_MAX_ENTRIES: int = 10000
+    
+    # Recherche de projets : TTL des pages (portée plateforme) et rechargement
+    # de l'index d'autocomplétion (projets créés par les autres workers)
+    SEARCH_CACHE_TTL_SECONDS: int = 30
+    SEARCH_INDEX_REFRESH_SECONDS: float = 300.0
+    
+    # Import de projets en masse (POST /projects/bulk)
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    BULK_IMPORT_MAX_ITEMS: int = 50000
+    BULK_IMPORT_MAX_ITEM_BYTES: int = 65536
+    # Résultats par projet gardés en mémoire jusqu'à cette taille, puis sur disque
+    BULK_IMPORT_SPOOL_BYTES: int = 1048576
+    # Ligne de progression envoyée à cet intervalle pendant la lecture du corps
+    BULK_IMPORT_PROGRESS_SECONDS: float = 10.0
+    
+    # Index en mémoire des paires (projet, plateforme) autorisées au tracking
+    AUTHORIZATION_INDEX_REFRESH_SECONDS: float = 300.0
+    
+    # Limitation de POST /social/track par (IP cliente, projet) ; 0 = désactivée
+    TRACK_RATE_LIMIT_EVENTS: int = 30
+    TRACK_RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    TRACK_RATE_LIMIT_MAX_KEYS: int = 100000
+    # Fenêtre partagée entre workers via Redis (si REDIS_URL est configurée)
+    TRACK_RATE_LIMIT_SHARED: bool = True
+    
+    # Analytics (résultats mis en cache par version des données)
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300
+    # Portée plateforme : recalcul au plus une fois par intervalle
+    ANALYTICS_PLATFORM_REFRESH_SECONDS: int = 60
+    
+    # Leaderboard
+    LEADERBOARD_CLOSE_INTERVAL_SECONDS: int = 3600
+    
     # YouTube
     YOUTUBE_API_KEY: Optional[str] = None
     YOUTUBE_CLIENT_ID: Optional[str] = None
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import Dict, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import settings
+from metrics import mongo_listeners
+from query_log import slow_query_log
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    """Client MongoDB configuré depuis les settings (pool, timeouts, compression)"""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if settings.MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = settings.MONGO_SOCKET_TIMEOUT_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    compressors = [c.strip() for c in settings.MONGO_COMPRESSORS.split(",") if c.strip()]
+    if compressors:
+        options["compressors"] = compressors
+
+    return AsyncIOMotorClient(
+        settings.MONGO_URL,
+        event_listeners=mongo_listeners() + [slow_query_log],
+        **options
+    )
+
+async def ping(client: AsyncIOMotorClient) -> float:
+    """Aller-retour d'un ping MongoDB, en millisecondes"""
+    start = time.perf_counter()
+    await client.admin.command("ping")
+    return (time.perf_counter() - start) * 1000
+
+async def warm_up(client: AsyncIOMotorClient, connections: int) -> List[float]:
+    """
+    Ouvre `connections` connexions du pool avant de servir du trafic.
+    Des pings simultanés obligent le driver à établir autant de connexions
+    (handshake, authentification) que de pings en vol.
+    """
+    rtts = await asyncio.gather(*(ping(client) for _ in range(max(1, connections))))
+    logger.info(
+        f"MongoDB pool warmed up: {len(rtts)} connections, "
+        f"ping max {max(rtts):.1f} ms"
+    )
+    return list(rtts)
+
+async def mongo_status(client: AsyncIOMotorClient, timeout: float) -> Dict:
+    """État de MongoDB pour les sondes de santé (jamais d'exception)"""
+    try:
+        rtt = await asyncio.wait_for(ping(client), timeout)
+    except Exception as e:
+        return {"ok": False, "rtt_ms": None, "error": type(e).__name__}
+    return {"ok": True, "rtt_ms": round(rtt, 2)}
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from config import settings
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Intervalle de relecture d'une clé réservée par un autre worker
+POLL_INTERVAL_SECONDS = 0.05
+
+async def request_fingerprint(request: Request) -> str:
+    """Empreinte de la requête (méthode, chemin, paramètres, corps)"""
+    digest = hashlib.sha256()
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+class IdempotencyStats:
+    def __init__(self):
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+        self.front_hits = 0
+        self.mismatched = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "front_hits": self.front_hits,
+            "mismatched": self.mismatched
+        }
+
+class IdempotencyGuard:
+    """
+    Rejeu des requêtes mutantes portant un en-tête Idempotency-Key.
+
+    La première requête pour un couple (utilisateur, clé) réserve la clé en
+    base, exécute la route et enregistre sa réponse ; les suivantes reçoivent
+    la réponse enregistrée sans repasser par la logique métier. Les doublons
+    concurrents du même worker attendent le résultat de la première ; ceux
+    d'un autre worker relisent la clé jusqu'à ce que la réponse soit
+    enregistrée. Une réponse terminée est aussi gardée dans un LRU en mémoire
+    du worker.
+
+    Seules les réponses réussies sont enregistrées : après une erreur, la clé
+    est libérée et la requête peut être retentée. Une clé réutilisée pour
+    une autre requête (chemin, paramètres ou corps différents) est refusée.
+    """
+
+    def __init__(self, ttl: int, lock_seconds: float, wait_seconds: float, front_max_entries: int):
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.front_max_entries = front_max_entries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # (utilisateur, clé) -> (enregistrement, expiration monotonic)
+        self._front: "OrderedDict[Hashable, Tuple[Dict, float]]" = OrderedDict()
+        self.stats = IdempotencyStats()
+
+    async def run(self, request: Request, storage, user_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute `fn` une seule fois par clé ; sans en-tête, l'exécute simplement"""
+        key = request.headers.get(HEADER)
+        if key is None:
+            return await fn()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"En-tête {HEADER} invalide (1 à {MAX_KEY_LENGTH} caractères)"
+            )
+
+        fingerprint = await request_fingerprint(request)
+        scope = (user_id, key)
+        record = self._front_get(scope)
+        if record is not None:
+            self.stats.front_hits += 1
+            return self._replay(record, fingerprint)
+
+        leader = False
+        task = self._inflight.get(scope)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            # Exécution dans sa propre tâche : un client qui abandonne n'interrompt
+            # ni l'enregistrement de la réponse ni les doublons qui l'attendent
+            leader = True
+            task = asyncio.ensure_future(self._execute(storage, user_id, key, fingerprint, fn))
+            self._inflight[scope] = task
+            task.add_done_callback(lambda t: self._inflight.pop(scope, None))
+
+        record, result, executed = await asyncio.shield(task)
+        if leader and executed:
+            return result
+        return self._replay(record, fingerprint)
+
+    async def _execute(self, storage, user_id: str, key: str, fingerprint: str, fn) -> Tuple[Dict, Any, bool]:
+        """(enregistrement, résultat de la route, vrai si exécutée ici)"""
+        # Jeton de cette réservation : si elle expire et qu'une autre requête
+        # reprend la clé, notre complete/release tardif ne touche pas la sienne
+        token = uuid.uuid4().hex
+        locked_until = datetime.utcnow() + timedelta(seconds=self.lock_seconds)
+        existing = await storage.idempotency.claim(user_id, key, fingerprint, token, locked_until)
+        if existing is not None:
+            if existing["fingerprint"] != fingerprint or existing["status"] == "completed":
+                return existing, None, False
+            return await self._wait_completed(storage, user_id, key), None, False
+
+        try:
+            result = await fn()
+        except BaseException:
+            await storage.idempotency.release(user_id, key, token)
+            raise
+        self.stats.executed += 1
+
+        record = {
+            "fingerprint": fingerprint,
+            "status_code": status.HTTP_200_OK,
+            "body": jsonable_encoder(result),
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)
+        }
+        await storage.idempotency.complete(user_id, key, token, record)
+        self._front_put((user_id, key), record)
+        return record, result, True
+
+    async def _wait_completed(self, storage, user_id: str, key: str) -> Dict:
+        """Attend la réponse d'une première requête en cours sur un autre worker"""
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            record = await storage.idempotency.get(user_id, key)
+            if record is None:
+                # Première requête en échec : la clé a été libérée
+                break
+            if record["status"] == "completed":
+                self._front_put((user_id, key), record)
+                return record
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Une requête avec cette clé d'idempotence est en cours, réessayez plus tard"
+        )
+
+    def _replay(self, record: Dict, fingerprint: str) -> JSONResponse:
+        if record["fingerprint"] != fingerprint:
+            self.stats.mismatched += 1
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{HEADER} déjà utilisée pour une autre requête"
+            )
+        self.stats.replayed += 1
+        return JSONResponse(
+            record["body"],
+            status_code=record["status_code"],
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    def _front_get(self, scope: Hashable) -> Optional[Dict]:
+        entry = self._front.get(scope)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._front[scope]
+            return None
+        self._front.move_to_end(scope)
+        return entry[0]
+
+    def _front_put(self, scope: Hashable, record: Dict):
+        if self.front_max_entries <= 0:
+            return
+        self._front[scope] = (record, time.monotonic() + self.ttl)
+        self._front.move_to_end(scope)
+        while len(self._front) > self.front_max_entries:
+            self._front.popitem(last=False)
+
+    def report(self) -> Dict:
+        return {
+            "ttl_seconds": self.ttl,
+            "front_entries": len(self._front),
+            "inflight": len(self._inflight),
+            **self.stats.as_dict()
+        }
+
+idempotency = IdempotencyGuard(
+    settings.IDEMPOTENCY_TTL_SECONDS,
+    settings.IDEMPOTENCY_LOCK_SECONDS,
+    settings.IDEMPOTENCY_WAIT_SECONDS,
+    settings.IDEMPOTENCY_FRONT_MAX_ENTRIES
+)
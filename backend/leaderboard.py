@@ -0,0 +1,195 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from repositories import Storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Récompenses mensuelles par rang (VISUpoints)
+REWARDS = [(1, 500), (5, 200), (10, 100)]
+
+# Durée du verrou de clôture (reprise possible après un crash)
+CLOSE_LOCK_DURATION = timedelta(minutes=10)
+SNAPSHOT_BATCH_SIZE = 500
+
+# Cache borné project_id -> user_id (le propriétaire d'un projet ne change pas)
+PROJECT_OWNER_CACHE_SIZE = 100_000
+_project_owners: "OrderedDict[str, str]" = OrderedDict()
+
+def reward_for_rank(rank: int) -> int:
+    """Retourne la récompense en VISUpoints pour un rang donné"""
+    for max_rank, points in REWARDS:
+        if rank <= max_rank:
+            return points
+    return 0
+
+def current_period(now: Optional[datetime] = None) -> str:
+    """Période mensuelle courante au format YYYY-MM (UTC)"""
+    return (now or datetime.utcnow()).strftime("%Y-%m")
+
+def previous_period(now: Optional[datetime] = None) -> str:
+    """Période mensuelle précédente au format YYYY-MM (UTC)"""
+    first_day = (now or datetime.utcnow()).replace(day=1)
+    return current_period(first_day - timedelta(days=1))
+
+def parse_period(period: str) -> str:
+    """Valide une période YYYY-MM et la retourne normalisée"""
+    try:
+        return datetime.strptime(period, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise ValueError(f"Période invalide : {period} (format attendu YYYY-MM)")
+
+async def project_owner(storage: Storage, project_id: str) -> Optional[str]:
+    """Retourne le propriétaire d'un projet (avec cache LRU en mémoire)"""
+    user_id = _project_owners.get(project_id)
+    if user_id is not None:
+        _project_owners.move_to_end(project_id)
+        return user_id
+    
+    user_id = await storage.projects.get_owner(project_id)
+    if user_id is None:
+        return None
+    
+    _project_owners[project_id] = user_id
+    if len(_project_owners) > PROJECT_OWNER_CACHE_SIZE:
+        _project_owners.popitem(last=False)
+    return user_id
+
+async def record_event(storage: Storage, project_id: str, platform: str, field: str, now: datetime):
+    """Incrémente le bucket mensuel d'un projet/plateforme et le score de son porteur"""
+    period = current_period(now)
+    await storage.leaderboard.increment_bucket(period, project_id, platform, field, now.isoformat())
+    
+    user_id = await project_owner(storage, project_id)
+    if user_id is not None:
+        await storage.leaderboard.increment_score(period, user_id, field)
+
+def encode_cursor(entry: Dict) -> str:
+    """Curseur keyset opaque : rang:vues:clics:user_id de la dernière entrée"""
+    return f"{entry['rank']}:{entry['total_views']}:{entry['total_clicks']}:{entry['user_id']}"
+
+def decode_cursor(cursor: str) -> Tuple[int, int, int, str]:
+    """Décode un curseur keyset (ValueError si invalide)"""
+    try:
+        rank, views, clicks, user_id = cursor.split(":", 3)
+        return int(rank), int(views), int(clicks), user_id
+    except ValueError:
+        raise ValueError(f"Curseur invalide : {cursor}")
+
+async def _with_user_profiles(storage: Storage, scores: List[Dict], first_rank: int) -> List[Dict]:
+    """Complète une page de scores avec les profils (une seule lecture groupée)"""
+    users = await storage.users.list_profiles([s["user_id"] for s in scores])
+    users_by_id = {u["id"]: u for u in users}
+    
+    entries = []
+    for rank, score in enumerate(scores, start=first_rank):
+        user = users_by_id.get(score["user_id"], {})
+        entries.append({
+            "user_id": score["user_id"],
+            "full_name": user.get("full_name", ""),
+            "visupoints": user.get("visupoints", 0),
+            "badges": user.get("badges", []),
+            "total_views": score.get("total_views", 0),
+            "total_clicks": score.get("total_clicks", 0),
+            "rank": rank,
+            "reward": reward_for_rank(rank)
+        })
+    return entries
+
+async def get_live_page(storage: Storage, period: str, after: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Page du classement en cours, servie par le store de scores indexé (keyset)"""
+    position = None
+    first_rank = 1
+    if after:
+        rank, views, clicks, user_id = decode_cursor(after)
+        position = (views, clicks, user_id)
+        first_rank = rank + 1
+    
+    scores = await storage.leaderboard.score_page(period, position, limit)
+    return await _with_user_profiles(storage, scores, first_rank)
+
+async def get_live_entry(storage: Storage, period: str, user_id: str) -> Optional[Dict]:
+    """Position d'un utilisateur : rang = 1 + nombre indexé de scores supérieurs"""
+    score = await storage.leaderboard.get_score(period, user_id)
+    if not score:
+        return None
+    
+    better = await storage.leaderboard.count_better(period, score)
+    entries = await _with_user_profiles(storage, [score], better + 1)
+    return entries[0]
+
+async def is_closed(storage: Storage, period: str) -> bool:
+    return await storage.leaderboard.is_closed(period)
+
+async def get_snapshot_page(storage: Storage, period: str, after: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Page du classement figé d'une période clôturée (keyset sur le rang)"""
+    after_rank = decode_cursor(after)[0] if after else None
+    return await storage.leaderboard.snapshot_page(period, after_rank, limit)
+
+async def get_snapshot_entry(storage: Storage, period: str, user_id: str) -> Optional[Dict]:
+    return await storage.leaderboard.get_snapshot(period, user_id)
+
+async def rebuild_scores(storage: Storage, period: str) -> int:
+    """Reconstruit le store de scores d'une période à partir des buckets mensuels"""
+    return await storage.leaderboard.rebuild_scores(period)
+
+async def close_period(storage: Storage, period: str) -> Dict:
+    """
+    Clôture une période : fige le classement et distribue les récompenses.
+
+    Idempotent par période : une période déjà clôturée n'est jamais recalculée,
+    et chaque utilisateur ne peut être récompensé qu'une fois par période.
+    Une clôture interrompue est reprise une fois son verrou expiré.
+    """
+    if period >= current_period():
+        raise ValueError(f"La période {period} n'est pas encore terminée")
+
+    now = datetime.utcnow()
+    existing = await storage.leaderboard.lock_period(period, now, now + CLOSE_LOCK_DURATION)
+    if existing is not None:
+        return {"period": period, "status": existing["status"], "already_processed": True}
+
+    # Une tentative précédente a pu écrire un classement partiel
+    await storage.leaderboard.delete_snapshots(period)
+
+    rewards = []
+    batch = []
+    rank = 0
+    async for entry in storage.leaderboard.ranking(period):
+        rank += 1
+        reward = reward_for_rank(rank)
+        batch.append({**entry, "period": period, "rank": rank, "reward": reward})
+        if reward:
+            rewards.append((entry["user_id"], reward))
+        if len(batch) >= SNAPSHOT_BATCH_SIZE:
+            await storage.leaderboard.insert_snapshots(batch)
+            batch = []
+    if batch:
+        await storage.leaderboard.insert_snapshots(batch)
+
+    if rewards:
+        await storage.users.reward_period(period, rewards)
+
+    await storage.leaderboard.finish_period(period, {
+        "closed_at": datetime.utcnow().isoformat(),
+        "entries": rank,
+        "rewarded": len(rewards)
+    })
+    logger.info(f"Leaderboard period {period} closed: {rank} entries, {len(rewards)} rewards")
+
+    return {"period": period, "status": "closed", "entries": rank, "rewarded": len(rewards)}
+
+async def run_close_scheduler(storage: Storage, interval_seconds: int):
+    """Tâche de fond : clôture la période précédente dès qu'elle est terminée"""
+    while True:
+        try:
+            period = previous_period()
+            if not await is_closed(storage, period):
+                await close_period(storage, period)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Leaderboard close job failed")
+        await asyncio.sleep(interval_seconds)
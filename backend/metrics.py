@@ -0,0 +1,299 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Dict
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from pymongo import monitoring
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+    CONTENT_TYPE_LATEST, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+import timing
+
+# ============================================================================
+# Métriques HTTP (routes de api_router)
+# ============================================================================
+
+REQUEST_LATENCY = Histogram(
+    "visual_http_request_duration_seconds",
+    "Durée de traitement des requêtes par route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "visual_http_requests_in_flight",
+    "Requêtes en cours de traitement par route",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+
+# ============================================================================
+# Admission (budgets de concurrence par classe de routes)
+# ============================================================================
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "visual_admission_in_flight",
+    "Requêtes admises en cours d'exécution par classe",
+    ["lane"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_QUEUED = Gauge(
+    "visual_admission_queued",
+    "Requêtes en attente d'admission par classe",
+    ["lane"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "visual_admission_queue_wait_seconds",
+    "Attente en file avant admission par classe",
+    ["lane"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+ADMISSION_SHED = Counter(
+    "visual_admission_shed_total",
+    "Requêtes délestées (503) par classe et motif",
+    ["lane", "reason"]
+)
+
+# ============================================================================
+# Métriques MongoDB (listeners pymongo)
+# ============================================================================
+
+MONGO_COMMAND_DURATION = Histogram(
+    "visual_mongo_command_duration_seconds",
+    "Durée des commandes MongoDB par collection et opération",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "visual_mongo_command_failures_total",
+    "Commandes MongoDB en échec par collection et opération",
+    ["collection", "command"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "visual_mongo_pool_checkout_wait_seconds",
+    "Attente pour obtenir une connexion du pool MongoDB",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "visual_mongo_pool_checkout_failures_total",
+    "Échecs d'obtention d'une connexion du pool MongoDB",
+    ["reason"]
+)
+
+# ============================================================================
+# Boucle d'événements
+# ============================================================================
+
+EVENT_LOOP_LAG = Gauge(
+    "visual_event_loop_lag_seconds",
+    "Retard de la boucle asyncio sur le dernier intervalle mesuré",
+    multiprocess_mode="max"
+)
+
+def exception_handler_for(request: Request, exc: Exception):
+    """Gestionnaire d'exception de l'application pour `exc` (par MRO), ou None"""
+    handlers = request.app.exception_handlers
+    for cls in type(exc).__mro__:
+        if cls in handlers:
+            return handlers[cls]
+    return None
+
+class InstrumentedRoute(APIRoute):
+    """
+    Route FastAPI qui mesure sa latence et ses requêtes en cours.
+    Le label `route` est le gabarit de chemin (ex: /api/projects/{project_id}),
+    ce qui garde une cardinalité bornée. Quand Server-Timing est actif, la
+    fonction de route et l'encodage de la réponse ont chacun leur span.
+
+    Le label `status` suit le code réellement renvoyé : HTTPException et
+    erreurs de validation (422) sont relancées vers leurs gestionnaires ;
+    les autres exceptions ayant un gestionnaire enregistré sont converties
+    ici en réponse par ce gestionnaire. Seules les exceptions non gérées
+    comptent comme 500.
+    """
+
+    def get_route_handler(self) -> Callable:
+        if asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = timing.timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def instrumented_handler(request: Request) -> Response:
+            method = request.method
+            in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+            in_flight.inc()
+            status_code = 500
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                # Sérialisation et encodage de la réponse (Server-Timing)
+                timing.record_since("encode", "handler_end")
+                return response
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            except RequestValidationError:
+                status_code = 422
+                raise
+            except Exception as e:
+                exc_handler = exception_handler_for(request, e)
+                if exc_handler is None:
+                    raise
+                if asyncio.iscoroutinefunction(exc_handler):
+                    response = await exc_handler(request, e)
+                else:
+                    response = await run_in_threadpool(exc_handler, request, e)
+                status_code = response.status_code
+                return response
+            finally:
+                in_flight.dec()
+                REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+
+        return instrumented_handler
+
+def command_collection(command_name: str, command: Dict) -> str:
+    """Collection visée par une commande MongoDB (vide pour les commandes d'admin)"""
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    return command.get("collection", "")
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Durée des commandes MongoDB, par collection et opération"""
+
+    def __init__(self):
+        self._collections: Dict = {}
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = command_collection(
+            event.command_name, event.command
+        )
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Attente de checkout du pool de connexions.
+    pymongo émet début et fin de checkout depuis le même thread (exécuteur
+    de Motor) : l'heure de début est donc conservée par thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.start = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        start = getattr(self._local, "start", None)
+        if start is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+            self._local.start = None
+
+    def connection_check_out_failed(self, event):
+        self.connection_checked_out(event)
+        MONGO_POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+def mongo_listeners():
+    """Listeners à passer à AsyncIOMotorClient(event_listeners=...)"""
+    return [CommandMetricsListener(), PoolMetricsListener()]
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Tâche de fond : mesure le retard de réveil de la boucle asyncio"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
+class AppStatsCollector:
+    """Expose les compteurs internes (cache, coalescence, flux SSE) au scrape"""
+
+    def __init__(self, cache, singleflight, stats_hub):
+        self.cache = cache
+        self.singleflight = singleflight
+        self.stats_hub = stats_hub
+
+    def collect(self):
+        hits = CounterMetricFamily("visual_cache_hits", "Lectures servies par le cache", labels=["namespace"])
+        misses = CounterMetricFamily("visual_cache_misses", "Lectures absentes du cache", labels=["namespace"])
+        for namespace, stats in list(self.cache.stats.items()):
+            hits.add_metric([namespace], stats.hits)
+            misses.add_metric([namespace], stats.misses)
+        yield hits
+        yield misses
+
+        coalesced = CounterMetricFamily("visual_singleflight_coalesced", "Requêtes coalescées sur une requête en cours", labels=["route"])
+        leaders = CounterMetricFamily("visual_singleflight_leaders", "Requêtes ayant exécuté la lecture", labels=["route"])
+        for route, stats in list(self.singleflight.stats.items()):
+            coalesced.add_metric([route], stats.coalesced)
+            leaders.add_metric([route], stats.leaders)
+        yield coalesced
+        yield leaders
+
+        hub = self.stats_hub.report()
+        yield GaugeMetricFamily("visual_stats_stream_subscribers", "Abonnés SSE connectés", value=hub["subscribers"])
+        yield CounterMetricFamily("visual_stats_stream_frames", "Trames SSE envoyées", value=hub["frames_sent"])
+
+_app_collector = None
+
+def register_app_collector(cache, singleflight, stats_hub):
+    global _app_collector
+    _app_collector = AppStatsCollector(cache, singleflight, stats_hub)
+    REGISTRY.register(_app_collector)
+
+def metrics_response() -> Response:
+    """
+    Rendu texte Prometheus. Si PROMETHEUS_MULTIPROC_DIR est défini (plusieurs
+    workers uvicorn), les métriques de tous les workers sont agrégées.
+    Les compteurs internes (AppStatsCollector) vivent en mémoire de chaque
+    worker et ne passent pas par les fichiers multiprocess : ils sont ajoutés
+    au rendu mais ne reflètent que le worker qui répond au scrape.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        if _app_collector is not None:
+            registry.register(_app_collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
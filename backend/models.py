@@ -13,6 +13,15 @@ class EventType(str, Enum):
     VIEW = "view"
     CLICK = "click"
 
+class AnalyticsScope(str, Enum):
+    ME = "me"
+    PLATFORM = "platform"
+
+class CohortMetric(str, Enum):
+    VIEWS = "views"
+    CLICKS = "clicks"
+    CTR = "ctr"
+
 # User Models
 class UserCreate(BaseModel):
     email: EmailStr
@@ -31,6 +40,8 @@ class User(BaseModel):
     visupoints: int = 0
     badges: List[str] = []
     is_active: bool = True
+    is_admin: bool = False
+    projects_version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class UserResponse(BaseModel):
@@ -78,6 +89,9 @@ class SocialAuthorization(BaseModel):
     revoked: bool = False
     revoked_at: Optional[datetime] = None
 
+class BatchShareLinksRequest(BaseModel):
+    project_ids: List[str] = Field(..., min_length=1, max_length=500)
+
 class AuthorizeShareResponse(BaseModel):
     project_id: str
     platforms: List[SocialPlatform]
@@ -107,6 +121,7 @@ class LeaderboardEntry(BaseModel):
     total_clicks: int
     badges: List[str]
     rank: int
+    reward: int = 0
 
 # Video Generation Models
 class VideoExcerpt(BaseModel):
@@ -0,0 +1,134 @@
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+def collapse(frame) -> str:
+    """Pile d'appels au format "collapsed" (racine;...;feuille) des flamegraphs"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class SamplingProfiler:
+    """
+    Profileur statistique à la demande pour un worker.
+
+    Un thread échantillonne la pile du thread de la boucle asyncio à
+    intervalle fixe, sans instrumenter le code. Deux modes :
+    - "duration" : échantillonne en continu pendant N secondes ;
+    - "header" : pendant N secondes, n'échantillonne que lorsque au moins une
+      requête portant `X-Profile: <jeton>` est en cours.
+    Les piles agrégées sont écrites au format collapsed (flamegraph.pl,
+    speedscope) dans PROFILER_OUTPUT_DIR.
+    """
+
+    def __init__(self, output_dir: str, interval: float):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.mode: Optional[str] = None
+        self.token: Optional[str] = None
+        self.active_requests = 0
+        self.last_output: Optional[str] = None
+        self._stacks: Counter = Counter()
+        # Compté à part : status() ne parcourt pas _stacks pendant que le thread l'alimente
+        self.samples = 0
+        self._deadline = 0.0
+        self._target_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, mode: str = "duration") -> Dict:
+        """Arme le profileur ; doit être appelé depuis le thread de la boucle"""
+        if self.running:
+            raise RuntimeError("Un profilage est déjà en cours sur ce worker")
+        self.mode = mode
+        self.token = secrets.token_urlsafe(16) if mode == "header" else None
+        self.active_requests = 0
+        self._stacks = Counter()
+        self.samples = 0
+        self._deadline = time.monotonic() + seconds
+        self._target_thread = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self.status()
+
+    def stop(self) -> Optional[str]:
+        """Arrête l'échantillonnage et retourne le fichier écrit"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        return self.last_output
+
+    def should_sample(self) -> bool:
+        return self.mode == "duration" or self.active_requests > 0
+
+    def _sample(self):
+        while not self._stop.is_set() and time.monotonic() < self._deadline:
+            time.sleep(self.interval)
+            if not self.should_sample():
+                continue
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is not None:
+                self._stacks[collapse(frame)] += 1
+                self.samples += 1
+        self.last_output = self._write()
+        self.mode = None
+        self.token = None
+
+    def _write(self) -> str:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+        with open(path, "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profile written to {path} ({self.samples} samples)")
+        return str(path)
+
+    def status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "running": self.running,
+            "mode": self.mode,
+            "token": self.token,
+            "samples": self.samples,
+            "last_output": self.last_output
+        }
+
+class ProfilerTriggerMiddleware:
+    """Compte les requêtes marquées `X-Profile: <jeton>` quand le mode header est armé"""
+
+    def __init__(self, app, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        token = self.profiler.token
+        if token is None or scope["type"] != "http" or (PROFILE_HEADER, token.encode()) not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        self.profiler.active_requests += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.active_requests -= 1
+
+profiler = SamplingProfiler(settings.PROFILER_OUTPUT_DIR, settings.PROFILER_INTERVAL_SECONDS)
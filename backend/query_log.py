@@ -0,0 +1,170 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from pymongo import monitoring
+from metrics import command_collection
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Commandes dont on peut demander le plan d'exécution
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Champs de session ajoutés par le driver, à retirer avant un explain
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "txnNumber", "$readPreference"}
+
+def query_shape(value: Any) -> Any:
+    """Forme normalisée d'un filtre : les valeurs sont remplacées par leur type"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in, $or... : on garde la forme du premier élément seulement
+        return [query_shape(value[0])] if value else []
+    return type(value).__name__
+
+def command_shape(command_name: str, command: Dict) -> Dict:
+    return {
+        key: query_shape(value)
+        for key, value in command.items()
+        if key in ("filter", "query", "pipeline", "sort", "updates", "deletes")
+    }
+
+def plan_stages(plan: Dict) -> List[str]:
+    """Liste des étapes (COLLSCAN, IXSCAN, FETCH...) d'un plan gagnant"""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if isinstance(node.get(key), dict):
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+def winning_plan(explain: Dict) -> Optional[Dict]:
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"].get("winningPlan")
+    # aggregate : le plan est dans la première étape $cursor
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"].get("queryPlanner", {}).get("winningPlan")
+    return None
+
+class SlowQueryLog(monitoring.CommandListener):
+    """
+    Journal des commandes MongoDB lentes.
+
+    Toute commande plus lente que `threshold_ms` est enregistrée avec la forme
+    normalisée de son filtre dans un buffer circulaire borné. Une fraction
+    `explain_sample_rate` d'entre elles est ré-exécutée en
+    `explain("executionStats")` sur la boucle asyncio, pour signaler les
+    COLLSCAN.
+    """
+
+    def __init__(self, threshold_ms: float, capacity: int, explain_sample_rate: float):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.entries: deque = deque(maxlen=capacity)
+        self._pending: Dict = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        """Active les explain : client Motor et boucle sur laquelle les lancer"""
+        self._client = client
+        self._loop = loop
+
+    def started(self, event):
+        if event.command_name in EXPLAINABLE or event.command_name == "getMore":
+            self._pending[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms or pending is None:
+            return
+        self._record(pending[0], event.command_name, pending[1], duration_ms)
+
+    def failed(self, event):
+        self._pending.pop((event.connection_id, event.request_id), None)
+
+    def _record(self, database_name: str, command_name: str, command: Dict, duration_ms: float):
+        entry = {
+            "at": time.time(),
+            "command": command_name,
+            "collection": command_collection(command_name, command),
+            "shape": command_shape(command_name, command),
+            "duration_ms": round(duration_ms, 2),
+            "plan": None,
+            "collscan": None
+        }
+        with self._lock:
+            self.entries.append(entry)
+
+        if (
+            command_name in EXPLAINABLE
+            and self._loop is not None
+            and random.random() < self.explain_sample_rate
+        ):
+            explained = {k: v for k, v in command.items() if k not in DRIVER_FIELDS}
+            asyncio.run_coroutine_threadsafe(self._explain(entry, database_name, explained), self._loop)
+
+    async def _explain(self, entry: Dict, database_name: str, command: Dict):
+        try:
+            result = await self._client[database_name].command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+        except Exception as e:
+            entry["plan"] = f"explain failed: {e}"
+            return
+        stages = plan_stages(winning_plan(result) or {})
+        stats = result.get("executionStats", {})
+        entry["plan"] = {
+            "stages": stages,
+            "docs_examined": stats.get("totalDocsExamined"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "returned": stats.get("nReturned")
+        }
+        entry["collscan"] = "COLLSCAN" in stages
+        if entry["collscan"]:
+            logger.warning(f"COLLSCAN on {entry['collection']} ({entry['command']}): {entry['shape']}")
+
+    def report(self) -> Dict:
+        """Entrées récentes et agrégat par forme de requête"""
+        with self._lock:
+            entries = list(self.entries)
+        by_shape: Dict[str, Dict] = {}
+        for entry in entries:
+            key = f"{entry['collection']}.{entry['command']} {entry['shape']}"
+            summary = by_shape.setdefault(key, {
+                "collection": entry["collection"],
+                "command": entry["command"],
+                "shape": entry["shape"],
+                "count": 0,
+                "max_ms": 0.0,
+                "total_ms": 0.0,
+                "collscan": False
+            })
+            summary["count"] += 1
+            summary["total_ms"] += entry["duration_ms"]
+            summary["max_ms"] = max(summary["max_ms"], entry["duration_ms"])
+            summary["collscan"] = summary["collscan"] or bool(entry["collscan"])
+        shapes = sorted(by_shape.values(), key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "threshold_ms": self.threshold_ms,
+            "shapes": shapes,
+            "recent": entries[-50:]
+        }
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    capacity=settings.SLOW_QUERY_LOG_SIZE,
+    explain_sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+)
@@ -0,0 +1,139 @@
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "visual:ratelimit"
+
+class SlidingWindowLimiter:
+    """
+    Limiteur à fenêtre glissante exacte, en mémoire du worker.
+
+    Chaque clé garde les horodatages de ses `limit` derniers événements
+    acceptés dans un tampon circulaire de taille fixe : un événement est
+    accepté si le plus ancien d'entre eux (celui qu'il remplacerait) est sorti
+    de la fenêtre. Les clés sont dans un LRU borné : les clés inactives sont
+    les premières évincées.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # clé -> [tampon des horodatages, position du plus ancien]
+        self._keys: "OrderedDict[str, list]" = OrderedDict()
+        self.evicted = 0
+
+    def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """(accepté, secondes avant qu'un événement soit de nouveau accepté)"""
+        now = time.monotonic() if now is None else now
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [array("d", [float("-inf")] * self.limit), 0]
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._keys.move_to_end(key)
+
+        ring, oldest = entry
+        if now - ring[oldest] < self.window:
+            return False, ring[oldest] + self.window - now
+        ring[oldest] = now
+        entry[1] = (oldest + 1) % self.limit
+        return True, 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+class RedisSlidingWindowLimiter:
+    """
+    Fenêtre glissante partagée entre workers (approximée) : un compteur Redis
+    par fenêtre fixe, la fenêtre précédente étant pondérée par sa part encore
+    couverte. Un seul aller-retour (pipeline) par événement ; les événements
+    refusés comptent aussi, si bien qu'un client qui insiste reste bloqué. Les
+    compteurs expirent d'eux-mêmes après deux fenêtres.
+    """
+
+    def __init__(self, client: Any, limit: int, window: float):
+        self.client = client
+        self.limit = limit
+        self.window = window
+
+    async def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        now = time.time() if now is None else now
+        current = int(now // self.window)
+        elapsed = now - current * self.window
+        current_key = f"{KEY_PREFIX}:{key}:{current}"
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(self.window * 2) + 1)
+        pipe.get(f"{KEY_PREFIX}:{key}:{current - 1}")
+        count, _, previous = await pipe.execute()
+
+        estimate = int(previous or 0) * (1 - elapsed / self.window) + count
+        if estimate > self.limit:
+            return False, self.window - elapsed
+        return True, 0.0
+
+class TrackRateLimiter:
+    """
+    Limitation des événements de tracking par (IP cliente, projet).
+    Avec un client Redis, la fenêtre est partagée entre les workers ; si Redis
+    est indisponible, le limiteur local du worker prend le relais.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.enabled = limit > 0
+        self.local = SlidingWindowLimiter(max(limit, 1), window, max_keys)
+        self.shared: Optional[RedisSlidingWindowLimiter] = None
+        self.allowed = 0
+        self.rejected = 0
+        self.shared_errors = 0
+
+    def use_redis(self, client: Any):
+        self.shared = RedisSlidingWindowLimiter(client, self.local.limit, self.local.window)
+
+    async def hit(self, client_ip: Optional[str], project_id: str) -> Tuple[bool, float]:
+        if not self.enabled:
+            return True, 0.0
+        key = f"{client_ip or '-'}:{project_id}"
+        if self.shared is not None:
+            try:
+                allowed, retry_after = await self.shared.hit(key)
+            except Exception:
+                self.shared_errors += 1
+                logger.warning("Rate limit backend error, using local window", exc_info=True)
+                allowed, retry_after = self.local.hit(key)
+        else:
+            allowed, retry_after = self.local.hit(key)
+
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return allowed, retry_after
+
+    def report(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self.shared is not None else "memory",
+            "limit": self.local.limit,
+            "window_seconds": self.local.window,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "tracked_keys": len(self.local),
+            "evicted_keys": self.local.evicted,
+            "backend_errors": self.shared_errors
+        }
+
+track_limiter = TrackRateLimiter(
+    settings.TRACK_RATE_LIMIT_EVENTS,
+    settings.TRACK_RATE_LIMIT_WINDOW_SECONDS,
+    settings.TRACK_RATE_LIMIT_MAX_KEYS
+)
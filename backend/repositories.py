@@ -0,0 +1,1027 @@
+import copy
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import ASCENDING, DESCENDING, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config import settings
+from search_index import tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Les documents sont échangés sous la forme stockée (dates en isoformat, sans _id).
+# Deux implémentations aux mêmes sémantiques : MongoDB (production) et en mémoire
+# indexée (tests, bancs de mesure).
+
+# Champs renvoyés par la recherche, et poids du titre face à la description
+SEARCH_FIELDS = ("id", "user_id", "title", "description", "thumbnail_url", "created_at")
+SEARCH_WEIGHTS = {"title": 5, "description": 1}
+
+# Champs du profil joints aux entrées du classement
+PROFILE_FIELDS = ("full_name", "visupoints", "badges")
+
+# Ordre du classement dans le store de scores (aussi utilisé pour le keyset)
+SCORE_SORT = [("total_views", DESCENDING), ("total_clicks", DESCENDING), ("user_id", ASCENDING)]
+SCORE_BATCH_SIZE = 500
+
+def _public(doc: Optional[Dict]) -> Optional[Dict]:
+    """Copie d'un document sans l'_id Mongo (comme une projection {"_id": 0})"""
+    if doc is None:
+        return None
+    doc = copy.deepcopy(doc)
+    doc.pop("_id", None)
+    return doc
+
+# ============================================================================
+# MongoDB
+# ============================================================================
+
+class MongoUserRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.users
+
+    async def ensure_indexes(self):
+        # get_by_id sert l'authentification de chaque requête
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index("email", unique=True)
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({"id": user_id}, {"_id": 0})
+
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        return await self.collection.find_one({"email": email}, {"_id": 0})
+
+    async def insert(self, user: Dict) -> bool:
+        """Faux si l'email (ou l'id) est déjà enregistré"""
+        try:
+            await self.collection.insert_one(dict(user))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def insert_many(self, users: List[Dict]):
+        await self.collection.insert_many([dict(u) for u in users], ordered=False)
+
+    async def bump_projects_version(self, user_id: str):
+        await self.collection.update_one({"id": user_id}, {"$inc": {"projects_version": 1}})
+
+    async def award_badge(self, user_id: str, badge: str, visupoints: int):
+        await self.collection.update_one(
+            {"id": user_id},
+            {"$push": {"badges": badge}, "$inc": {"visupoints": visupoints}}
+        )
+
+    async def list_profiles(self, user_ids: List[str]) -> List[Dict]:
+        """id, nom, VISUpoints et badges des utilisateurs (une seule requête $in)"""
+        projection = {"_id": 0, "id": 1, **{field: 1 for field in PROFILE_FIELDS}}
+        return await self.collection.find({"id": {"$in": user_ids}}, projection).to_list(len(user_ids))
+
+    async def reward_period(self, period: str, rewards: List[Tuple[str, int]]):
+        """Crédite (utilisateur, VISUpoints), au plus une fois par utilisateur et par période"""
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"id": user_id, "rewarded_periods": {"$ne": period}},
+                {"$inc": {"visupoints": points}, "$addToSet": {"rewarded_periods": period}}
+            )
+            for user_id, points in rewards
+        ], ordered=False)
+
+class MongoProjectRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.projects
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index("user_id")
+        await self.collection.create_index(
+            [("title", TEXT), ("description", TEXT)],
+            weights=SEARCH_WEIGHTS,
+            default_language="french",
+            name="projects_text"
+        )
+
+    async def get(self, project_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Projet par id ; avec `user_id`, seulement s'il appartient à cet utilisateur"""
+        query = {"id": project_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        return await self.collection.find_one(query, {"_id": 0})
+
+    async def get_owner(self, project_id: str) -> Optional[str]:
+        project = await self.collection.find_one({"id": project_id}, {"_id": 0, "user_id": 1})
+        return project["user_id"] if project else None
+
+    async def list_by_user(self, user_id: str, limit: int = 1000) -> List[Dict]:
+        return await self.collection.find({"user_id": user_id}, {"_id": 0}).to_list(limit)
+
+    async def owned_ids(self, user_id: str, project_ids: List[str]) -> Set[str]:
+        owned = await self.collection.find(
+            {"id": {"$in": project_ids}, "user_id": user_id},
+            {"_id": 0, "id": 1}
+        ).to_list(len(project_ids))
+        return {p["id"] for p in owned}
+
+    async def list_created(self, user_id: Optional[str] = None) -> List[Dict]:
+        """id et date de création des projets d'un utilisateur (de tous si None)"""
+        query = {"user_id": user_id} if user_id is not None else {}
+        return await self.collection.find(query, {"_id": 0, "id": 1, "created_at": 1}).to_list(None)
+
+    async def list_titles(self) -> List[Dict]:
+        """id, propriétaire et titre de tous les projets (index d'autocomplétion)"""
+        cursor = self.collection.find({}, {"_id": 0, "id": 1, "user_id": 1, "title": 1}, batch_size=10_000)
+        return await cursor.to_list(None)
+
+    async def search(self, text: str, user_id: Optional[str], skip: int, limit: int) -> Tuple[int, List[Dict]]:
+        """
+        Recherche plein texte (index texte, pondéré en faveur du titre) :
+        (nombre total de résultats, page triée par pertinence).
+        """
+        query = {"$text": {"$search": text}}
+        if user_id is not None:
+            query["user_id"] = user_id
+        projection = {"_id": 0, "score": {"$meta": "textScore"}, **{field: 1 for field in SEARCH_FIELDS}}
+        total = await self.collection.count_documents(query)
+        results = await self.collection.find(query, projection).sort(
+            [("score", {"$meta": "textScore"})]
+        ).skip(skip).limit(limit).to_list(limit)
+        return total, results
+
+    async def insert(self, project: Dict):
+        await self.collection.insert_one(dict(project))
+
+    async def insert_many(self, projects: List[Dict]) -> Dict[int, str]:
+        """Insertion non ordonnée : {position: erreur} des documents refusés"""
+        try:
+            await self.collection.insert_many([dict(p) for p in projects], ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "") for error in e.details.get("writeErrors", [])}
+        return {}
+
+class MongoAuthorizationRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.social_authorizations
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("user_id", ASCENDING), ("project_id", ASCENDING)])
+        # Chargement de l'index des autorisations et get_active_for_project
+        await self.collection.create_index([("project_id", ASCENDING), ("revoked", ASCENDING)])
+
+    async def get(self, user_id: str, project_id: str, active_only: bool = False) -> Optional[Dict]:
+        query = {"user_id": user_id, "project_id": project_id}
+        if active_only:
+            query["revoked"] = False
+        return await self.collection.find_one(query, {"_id": 0})
+
+    async def get_active_for_project(self, project_id: str) -> Optional[Dict]:
+        """Une autorisation active du projet, quel que soit l'utilisateur"""
+        return await self.collection.find_one({"project_id": project_id, "revoked": False}, {"_id": 0})
+
+    async def list_active(self, user_id: str, limit: int = 1000) -> List[Dict]:
+        return await self.collection.find({"user_id": user_id, "revoked": False}, {"_id": 0}).to_list(limit)
+
+    async def active_platforms(self, user_id: str, project_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Plateformes autorisées par projet, pour les autorisations actives"""
+        project_ids = list(project_ids)
+        authorizations = await self.collection.find(
+            {"user_id": user_id, "project_id": {"$in": project_ids}, "revoked": False},
+            {"_id": 0, "project_id": 1, "platforms": 1}
+        ).to_list(len(project_ids))
+        return {a["project_id"]: a["platforms"] for a in authorizations}
+
+    async def all_active_platforms(self) -> Dict[str, List[str]]:
+        """Plateformes autorisées de chaque projet, toutes autorisations actives confondues"""
+        cursor = self.collection.find(
+            {"revoked": False},
+            {"_id": 0, "project_id": 1, "platforms": 1},
+            batch_size=10_000
+        )
+        platforms: Dict[str, List[str]] = {}
+        async for authorization in cursor:
+            platforms.setdefault(authorization["project_id"], []).extend(authorization["platforms"])
+        return platforms
+
+    async def insert(self, authorization: Dict):
+        await self.collection.insert_one(dict(authorization))
+
+    async def insert_many(self, authorizations: List[Dict]):
+        await self.collection.insert_many([dict(a) for a in authorizations], ordered=False)
+
+    async def update(self, authorization_id: str, fields: Dict):
+        await self.collection.update_one({"id": authorization_id}, {"$set": fields})
+
+class MongoStatsRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.social_stats
+
+    async def ensure_indexes(self):
+        # Un compteur par (projet, plateforme) : clé du get puis insert ou incrément du tracking
+        await self.collection.create_index([("project_id", ASCENDING), ("platform", ASCENDING)], unique=True)
+        await self.collection.create_index([("project_id", ASCENDING), ("last_updated_at", DESCENDING)])
+        # Version des données de toute la plateforme (analytics)
+        await self.collection.create_index([("last_updated_at", DESCENDING)])
+
+    async def get(self, project_id: str, platform: str) -> Optional[Dict]:
+        return await self.collection.find_one({"project_id": project_id, "platform": platform}, {"_id": 0})
+
+    async def list_by_project(self, project_id: str, limit: int = 10) -> List[Dict]:
+        return await self.collection.find({"project_id": project_id}, {"_id": 0}).to_list(limit)
+
+    async def latest_update(self, project_id: str) -> Optional[str]:
+        """Date de dernière mise à jour des stats du projet (lue via index)"""
+        latest = await self.collection.find_one(
+            {"project_id": project_id},
+            {"_id": 0, "last_updated_at": 1},
+            sort=[("last_updated_at", DESCENDING)]
+        )
+        return latest["last_updated_at"] if latest else None
+
+    async def latest_update_in(self, project_ids: Optional[List[str]] = None) -> Optional[str]:
+        """Dernière mise à jour parmi ces projets (toute la plateforme si None)"""
+        query = {"project_id": {"$in": project_ids}} if project_ids is not None else {}
+        latest = await self.collection.find_one(
+            query,
+            {"_id": 0, "last_updated_at": 1},
+            sort=[("last_updated_at", DESCENDING)]
+        )
+        return latest["last_updated_at"] if latest else None
+
+    async def list_counters(self, project_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Compteurs de ces projets (de toute la plateforme si None), en un seul curseur"""
+        query = {"project_id": {"$in": project_ids}} if project_ids is not None else {}
+        cursor = self.collection.find(
+            query,
+            {"_id": 0, "project_id": 1, "platform": 1, "views": 1, "clicks": 1},
+            batch_size=10_000
+        )
+        return await cursor.to_list(None)
+
+    async def insert(self, stats: Dict) -> bool:
+        """Faux si le compteur (projet, plateforme) existe déjà (créé par une requête concurrente)"""
+        try:
+            await self.collection.insert_one(dict(stats))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def insert_many(self, stats: List[Dict]):
+        await self.collection.insert_many([dict(s) for s in stats], ordered=False)
+
+    async def increment(self, stats_id: str, field: str, updated_at: str):
+        await self.collection.update_one(
+            {"id": stats_id},
+            {"$inc": {field: 1}, "$set": {"last_updated_at": updated_at}}
+        )
+
+class MongoIdempotencyRepository:
+    """
+    Réponses enregistrées par (utilisateur, Idempotency-Key). `expires_at` est
+    une vraie date (pas une chaîne) : l'index TTL de MongoDB supprime les
+    enregistrements expirés.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.idempotency_keys
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("user_id", ASCENDING), ("key", ASCENDING)], unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, user_id: str, key: str) -> Optional[Dict]:
+        record = await self.collection.find_one({"user_id": user_id, "key": key}, {"_id": 0})
+        if record is None or record["expires_at"] < datetime.utcnow():
+            return None
+        return record
+
+    async def claim(self, user_id: str, key: str, fingerprint: str, token: str, locked_until: datetime) -> Optional[Dict]:
+        """
+        Réserve la clé pour une première exécution : None si la réservation
+        est acquise, sinon l'enregistrement existant (en cours ou terminé).
+        Une réservation expirée (worker arrêté en cours de route) est reprise.
+        `token` identifie la réservation : seul son détenteur peut ensuite la
+        terminer ou la libérer, même si elle a expiré et été reprise entre-temps.
+        """
+        pending = {
+            "user_id": user_id, "key": key, "fingerprint": fingerprint,
+            "token": token, "status": "pending", "expires_at": locked_until
+        }
+        now = datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {"user_id": user_id, "key": key, "expires_at": {"$lt": now}},
+                {"$set": pending},
+                upsert=True
+            )
+            return None
+        except DuplicateKeyError:
+            return await self.collection.find_one({"user_id": user_id, "key": key}, {"_id": 0})
+
+    async def complete(self, user_id: str, key: str, token: str, fields: Dict):
+        await self.collection.update_one(
+            {"user_id": user_id, "key": key, "token": token, "status": "pending"},
+            {"$set": {**fields, "status": "completed"}}
+        )
+
+    async def release(self, user_id: str, key: str, token: str):
+        await self.collection.delete_one({"user_id": user_id, "key": key, "token": token, "status": "pending"})
+
+def _after_filter(views: int, clicks: int, user_id: str) -> Dict:
+    """Filtre des scores strictement après (vues, clics, user_id) dans l'ordre du classement"""
+    return {"$or": [
+        {"total_views": {"$lt": views}},
+        {"total_views": views, "total_clicks": {"$lt": clicks}},
+        {"total_views": views, "total_clicks": clicks, "user_id": {"$gt": user_id}},
+    ]}
+
+def _before_filter(views: int, clicks: int, user_id: str) -> Dict:
+    """Filtre des scores strictement mieux classés que (vues, clics, user_id)"""
+    return {"$or": [
+        {"total_views": {"$gt": views}},
+        {"total_views": views, "total_clicks": {"$gt": clicks}},
+        {"total_views": views, "total_clicks": clicks, "user_id": {"$lt": user_id}},
+    ]}
+
+def _owner_totals_pipeline(period: str) -> List[Dict]:
+    """Vues et clics d'une période par porteur (buckets joints à leurs projets)"""
+    return [
+        {"$match": {"period": period}},
+        {
+            "$lookup": {
+                "from": "projects",
+                "localField": "project_id",
+                "foreignField": "id",
+                "as": "project"
+            }
+        },
+        {"$unwind": "$project"},
+        {
+            "$group": {
+                "_id": "$project.user_id",
+                "total_views": {"$sum": "$views"},
+                "total_clicks": {"$sum": "$clicks"}
+            }
+        },
+    ]
+
+def _ranking_pipeline(period: str) -> List[Dict]:
+    return _owner_totals_pipeline(period) + [
+        {"$sort": {"total_views": -1, "total_clicks": -1, "_id": 1}},
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "id",
+                "as": "user"
+            }
+        },
+        {"$unwind": "$user"},
+        {
+            "$project": {
+                "_id": 0,
+                "user_id": "$_id",
+                **{field: f"$user.{field}" for field in PROFILE_FIELDS},
+                "total_views": 1,
+                "total_clicks": 1
+            }
+        },
+    ]
+
+class MongoLeaderboardRepository:
+    """
+    Classement mensuel : buckets (période, projet, plateforme), store de
+    scores par porteur tenu à jour à chaque événement, snapshots figés des
+    périodes clôturées et verrou de clôture.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.buckets = db.social_stats_monthly
+        self.scores = db.leaderboard_scores
+        self.snapshots = db.leaderboard_snapshots
+        self.periods = db.leaderboard_periods
+
+    async def ensure_indexes(self):
+        await self.buckets.create_index(
+            [("period", ASCENDING), ("project_id", ASCENDING), ("platform", ASCENDING)],
+            unique=True
+        )
+        await self.snapshots.create_index([("period", ASCENDING), ("rank", ASCENDING)], unique=True)
+        await self.snapshots.create_index([("period", ASCENDING), ("user_id", ASCENDING)])
+        await self.scores.create_index([("period", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        await self.scores.create_index([("period", ASCENDING)] + SCORE_SORT)
+
+    # Buckets mensuels
+
+    async def increment_bucket(self, period: str, project_id: str, platform: str, field: str, updated_at: str):
+        await self.buckets.update_one(
+            {"period": period, "project_id": project_id, "platform": platform},
+            {"$inc": {field: 1}, "$set": {"last_updated_at": updated_at}},
+            upsert=True
+        )
+
+    async def insert_buckets(self, buckets: List[Dict]):
+        await self.buckets.insert_many([dict(b) for b in buckets], ordered=False)
+
+    async def bucket_totals(self, first_period: str, last_period: str, project_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Vues et clics cumulés par (période, plateforme) entre deux périodes incluses"""
+        match: Dict = {"period": {"$gte": first_period, "$lte": last_period}}
+        if project_ids is not None:
+            match["project_id"] = {"$in": project_ids}
+        return await self.buckets.aggregate([
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {"period": "$period", "platform": "$platform"},
+                    "views": {"$sum": "$views"},
+                    "clicks": {"$sum": "$clicks"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "period": "$_id.period",
+                    "platform": "$_id.platform",
+                    "views": 1,
+                    "clicks": 1
+                }
+            }
+        ]).to_list(None)
+
+    # Store de scores
+
+    async def increment_score(self, period: str, user_id: str, field: str):
+        other_field = "clicks" if field == "views" else "views"
+        # Les deux compteurs doivent exister pour les filtres de rang et de keyset
+        await self.scores.update_one(
+            {"period": period, "user_id": user_id},
+            {"$inc": {f"total_{field}": 1}, "$setOnInsert": {f"total_{other_field}": 0}},
+            upsert=True
+        )
+
+    async def score_page(self, period: str, after: Optional[Tuple[int, int, str]], limit: int) -> List[Dict]:
+        """Scores dans l'ordre du classement, après (vues, clics, user_id) si donné"""
+        query: Dict = {"period": period}
+        if after is not None:
+            query.update(_after_filter(*after))
+        return await self.scores.find(query, {"_id": 0}).sort(SCORE_SORT).limit(limit).to_list(limit)
+
+    async def get_score(self, period: str, user_id: str) -> Optional[Dict]:
+        return await self.scores.find_one({"period": period, "user_id": user_id}, {"_id": 0})
+
+    async def count_better(self, period: str, score: Dict) -> int:
+        """Nombre de scores mieux classés (compté sur l'index du classement)"""
+        return await self.scores.count_documents({
+            "period": period,
+            **_before_filter(score.get("total_views", 0), score.get("total_clicks", 0), score["user_id"])
+        })
+
+    async def rebuild_scores(self, period: str) -> int:
+        """Recalcule les scores d'une période depuis ses buckets : nombre de porteurs"""
+        operations = []
+        count = 0
+        async for row in self.buckets.aggregate(_owner_totals_pipeline(period), allowDiskUse=True):
+            operations.append(UpdateOne(
+                {"period": period, "user_id": row["_id"]},
+                {"$set": {"total_views": row["total_views"], "total_clicks": row["total_clicks"]}},
+                upsert=True
+            ))
+            if len(operations) >= SCORE_BATCH_SIZE:
+                await self.scores.bulk_write(operations, ordered=False)
+                count += len(operations)
+                operations = []
+        if operations:
+            await self.scores.bulk_write(operations, ordered=False)
+            count += len(operations)
+        return count
+
+    async def ranking(self, period: str) -> AsyncIterator[Dict]:
+        """Classement complet d'une période depuis ses buckets, avec les profils"""
+        async for entry in self.buckets.aggregate(_ranking_pipeline(period), allowDiskUse=True):
+            yield entry
+
+    # Clôture et snapshots
+
+    async def is_closed(self, period: str) -> bool:
+        closing = await self.periods.find_one({"_id": period, "status": "closed"}, {"_id": 1})
+        return closing is not None
+
+    async def lock_period(self, period: str, now: datetime, locked_until: datetime) -> Optional[Dict]:
+        """
+        Verrou de clôture d'une période : None s'il est acquis, sinon l'état
+        existant (clôturée, ou clôture en cours dont le verrou n'a pas expiré).
+        """
+        try:
+            await self.periods.find_one_and_update(
+                {"_id": period, "status": "pending", "locked_until": {"$lt": now.isoformat()}},
+                {
+                    "$set": {"status": "pending", "locked_until": locked_until.isoformat()},
+                    "$setOnInsert": {"started_at": now.isoformat()}
+                },
+                upsert=True
+            )
+            return None
+        except DuplicateKeyError:
+            return await self.periods.find_one({"_id": period})
+
+    async def finish_period(self, period: str, fields: Dict):
+        await self.periods.update_one(
+            {"_id": period},
+            {"$set": {**fields, "status": "closed"}, "$unset": {"locked_until": ""}}
+        )
+
+    async def delete_snapshots(self, period: str):
+        await self.snapshots.delete_many({"period": period})
+
+    async def insert_snapshots(self, entries: List[Dict]):
+        await self.snapshots.insert_many([dict(e) for e in entries])
+
+    async def snapshot_page(self, period: str, after_rank: Optional[int], limit: int) -> List[Dict]:
+        query: Dict = {"period": period}
+        if after_rank is not None:
+            query["rank"] = {"$gt": after_rank}
+        return await self.snapshots.find(query, {"_id": 0}).sort("rank", ASCENDING).limit(limit).to_list(limit)
+
+    async def get_snapshot(self, period: str, user_id: str) -> Optional[Dict]:
+        return await self.snapshots.find_one({"period": period, "user_id": user_id}, {"_id": 0})
+
+# ============================================================================
+# En mémoire (indexée)
+# ============================================================================
+
+class MemoryUserRepository:
+    def __init__(self):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_email: Dict[str, str] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict]:
+        return _public(self._by_id.get(user_id))
+
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        user_id = self._by_email.get(email)
+        return _public(self._by_id.get(user_id)) if user_id else None
+
+    async def insert(self, user: Dict) -> bool:
+        if user["email"] in self._by_email or user["id"] in self._by_id:
+            return False
+        user = _public(user)
+        self._by_id[user["id"]] = user
+        self._by_email[user["email"]] = user["id"]
+        return True
+
+    async def insert_many(self, users: List[Dict]):
+        for user in users:
+            await self.insert(user)
+
+    async def bump_projects_version(self, user_id: str):
+        user = self._by_id.get(user_id)
+        if user is not None:
+            user["projects_version"] = user.get("projects_version", 0) + 1
+
+    async def award_badge(self, user_id: str, badge: str, visupoints: int):
+        user = self._by_id.get(user_id)
+        if user is not None:
+            user.setdefault("badges", []).append(badge)
+            user["visupoints"] = user.get("visupoints", 0) + visupoints
+
+    async def list_profiles(self, user_ids: List[str]) -> List[Dict]:
+        return [
+            {"id": user_id, **{f: copy.deepcopy(self._by_id[user_id][f]) for f in PROFILE_FIELDS if f in self._by_id[user_id]}}
+            for user_id in user_ids if user_id in self._by_id
+        ]
+
+    async def reward_period(self, period: str, rewards: List[Tuple[str, int]]):
+        for user_id, points in rewards:
+            user = self._by_id.get(user_id)
+            if user is not None and period not in user.get("rewarded_periods", []):
+                user["visupoints"] = user.get("visupoints", 0) + points
+                user.setdefault("rewarded_periods", []).append(period)
+
+class MemoryProjectRepository:
+    def __init__(self):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_user: Dict[str, List[str]] = defaultdict(list)
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, project_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        project = self._by_id.get(project_id)
+        if project is None or (user_id is not None and project["user_id"] != user_id):
+            return None
+        return _public(project)
+
+    async def get_owner(self, project_id: str) -> Optional[str]:
+        project = self._by_id.get(project_id)
+        return project["user_id"] if project else None
+
+    async def list_by_user(self, user_id: str, limit: int = 1000) -> List[Dict]:
+        return [_public(self._by_id[pid]) for pid in self._by_user.get(user_id, [])[:limit]]
+
+    async def owned_ids(self, user_id: str, project_ids: List[str]) -> Set[str]:
+        return {
+            pid for pid in project_ids
+            if pid in self._by_id and self._by_id[pid]["user_id"] == user_id
+        }
+
+    async def list_created(self, user_id: Optional[str] = None) -> List[Dict]:
+        ids = self._by_user.get(user_id, []) if user_id is not None else self._by_id
+        return [{"id": pid, "created_at": self._by_id[pid].get("created_at")} for pid in ids]
+
+    async def list_titles(self) -> List[Dict]:
+        return [{"id": p["id"], "user_id": p["user_id"], "title": p["title"]} for p in self._by_id.values()]
+
+    async def search(self, text: str, user_id: Optional[str], skip: int, limit: int) -> Tuple[int, List[Dict]]:
+        """Approximation de $text : mots exacts (sans racinisation), mêmes poids"""
+        terms = set(tokenize(text))
+        ids = self._by_user.get(user_id, []) if user_id is not None else self._by_id
+        scored = []
+        for pid in ids:
+            project = self._by_id[pid]
+            score = sum(
+                weight * sum(token in terms for token in tokenize(project.get(field)))
+                for field, weight in SEARCH_WEIGHTS.items()
+            )
+            if score:
+                scored.append((score, pid))
+        scored.sort(key=lambda item: -item[0])
+        return len(scored), [
+            {**{field: self._by_id[pid].get(field) for field in SEARCH_FIELDS}, "score": float(score)}
+            for score, pid in scored[skip:skip + limit]
+        ]
+
+    async def insert(self, project: Dict):
+        project = _public(project)
+        self._by_id[project["id"]] = project
+        self._by_user[project["user_id"]].append(project["id"])
+
+    async def insert_many(self, projects: List[Dict]) -> Dict[int, str]:
+        failed = {}
+        for position, project in enumerate(projects):
+            if project["id"] in self._by_id:
+                failed[position] = f"duplicate key: id {project['id']}"
+                continue
+            await self.insert(project)
+        return failed
+
+class MemoryAuthorizationRepository:
+    def __init__(self):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_user_project: Dict[tuple, str] = {}
+        self._by_project: Dict[str, Set[str]] = defaultdict(set)
+        self._by_user: Dict[str, List[str]] = defaultdict(list)
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, user_id: str, project_id: str, active_only: bool = False) -> Optional[Dict]:
+        auth = self._by_id.get(self._by_user_project.get((user_id, project_id)))
+        if auth is None or (active_only and auth["revoked"]):
+            return None
+        return _public(auth)
+
+    async def get_active_for_project(self, project_id: str) -> Optional[Dict]:
+        for auth_id in self._by_project.get(project_id, ()):
+            if not self._by_id[auth_id]["revoked"]:
+                return _public(self._by_id[auth_id])
+        return None
+
+    async def list_active(self, user_id: str, limit: int = 1000) -> List[Dict]:
+        active = [self._by_id[a] for a in self._by_user.get(user_id, []) if not self._by_id[a]["revoked"]]
+        return [_public(a) for a in active[:limit]]
+
+    async def active_platforms(self, user_id: str, project_ids: Iterable[str]) -> Dict[str, List[str]]:
+        platforms = {}
+        for project_id in project_ids:
+            auth = self._by_id.get(self._by_user_project.get((user_id, project_id)))
+            if auth is not None and not auth["revoked"]:
+                platforms[project_id] = list(auth["platforms"])
+        return platforms
+
+    async def all_active_platforms(self) -> Dict[str, List[str]]:
+        platforms: Dict[str, List[str]] = {}
+        for auth in self._by_id.values():
+            if not auth["revoked"]:
+                platforms.setdefault(auth["project_id"], []).extend(auth["platforms"])
+        return platforms
+
+    async def insert(self, authorization: Dict):
+        authorization = _public(authorization)
+        auth_id = authorization["id"]
+        self._by_id[auth_id] = authorization
+        self._by_user_project.setdefault((authorization["user_id"], authorization["project_id"]), auth_id)
+        self._by_project[authorization["project_id"]].add(auth_id)
+        self._by_user[authorization["user_id"]].append(auth_id)
+
+    async def insert_many(self, authorizations: List[Dict]):
+        for authorization in authorizations:
+            await self.insert(authorization)
+
+    async def update(self, authorization_id: str, fields: Dict):
+        auth = self._by_id.get(authorization_id)
+        if auth is not None:
+            auth.update(copy.deepcopy(fields))
+
+class MemoryStatsRepository:
+    def __init__(self):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_key: Dict[tuple, str] = {}
+        self._by_project: Dict[str, List[str]] = defaultdict(list)
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, project_id: str, platform: str) -> Optional[Dict]:
+        return _public(self._by_id.get(self._by_key.get((project_id, platform))))
+
+    async def list_by_project(self, project_id: str, limit: int = 10) -> List[Dict]:
+        return [_public(self._by_id[s]) for s in self._by_project.get(project_id, [])[:limit]]
+
+    async def latest_update(self, project_id: str) -> Optional[str]:
+        return max(
+            (self._by_id[s]["last_updated_at"] for s in self._by_project.get(project_id, [])),
+            default=None
+        )
+
+    def _select(self, project_ids: Optional[List[str]]) -> Iterable[Dict]:
+        if project_ids is None:
+            return self._by_id.values()
+        return (self._by_id[s] for pid in project_ids for s in self._by_project.get(pid, []))
+
+    async def latest_update_in(self, project_ids: Optional[List[str]] = None) -> Optional[str]:
+        return max((s["last_updated_at"] for s in self._select(project_ids)), default=None)
+
+    async def list_counters(self, project_ids: Optional[List[str]] = None) -> List[Dict]:
+        return [
+            {"project_id": s["project_id"], "platform": s["platform"], "views": s.get("views", 0), "clicks": s.get("clicks", 0)}
+            for s in self._select(project_ids)
+        ]
+
+    async def insert(self, stats: Dict) -> bool:
+        key = (stats["project_id"], stats["platform"])
+        if key in self._by_key:
+            return False
+        stats = _public(stats)
+        self._by_id[stats["id"]] = stats
+        self._by_key[key] = stats["id"]
+        self._by_project[stats["project_id"]].append(stats["id"])
+        return True
+
+    async def insert_many(self, stats: List[Dict]):
+        for doc in stats:
+            await self.insert(doc)
+
+    async def increment(self, stats_id: str, field: str, updated_at: str):
+        stats = self._by_id.get(stats_id)
+        if stats is not None:
+            stats[field] = stats.get(field, 0) + 1
+            stats["last_updated_at"] = updated_at
+
+class MemoryIdempotencyRepository:
+    def __init__(self):
+        self._records: Dict[tuple, Dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def get(self, user_id: str, key: str) -> Optional[Dict]:
+        record = self._records.get((user_id, key))
+        if record is None or record["expires_at"] < datetime.utcnow():
+            return None
+        return copy.deepcopy(record)
+
+    async def claim(self, user_id: str, key: str, fingerprint: str, token: str, locked_until: datetime) -> Optional[Dict]:
+        existing = await self.get(user_id, key)
+        if existing is not None:
+            return existing
+        self._records[(user_id, key)] = {
+            "user_id": user_id, "key": key, "fingerprint": fingerprint,
+            "token": token, "status": "pending", "expires_at": locked_until
+        }
+        return None
+
+    def _pending(self, user_id: str, key: str, token: str) -> Optional[Dict]:
+        record = self._records.get((user_id, key))
+        if record is not None and record["status"] == "pending" and record["token"] == token:
+            return record
+        return None
+
+    async def complete(self, user_id: str, key: str, token: str, fields: Dict):
+        record = self._pending(user_id, key, token)
+        if record is not None:
+            record.update(copy.deepcopy(fields), status="completed")
+
+    async def release(self, user_id: str, key: str, token: str):
+        if self._pending(user_id, key, token) is not None:
+            del self._records[(user_id, key)]
+
+def _score_key(score: Dict) -> Tuple[int, int, str]:
+    """Clé de tri dans l'ordre du classement (SCORE_SORT)"""
+    return -score.get("total_views", 0), -score.get("total_clicks", 0), score["user_id"]
+
+class MemoryLeaderboardRepository:
+    """
+    Mêmes sémantiques que la version MongoDB ; les jointures avec les projets
+    et les utilisateurs lisent les repositories en mémoire du même stockage.
+    """
+
+    def __init__(self, projects: MemoryProjectRepository, users: MemoryUserRepository):
+        self._projects = projects
+        self._users = users
+        # période -> (projet, plateforme) -> bucket
+        self._buckets: Dict[str, Dict[Tuple[str, str], Dict]] = defaultdict(dict)
+        # période -> porteur -> score
+        self._scores: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        # période -> clés triées des scores (_score_key), l'index du classement
+        self._ranking: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+        # période -> entrées figées, par rang croissant
+        self._snapshots: Dict[str, List[Dict]] = {}
+        self._periods: Dict[str, Dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def increment_bucket(self, period: str, project_id: str, platform: str, field: str, updated_at: str):
+        bucket = self._buckets[period].setdefault(
+            (project_id, platform), {"period": period, "project_id": project_id, "platform": platform}
+        )
+        bucket[field] = bucket.get(field, 0) + 1
+        bucket["last_updated_at"] = updated_at
+
+    async def insert_buckets(self, buckets: List[Dict]):
+        for bucket in buckets:
+            bucket = _public(bucket)
+            self._buckets[bucket["period"]][(bucket["project_id"], bucket["platform"])] = bucket
+
+    async def bucket_totals(self, first_period: str, last_period: str, project_ids: Optional[List[str]] = None) -> List[Dict]:
+        selected = set(project_ids) if project_ids is not None else None
+        totals: Dict[Tuple[str, str], Dict] = {}
+        for period, buckets in self._buckets.items():
+            if not first_period <= period <= last_period:
+                continue
+            for (project_id, platform), bucket in buckets.items():
+                if selected is not None and project_id not in selected:
+                    continue
+                total = totals.setdefault(
+                    (period, platform), {"period": period, "platform": platform, "views": 0, "clicks": 0}
+                )
+                total["views"] += bucket.get("views", 0)
+                total["clicks"] += bucket.get("clicks", 0)
+        return list(totals.values())
+
+    def _set_score(self, period: str, user_id: str, views: int, clicks: int):
+        """Met à jour un score et déplace sa clé dans l'index trié de la période"""
+        keys = self._ranking[period]
+        score = self._scores[period].get(user_id)
+        if score is None:
+            score = self._scores[period][user_id] = {"period": period, "user_id": user_id}
+        else:
+            del keys[bisect_left(keys, _score_key(score))]
+        score.update(total_views=views, total_clicks=clicks)
+        insort(keys, _score_key(score))
+
+    async def increment_score(self, period: str, user_id: str, field: str):
+        score = self._scores[period].get(user_id, {})
+        views, clicks = score.get("total_views", 0), score.get("total_clicks", 0)
+        if field == "views":
+            views += 1
+        else:
+            clicks += 1
+        self._set_score(period, user_id, views, clicks)
+
+    async def score_page(self, period: str, after: Optional[Tuple[int, int, str]], limit: int) -> List[Dict]:
+        keys = self._ranking.get(period, [])
+        start = 0
+        if after is not None:
+            views, clicks, user_id = after
+            start = bisect_right(keys, (-views, -clicks, user_id))
+        scores = self._scores[period]
+        return [_public(scores[user_id]) for _, _, user_id in keys[start:start + limit]]
+
+    async def get_score(self, period: str, user_id: str) -> Optional[Dict]:
+        return _public(self._scores.get(period, {}).get(user_id))
+
+    async def count_better(self, period: str, score: Dict) -> int:
+        return bisect_left(self._ranking.get(period, []), _score_key(score))
+
+    def _owner_totals(self, period: str) -> Dict[str, Dict]:
+        totals: Dict[str, Dict] = {}
+        for (project_id, _), bucket in self._buckets.get(period, {}).items():
+            project = self._projects._by_id.get(project_id)
+            if project is None:
+                continue
+            total = totals.setdefault(project["user_id"], {"total_views": 0, "total_clicks": 0})
+            total["total_views"] += bucket.get("views", 0)
+            total["total_clicks"] += bucket.get("clicks", 0)
+        return totals
+
+    async def rebuild_scores(self, period: str) -> int:
+        totals = self._owner_totals(period)
+        for user_id, total in totals.items():
+            self._set_score(period, user_id, total["total_views"], total["total_clicks"])
+        return len(totals)
+
+    async def ranking(self, period: str) -> AsyncIterator[Dict]:
+        totals = self._owner_totals(period)
+        for user_id in sorted(totals, key=lambda u: _score_key({"user_id": u, **totals[u]})):
+            user = self._users._by_id.get(user_id)
+            if user is None:
+                continue
+            yield {
+                "user_id": user_id,
+                **{field: copy.deepcopy(user[field]) for field in PROFILE_FIELDS if field in user},
+                **totals[user_id]
+            }
+
+    async def is_closed(self, period: str) -> bool:
+        record = self._periods.get(period)
+        return record is not None and record["status"] == "closed"
+
+    async def lock_period(self, period: str, now: datetime, locked_until: datetime) -> Optional[Dict]:
+        record = self._periods.get(period)
+        if record is None:
+            record = self._periods[period] = {"_id": period, "started_at": now.isoformat()}
+        elif record["status"] != "pending" or record["locked_until"] >= now.isoformat():
+            return copy.deepcopy(record)
+        record.update(status="pending", locked_until=locked_until.isoformat())
+        return None
+
+    async def finish_period(self, period: str, fields: Dict):
+        record = self._periods.get(period)
+        if record is not None:
+            record.update(copy.deepcopy(fields), status="closed")
+            record.pop("locked_until", None)
+
+    async def delete_snapshots(self, period: str):
+        self._snapshots.pop(period, None)
+
+    async def insert_snapshots(self, entries: List[Dict]):
+        for entry in entries:
+            entry = _public(entry)
+            snapshots = self._snapshots.setdefault(entry["period"], [])
+            snapshots.insert(bisect_right(snapshots, entry["rank"], key=itemgetter("rank")), entry)
+
+    async def snapshot_page(self, period: str, after_rank: Optional[int], limit: int) -> List[Dict]:
+        snapshots = self._snapshots.get(period, [])
+        start = bisect_right(snapshots, after_rank, key=itemgetter("rank")) if after_rank is not None else 0
+        return [_public(entry) for entry in snapshots[start:start + limit]]
+
+    async def get_snapshot(self, period: str, user_id: str) -> Optional[Dict]:
+        return next((_public(e) for e in self._snapshots.get(period, []) if e["user_id"] == user_id), None)
+
+# ============================================================================
+# Point d'entrée
+# ============================================================================
+
+class Storage:
+    """Accès aux données de l'API : un repository par collection"""
+
+    def __init__(self, users, projects, authorizations, stats, idempotency, leaderboard):
+        self.users = users
+        self.projects = projects
+        self.authorizations = authorizations
+        self.stats = stats
+        self.idempotency = idempotency
+        self.leaderboard = leaderboard
+
+    async def ensure_indexes(self):
+        await self.users.ensure_indexes()
+        await self.projects.ensure_indexes()
+        await self.authorizations.ensure_indexes()
+        await self.stats.ensure_indexes()
+        await self.idempotency.ensure_indexes()
+        await self.leaderboard.ensure_indexes()
+
+class MongoStorage(Storage):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__(
+            MongoUserRepository(db),
+            MongoProjectRepository(db),
+            MongoAuthorizationRepository(db),
+            MongoStatsRepository(db),
+            MongoIdempotencyRepository(db),
+            MongoLeaderboardRepository(db)
+        )
+
+class MemoryStorage(Storage):
+    def __init__(self):
+        users, projects = MemoryUserRepository(), MemoryProjectRepository()
+        super().__init__(
+            users,
+            projects,
+            MemoryAuthorizationRepository(),
+            MemoryStatsRepository(),
+            MemoryIdempotencyRepository(),
+            MemoryLeaderboardRepository(projects, users)
+        )
+
+def create_storage(db: AsyncIOMotorDatabase) -> Storage:
+    """Stockage MongoDB, ou en mémoire si STORAGE_BACKEND=memory"""
+    if settings.STORAGE_BACKEND == "memory":
+        logger.warning("Storage backend: memory (data is not persisted)")
+        return MemoryStorage()
+    return MongoStorage(db)
@@ -0,0 +1,156 @@
+import asyncio
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Mots en minuscules, sans accents ("Été à Paris" -> ["ete", "a", "paris"])"""
+    text = text or ""
+    if text.isascii():
+        return _WORD.findall(text.lower())
+    decomposed = unicodedata.normalize("NFKD", text)
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WORD.findall(ascii_text.lower())
+
+class _IndexState:
+    """Contenu de l'index, remplacé d'un bloc à chaque rechargement"""
+
+    def __init__(self):
+        self.terms: List[str] = []
+        self.postings: Dict[str, List[str]] = defaultdict(list)
+        # projet -> (propriétaire, titre, mots du titre)
+        self.projects: Dict[str, Tuple[str, str, FrozenSet[str]]] = {}
+        self.by_user: Dict[str, List[str]] = defaultdict(list)
+
+    def add(self, project_id: str, user_id: str, title: str, sort_terms: bool = True):
+        if project_id in self.projects:
+            return
+        tokens = frozenset(tokenize(title))
+        self.projects[project_id] = (user_id, title, tokens)
+        self.by_user[user_id].append(project_id)
+        for token in tokens:
+            postings = self.postings[token]
+            if not postings:
+                if sort_terms:
+                    insort(self.terms, token)
+                else:
+                    self.terms.append(token)
+            postings.append(project_id)
+
+def _build(projects: List[Dict]) -> _IndexState:
+    state = _IndexState()
+    for project in projects:
+        state.add(project["id"], project["user_id"], project["title"], sort_terms=False)
+    state.terms.sort()
+    return state
+
+def _matches(tokens: FrozenSet[str], prefixes: List[str]) -> bool:
+    return all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes)
+
+class ProjectPrefixIndex:
+    """
+    Index en mémoire des titres de projets, pour l'autocomplétion.
+
+    Les mots des titres sont gardés dans une liste triée : les mots qui
+    commencent par un préfixe forment une tranche contiguë, trouvée par
+    dichotomie, ce qui sert de trie compact. Chaque mot pointe vers ses
+    projets. Pour une requête de plusieurs mots, les candidats viennent du
+    préfixe le plus long (le plus sélectif) et les autres mots sont vérifiés
+    sur les mots du titre.
+
+    Chargé en tâche de fond au démarrage, puis rechargé périodiquement pour
+    voir les projets créés par les autres workers ; les projets créés par ce
+    worker y sont ajoutés tout de suite.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._state = _IndexState()
+        # Projets ajoutés pendant un rechargement, réappliqués ensuite
+        self._pending: Optional[List[Tuple[str, str, str]]] = None
+        self.loaded = False
+
+    def add(self, project_id: str, user_id: str, title: str):
+        self._state.add(project_id, user_id, title)
+        if self._pending is not None:
+            self._pending.append((project_id, user_id, title))
+
+    def _candidates(self, prefix: str) -> Iterator[str]:
+        terms = self._state.terms
+        seen = set()
+        for i in range(bisect_left(terms, prefix), len(terms)):
+            if not terms[i].startswith(prefix):
+                return
+            for project_id in self._state.postings[terms[i]]:
+                if project_id not in seen:
+                    seen.add(project_id)
+                    yield project_id
+
+    def complete(self, query: str, user_id: Optional[str], offset: int, limit: int) -> Tuple[List[Dict], bool]:
+        """
+        Projets dont le titre contient un mot commençant par chacun des mots
+        de `query` : (page de résultats, vrai s'il y en a d'autres). Avec
+        `user_id`, seulement les projets de cet utilisateur.
+        """
+        prefixes = tokenize(query)
+        if not prefixes:
+            return [], False
+        state = self._state
+        if user_id is not None:
+            candidates: Iterable[str] = sorted(
+                state.by_user.get(user_id, []),
+                key=lambda project_id: state.projects[project_id][1].lower()
+            )
+        else:
+            candidates = self._candidates(max(prefixes, key=len))
+
+        results = []
+        for project_id in candidates:
+            _, title, tokens = state.projects[project_id]
+            if _matches(tokens, prefixes):
+                results.append({"id": project_id, "title": title})
+                if len(results) > offset + limit:
+                    break
+        return results[offset:offset + limit], len(results) > offset + limit
+
+    async def load(self, storage):
+        """Rechargement complet ; l'index est construit dans un thread puis remplacé"""
+        self._pending = []
+        try:
+            projects = await storage.projects.list_titles()
+            state = await asyncio.to_thread(_build, projects)
+        finally:
+            pending, self._pending = self._pending, None
+        for project in pending:
+            state.add(*project)
+        self._state = state
+        self.loaded = True
+        logger.info(f"Project search index loaded: {len(state.projects)} projects, {len(state.terms)} terms")
+
+    async def run(self, storage):
+        """Chargement initial puis rechargements périodiques"""
+        delay = 0
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.refresh_interval
+            try:
+                await self.load(storage)
+            except Exception:
+                logger.exception("Project search index reload failed")
+
+    def report(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "projects": len(self._state.projects),
+            "terms": len(self._state.terms)
+        }
+
+search_index = ProjectPrefixIndex(settings.SEARCH_INDEX_REFRESH_SECONDS)
@@ -1,12 +1,14 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Request
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Request, Response, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 from datetime import timedelta
 from typing import List, Optional
-import os
+import asyncio
 import logging
-from pathlib import Path
+import math
 
 # Import des modules locaux
 from config import settings
@@ -14,50 +16,150 @@ from models import (
     UserCreate, UserLogin, User, UserResponse, Token,
     ProjectCreate, Project,
     AuthorizeShareRequest, AuthorizeShareResponse, SocialAuthorization,
+    BatchShareLinksRequest,
     SocialStats, TrackEventRequest, EventType,
-    LeaderboardEntry, SocialPlatform
+    LeaderboardEntry, SocialPlatform, AnalyticsScope, CohortMetric
 )
 from auth import (
     get_password_hash, verify_password, create_access_token,
     get_current_user, security
 )
 from social_service import social_service
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from cache import cache, RedisBackend
+from singleflight import singleflight
+from conditional import make_etag, body_etag, etag_matches, set_validators, not_modified
+from stats_hub import stats_hub
+from timing import ServerTimingMiddleware, TimedDatabase, span
+from profiler import profiler, ProfilerTriggerMiddleware
+from query_log import slow_query_log
+from repositories import Storage, create_storage
+from database import create_mongo_client, warm_up, mongo_status
+from structured_logging import setup_logging, RequestIdMiddleware
+from compression import compressor, CompressionMiddleware
+from rate_limit import track_limiter
+from authorization_index import authorization_index
+from admission import admission, AdmissionMiddleware
+from idempotency import idempotency
+from search_index import search_index
+from bulk_import import ImportResponse, ProjectImport, create_parser, iter_items
+from metrics import (
+    InstrumentedRoute, monitor_event_loop_lag,
+    register_app_collector, metrics_response
 )
+import leaderboard
+import analytics
+
+# Configuration du logging (file non bloquante, écriture par un thread dédié)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-mongo_url = settings.MONGO_URL
-client = AsyncIOMotorClient(mongo_url)
-db = client[settings.DB_NAME]
+# MongoDB connection (créée dans le lifespan du worker)
+client: Optional[AsyncIOMotorClient] = None
+db = None
+storage: Optional[Storage] = None
+
+def use_database(mongo_client):
+    """Installe le client MongoDB et en dérive la base et le stockage"""
+    global client, db, storage
+    client = mongo_client
+    db = client[settings.DB_NAME]
+    if settings.SERVER_TIMING_ENABLED:
+        db = TimedDatabase(db)
+    storage = create_storage(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage du worker : connexion, préchauffage du pool et index avant de
+    se déclarer prêt, puis tâches de fond. Un client déjà installé (tests,
+    bancs de mesure) est conservé tel quel.
+    """
+    app.state.ready = False
+    if client is None:
+        use_database(create_mongo_client())
+        await warm_up(client, settings.MONGO_MIN_POOL_SIZE)
+    await ensure_indexes()
+    await authorization_index.load(storage)
+    slow_query_log.attach(client, asyncio.get_running_loop())
+    
+    app.state.leaderboard_task = asyncio.create_task(
+        leaderboard.run_close_scheduler(storage, settings.LEADERBOARD_CLOSE_INTERVAL_SECONDS)
+    )
+    redis_client = cache.backend.client if isinstance(cache.backend, RedisBackend) else None
+    if redis_client is not None and settings.TRACK_RATE_LIMIT_SHARED:
+        track_limiter.use_redis(redis_client)
+    app.state.stats_hub_task = asyncio.create_task(stats_hub.run(
+        lambda project_id: fetch_project_stats(project_id, storage), redis_client
+    ))
+    app.state.loop_lag_task = asyncio.create_task(
+        monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
+    )
+    app.state.authorization_index_task = asyncio.create_task(
+        authorization_index.run(storage, redis_client)
+    )
+    app.state.search_index_task = asyncio.create_task(search_index.run(storage))
+    app.state.ready = True
+    
+    yield
+    
+    app.state.ready = False
+    tasks = [
+        app.state.leaderboard_task,
+        app.state.stats_hub_task,
+        app.state.loop_lag_task,
+        app.state.authorization_index_task,
+        app.state.search_index_task
+    ]
+    for task in tasks:
+        task.cancel()
+    # Tâches terminées avant de fermer le cache et le client qu'elles utilisent
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await cache.close()
+    client.close()
 
 # Create the main app
-app = FastAPI(title="VISUAL Social Promotion API")
+app = FastAPI(title="VISUAL Social Promotion API", lifespan=lifespan)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
+
+# Compteurs internes exposés sur /metrics
+register_app_collector(cache, singleflight, stats_hub)
 
 # Dependency pour obtenir la base de données
 async def get_db():
     return db
 
+# Dependency pour obtenir le stockage (repositories users, projects, authorizations, stats, leaderboard)
+async def get_storage() -> Storage:
+    return storage
+
 # Dependency pour obtenir l'utilisateur actuel
-async def get_current_user_dep(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    return await get_current_user(credentials, db)
+async def get_current_user_dep(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    storage: Storage = Depends(get_storage)
+):
+    with span("auth"):
+        return await get_current_user(credentials, storage.users)
+
+# Dependency pour les routes réservées aux administrateurs
+async def get_admin_user_dep(current_user: User = Depends(get_current_user_dep)):
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs"
+        )
+    return current_user
 
 # ============================================================================
 # AUTH ROUTES
 # ============================================================================
 
 @api_router.post("/auth/register", response_model=UserResponse)
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, storage: Storage = Depends(get_storage)):
     """Inscription d'un nouveau porteur/créateur"""
     # Vérifier si l'email existe déjà
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await storage.users.get_by_email(user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -75,14 +177,19 @@ async def register(user_data: UserCreate):
     user_dict = user.model_dump()
     user_dict['created_at'] = user_dict['created_at'].isoformat()
     
-    await db.users.insert_one(user_dict)
+    # Index unique : une inscription concurrente avec le même email échoue ici
+    if not await storage.users.insert(user_dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email déjà enregistré"
+        )
     
     return UserResponse(**user.model_dump())
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, storage: Storage = Depends(get_storage)):
     """Connexion d'un porteur"""
-    user_data = await db.users.find_one({"email": credentials.email})
+    user_data = await storage.users.get_by_email(credentials.email)
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,12 +220,7 @@ async def get_me(current_user: User = Depends(get_current_user_dep)):
 # PROJECT ROUTES
 # ============================================================================
 
-@api_router.post("/projects", response_model=Project)
-async def create_project(
-    project_data: ProjectCreate,
-    current_user: User = Depends(get_current_user_dep)
-):
-    """Créer un nouveau projet"""
+async def _create_project(project_data: ProjectCreate, current_user: User, storage: Storage) -> Project:
     project = Project(
         user_id=current_user.id,
         **project_data.model_dump()
@@ -128,16 +230,70 @@ async def create_project(
     project_dict['created_at'] = project_dict['created_at'].isoformat()
     project_dict['updated_at'] = project_dict['updated_at'].isoformat()
     
-    await db.projects.insert_one(project_dict)
+    await storage.projects.insert(project_dict)
+    # Version de la liste des projets (validateur ETag de GET /projects)
+    await storage.users.bump_projects_version(current_user.id)
+    search_index.add(project.id, current_user.id, project.title)
     
     return project
 
+@api_router.post("/projects", response_model=Project)
+async def create_project(
+    request: Request,
+    project_data: ProjectCreate,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """Créer un nouveau projet (rejouable avec l'en-tête Idempotency-Key)"""
+    return await idempotency.run(
+        request, storage, current_user.id,
+        lambda: _create_project(project_data, current_user, storage)
+    )
+
+@api_router.post("/projects/bulk")
+async def import_projects(
+    request: Request,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Importer des projets en masse, lus et validés au fil de l'envoi : un
+    tableau JSON (application/json) ou un projet par ligne
+    (application/x-ndjson), avec les champs de POST /projects.
+    
+    Réponse NDJSON : tant que le corps est lu, une ligne {"progress": ...}
+    toutes les BULK_IMPORT_PROGRESS_SECONDS ; puis un résultat par élément,
+    dans l'ordre ({"index", "status": "created", "id"} ou {"index",
+    "status": "error", "error"}), et une ligne {"summary": ...}. Un corps illisible arrête
+    l'import (`aborted`) ; les projets déjà lus sont conservés.
+    """
+    parser = create_parser(request.headers.get("content-type", ""), settings.BULK_IMPORT_MAX_ITEM_BYTES)
+    if parser is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Corps attendu : tableau JSON (application/json) ou NDJSON (application/x-ndjson)"
+        )
+    
+    job = ProjectImport(storage, current_user.id)
+    return ImportResponse(
+        job.stream(iter_items(request.stream(), parser), settings.BULK_IMPORT_PROGRESS_SECONDS),
+        media_type="application/x-ndjson"
+    )
+
 @api_router.get("/projects", response_model=List[Project])
 async def get_projects(
-    current_user: User = Depends(get_current_user_dep)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
     """Obtenir tous les projets de l'utilisateur"""
-    projects = await db.projects.find({"user_id": current_user.id}, {"_id": 0}).to_list(1000)
+    etag = make_etag("projects", current_user.id, current_user.projects_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    
+    projects = await storage.projects.list_by_user(current_user.id)
     
     for project in projects:
         if isinstance(project.get('created_at'), str):
@@ -149,13 +305,68 @@ async def get_projects(
     
     return projects
 
+# Déclarée avant /projects/{project_id}, qui capturerait "search"
+@api_router.get("/projects/search")
+async def search_projects(
+    q: str = Query(..., min_length=1, max_length=200),
+    prefix: bool = False,
+    page: int = Query(1, ge=1, le=100),
+    page_size: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Rechercher des projets : ceux de l'utilisateur, ou toute la plateforme
+    pour un administrateur.
+    
+    - Par défaut, recherche plein texte sur le titre et la description,
+      triée par pertinence ; les pages sont mises en cache.
+    - `prefix=true` : autocomplétion sur les mots du titre, servie par
+      l'index en mémoire du worker.
+    """
+    owner = None if current_user.is_admin else current_user.id
+    skip = (page - 1) * page_size
+    
+    if prefix and search_index.loaded:
+        with span("search_index"):
+            results, has_more = search_index.complete(q, owner, skip, page_size)
+        return {
+            "query": q, "mode": "prefix", "page": page, "page_size": page_size,
+            "has_more": has_more, "results": results
+        }
+    
+    async def load_page():
+        total, results = await storage.projects.search(q, owner, skip, page_size)
+        return {"total": total, "results": results}
+    
+    # Portée utilisateur : versionnée par ses projets ; plateforme : TTL court
+    version = current_user.projects_version if owner else None
+    cache_key = make_etag("search", owner or "platform", version, q.strip(), page, page_size).strip('"')
+    result = await singleflight.do(
+        ("project_search", cache_key),
+        lambda: cache.get_or_set(
+            "project_search", cache_key, load_page,
+            ttl=settings.SEARCH_CACHE_TTL_SECONDS if owner is None else None
+        )
+    )
+    return {
+        "query": q, "mode": "text", "page": page, "page_size": page_size,
+        "total": result["total"], "has_more": skip + page_size < result["total"],
+        "results": result["results"]
+    }
+
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(
     project_id: str,
-    current_user: User = Depends(get_current_user_dep)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
     """Obtenir un projet spécifique"""
-    project_data = await db.projects.find_one({"id": project_id, "user_id": current_user.id}, {"_id": 0})
+    # Existence vérifiée avant le validateur : un projet supprimé (ou d'un
+    # autre utilisateur) répond 404 même si le client présente un ancien ETag
+    project_data = await storage.projects.get(project_id, current_user.id)
     
     if not project_data:
         raise HTTPException(
@@ -163,6 +374,10 @@ async def get_project(
             detail="Projet non trouvé"
         )
     
+    etag = make_etag("project", current_user.id, project_id, current_user.projects_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     if isinstance(project_data.get('created_at'), str):
         from datetime import datetime
         project_data['created_at'] = datetime.fromisoformat(project_data['created_at'])
@@ -170,30 +385,21 @@ async def get_project(
         from datetime import datetime
         project_data['updated_at'] = datetime.fromisoformat(project_data['updated_at'])
     
+    set_validators(response, etag)
     return Project(**project_data)
 
 # ============================================================================
 # SOCIAL PROMOTION ROUTES
 # ============================================================================
 
-@api_router.post("/social/authorize", response_model=AuthorizeShareResponse)
-async def authorize_share(
+async def _authorize_share(
     request: Request,
     auth_request: AuthorizeShareRequest,
-    current_user: User = Depends(get_current_user_dep)
-):
-    """
-    Autoriser la diffusion d'un projet sur les réseaux sociaux VISUAL.
-    
-    Cette route :
-    1. Enregistre l'autorisation de l'utilisateur
-    2. Initialise les statistiques pour chaque plateforme
-    3. Génère les liens de partage avec tracking UTM
-    4. Attribue le badge 'Ambassadeur VISUAL' si premier projet autorisé
-    5. Récompense avec des VISUpoints bonus
-    """
+    current_user: User,
+    storage: Storage
+) -> AuthorizeShareResponse:
     # Vérifier que le projet appartient à l'utilisateur
-    project = await db.projects.find_one({"id": auth_request.project_id, "user_id": current_user.id})
+    project = await storage.projects.get(auth_request.project_id, current_user.id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -204,24 +410,18 @@ async def authorize_share(
     client_ip = request.client.host if request.client else None
     
     # Créer ou mettre à jour l'autorisation
-    existing_auth = await db.social_authorizations.find_one({
-        "user_id": current_user.id,
-        "project_id": auth_request.project_id
-    })
+    existing_auth = await storage.authorizations.get(current_user.id, auth_request.project_id)
     
     if existing_auth:
         # Mettre à jour l'autorisation existante
         from datetime import datetime
-        await db.social_authorizations.update_one(
-            {"id": existing_auth["id"]},
-            {"$set": {
-                "platforms": [p.value for p in auth_request.platforms],
-                "authorized_at": datetime.utcnow().isoformat(),
-                "authorized_ip": client_ip,
-                "revoked": False,
-                "revoked_at": None
-            }}
-        )
+        await storage.authorizations.update(existing_auth["id"], {
+            "platforms": [p.value for p in auth_request.platforms],
+            "authorized_at": datetime.utcnow().isoformat(),
+            "authorized_ip": client_ip,
+            "revoked": False,
+            "revoked_at": None
+        })
         auth_id = existing_auth["id"]
     else:
         # Créer une nouvelle autorisation
@@ -236,15 +436,15 @@ async def authorize_share(
         auth_dict['authorized_at'] = auth_dict['authorized_at'].isoformat()
         auth_dict['platforms'] = [p.value for p in auth_request.platforms]
         
-        await db.social_authorizations.insert_one(auth_dict)
+        await storage.authorizations.insert(auth_dict)
         auth_id = authorization.id
     
+    # Le tracking est accepté pour ces plateformes dès maintenant (tous les workers)
+    await authorization_index.update(auth_request.project_id, [p.value for p in auth_request.platforms])
+    
     # Initialiser les statistiques pour chaque plateforme
     for platform in auth_request.platforms:
-        existing_stats = await db.social_stats.find_one({
-            "project_id": auth_request.project_id,
-            "platform": platform.value
-        })
+        existing_stats = await storage.stats.get(auth_request.project_id, platform.value)
         
         if not existing_stats:
             stats = SocialStats(
@@ -256,18 +456,18 @@ async def authorize_share(
             stats_dict['last_updated_at'] = stats_dict['last_updated_at'].isoformat()
             stats_dict['platform'] = platform.value
             
-            await db.social_stats.insert_one(stats_dict)
+            await storage.stats.insert(stats_dict)
     
     # Attribuer le badge "Ambassadeur VISUAL" si c'est la première autorisation
     if not existing_auth:
         if "Ambassadeur VISUAL" not in current_user.badges:
-            await db.users.update_one(
-                {"id": current_user.id},
-                {"$push": {"badges": "Ambassadeur VISUAL"}, "$inc": {"visupoints": 100}}
-            )
+            await storage.users.award_badge(current_user.id, "Ambassadeur VISUAL", 100)
     
     # Générer les liens de partage
     links = social_service.generate_share_links(auth_request.project_id, auth_request.platforms)
+    # Changement de version plutôt que delete : un get_or_set concurrent,
+    # commencé avant l'autorisation, ne peut pas réécrire d'anciens liens
+    await cache.invalidate("share_links")
     
     return AuthorizeShareResponse(
         project_id=auth_request.project_id,
@@ -276,16 +476,38 @@ async def authorize_share(
         message="Autorisation enregistrée avec succès. Vous avez reçu le badge 'Ambassadeur VISUAL' et 100 VISUpoints !"
     )
 
+@api_router.post("/social/authorize", response_model=AuthorizeShareResponse)
+async def authorize_share(
+    request: Request,
+    auth_request: AuthorizeShareRequest,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Autoriser la diffusion d'un projet sur les réseaux sociaux VISUAL.
+    
+    Cette route :
+    1. Enregistre l'autorisation de l'utilisateur
+    2. Initialise les statistiques pour chaque plateforme
+    3. Génère les liens de partage avec tracking UTM
+    4. Attribue le badge 'Ambassadeur VISUAL' si premier projet autorisé
+    5. Récompense avec des VISUpoints bonus
+    
+    Rejouable avec l'en-tête Idempotency-Key.
+    """
+    return await idempotency.run(
+        request, storage, current_user.id,
+        lambda: _authorize_share(request, auth_request, current_user, storage)
+    )
+
 @api_router.post("/social/revoke")
 async def revoke_authorization(
     project_id: str,
-    current_user: User = Depends(get_current_user_dep)
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
     """Révoquer l'autorisation de diffusion pour un projet"""
-    auth = await db.social_authorizations.find_one({
-        "user_id": current_user.id,
-        "project_id": project_id
-    })
+    auth = await storage.authorizations.get(current_user.id, project_id)
     
     if not auth:
         raise HTTPException(
@@ -294,222 +516,486 @@ async def revoke_authorization(
         )
     
     from datetime import datetime
-    await db.social_authorizations.update_one(
-        {"id": auth["id"]},
-        {"$set": {
-            "revoked": True,
-            "revoked_at": datetime.utcnow().isoformat()
-        }}
-    )
+    await storage.authorizations.update(auth["id"], {
+        "revoked": True,
+        "revoked_at": datetime.utcnow().isoformat()
+    })
+    # Les événements de tracking du projet sont refusés dès maintenant
+    await authorization_index.update(project_id, [])
+    await cache.invalidate("share_links")
     
     return {"success": True, "message": "Autorisation révoquée avec succès"}
 
 @api_router.get("/social/authorizations")
 async def get_authorizations(
-    current_user: User = Depends(get_current_user_dep)
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
     """Obtenir toutes les autorisations de l'utilisateur"""
-    authorizations = await db.social_authorizations.find(
-        {"user_id": current_user.id, "revoked": False},
-        {"_id": 0}
-    ).to_list(1000)
+    authorizations = await storage.authorizations.list_active(current_user.id)
     
     return {"authorizations": authorizations}
 
 @api_router.get("/social/links/{project_id}")
 async def get_share_links(
     project_id: str,
-    current_user: User = Depends(get_current_user_dep)
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
     """Obtenir les liens de partage pour un projet"""
-    # Vérifier que le projet appartient à l'utilisateur
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Projet non trouvé"
-        )
+    async def load_links():
+        # Vérifier que le projet appartient à l'utilisateur
+        project = await storage.projects.get(project_id, current_user.id)
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Projet non trouvé"
+            )
+        
+        # Vérifier qu'une autorisation existe
+        auth = await storage.authorizations.get(current_user.id, project_id, active_only=True)
+        
+        if not auth:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Aucune autorisation active pour ce projet"
+            )
+        
+        # Générer les liens
+        platforms = [SocialPlatform(p) for p in auth["platforms"]]
+        return social_service.generate_share_links(project_id, platforms)
     
-    # Vérifier qu'une autorisation existe
-    auth = await db.social_authorizations.find_one({
-        "user_id": current_user.id,
-        "project_id": project_id,
-        "revoked": False
-    })
+    links = await cache.get_or_set("share_links", f"{current_user.id}:{project_id}", load_links)
     
-    if not auth:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Aucune autorisation active pour ce projet"
-        )
+    return {"project_id": project_id, "links": links}
+
+@api_router.post("/social/links/batch")
+async def get_share_links_batch(
+    batch: BatchShareLinksRequest,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Obtenir les liens de partage de plusieurs projets en un seul appel.
     
-    # Générer les liens
-    platforms = [SocialPlatform(p) for p in auth["platforms"]]
-    links = social_service.generate_share_links(project_id, platforms)
+    Propriété et autorisations sont résolues avec deux requêtes `$in`.
+    Les erreurs sont rapportées par projet, sans interrompre le lot.
+    """
+    project_ids = list(dict.fromkeys(batch.project_ids))
     
-    return {"project_id": project_id, "links": links}
+    # Projets appartenant à l'utilisateur
+    owned_ids = await storage.projects.owned_ids(current_user.id, project_ids)
+    
+    # Autorisations actives pour ces projets
+    platforms_by_project = await storage.authorizations.active_platforms(current_user.id, owned_ids)
+    
+    results = []
+    for project_id in project_ids:
+        if project_id not in owned_ids:
+            results.append({"project_id": project_id, "error": "Projet non trouvé"})
+            continue
+        
+        if project_id not in platforms_by_project:
+            results.append({"project_id": project_id, "error": "Aucune autorisation active pour ce projet"})
+            continue
+        
+        platforms = [SocialPlatform(p) for p in platforms_by_project[project_id]]
+        links = social_service.generate_share_links(project_id, platforms)
+        results.append({"project_id": project_id, "links": links})
+    
+    return {"results": results}
+
+async def fetch_project_stats(project_id: str, storage: Storage) -> dict:
+    """Statistiques agrégées d'un projet (sans contrôle de propriété)"""
+    stats = await storage.stats.list_by_project(project_id)
+    
+    total_views = sum(s.get("views", 0) for s in stats)
+    total_clicks = sum(s.get("clicks", 0) for s in stats)
+    
+    return {
+        "project_id": project_id,
+        "total_views": total_views,
+        "total_clicks": total_clicks,
+        "by_platform": stats
+    }
 
 @api_router.get("/social/stats/{project_id}")
 async def get_project_stats(
     project_id: str,
-    current_user: User = Depends(get_current_user_dep)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
 ):
-    """Obtenir les statistiques de promotion d'un projet"""
-    # Vérifier que le projet appartient à l'utilisateur
-    project = await db.projects.find_one({"id": project_id, "user_id": current_user.id})
+    """
+    Obtenir les statistiques de promotion d'un projet.
+    
+    Validateur : la date de dernière mise à jour des stats du projet. Pour une
+    requête conditionnelle, elle est lue via index avant toute agrégation et
+    un client à jour reçoit un 304 ; sinon la réponse vient directement du
+    cache et l'ETag est dérivé du corps servi.
+    """
+    if request.headers.get("if-none-match"):
+        # Propriété vérifiée avant le 304 : la date de mise à jour d'un projet
+        # ne doit pas être lisible par un autre utilisateur
+        project, latest = await asyncio.gather(
+            storage.projects.get(project_id, current_user.id),
+            storage.stats.latest_update(project_id)
+        )
+        if project and latest:
+            etag = make_etag("stats", current_user.id, project_id, latest)
+            if etag_matches(request, etag):
+                return not_modified(etag, latest)
+    
+    async def load_stats():
+        # Vérifier que le projet appartient à l'utilisateur
+        project = await storage.projects.get(project_id, current_user.id)
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Projet non trouvé"
+            )
+        
+        return await fetch_project_stats(project_id, storage)
+    
+    cache_key = f"{current_user.id}:{project_id}"
+    payload = await singleflight.do(
+        ("stats", current_user.id, project_id),
+        lambda: cache.get_or_set("stats", cache_key, load_stats, ttl=settings.CACHE_STATS_TTL_SECONDS)
+    )
+    
+    # L'ETag décrit le corps envoyé (éventuellement servi depuis le cache)
+    served_latest = max((s["last_updated_at"] for s in payload["by_platform"]), default=None)
+    if served_latest:
+        set_validators(response, make_etag("stats", current_user.id, project_id, served_latest), served_latest)
+    
+    return payload
+
+@api_router.get("/social/stats/{project_id}/stream")
+async def stream_project_stats(
+    project_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Flux Server-Sent Events des statistiques d'un projet.
+    
+    Une trame initiale est envoyée, puis au plus une trame par intervalle
+    (STATS_STREAM_INTERVAL_SECONDS) quand des événements ont été trackés.
+    """
+    project = await storage.projects.get(project_id, current_user.id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Projet non trouvé"
         )
     
-    # Récupérer les statistiques
-    stats = await db.social_stats.find({"project_id": project_id}, {"_id": 0}).to_list(10)
+    subscription = stats_hub.subscribe(project_id)
     
-    total_views = sum(s.get("views", 0) for s in stats)
-    total_clicks = sum(s.get("clicks", 0) for s in stats)
+    async def events():
+        try:
+            yield stats_hub.encode(await fetch_project_stats(project_id, storage))
+            while not await request.is_disconnected():
+                frame = await subscription.next(settings.STATS_STREAM_KEEPALIVE_SECONDS)
+                yield frame if frame is not None else b": keepalive\n\n"
+        finally:
+            stats_hub.unsubscribe(subscription)
     
-    return {
-        "project_id": project_id,
-        "total_views": total_views,
-        "total_clicks": total_clicks,
-        "by_platform": stats
-    }
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @api_router.post("/social/track")
-async def track_event(event: TrackEventRequest):
+async def track_event(
+    event: TrackEventRequest,
+    request: Request,
+    storage: Storage = Depends(get_storage)
+):
     """
     Tracker un événement (vue ou clic) sur un lien de partage.
-    Cette route peut être appelée publiquement (pas d'authentification requise)
+    Cette route peut être appelée publiquement (pas d'authentification requise).
+    Les événements d'un projet non autorisé sur la plateforme sont refusés
+    depuis l'index en mémoire (avant tout accès à la base quand le relais
+    Redis est actif), et les autres limités par IP cliente et projet.
     """
+    if not await authorization_index.check(storage, event.project_id, event.platform.value):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aucune autorisation de diffusion active pour ce projet sur cette plateforme"
+        )
+    
+    client_ip = request.client.host if request.client else None
+    allowed, retry_after = await track_limiter.hit(client_ip, event.project_id)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop d'événements pour ce projet, réessayez plus tard",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    
+    from datetime import datetime
+    now = datetime.utcnow()
+    field_to_update = "views" if event.event_type == EventType.VIEW else "clicks"
+    
     # Mettre à jour les statistiques
-    stats = await db.social_stats.find_one({
-        "project_id": event.project_id,
-        "platform": event.platform.value
-    })
+    stats = await storage.stats.get(event.project_id, event.platform.value)
     
     if not stats:
         # Créer les stats si elles n'existent pas
         new_stats = SocialStats(
             project_id=event.project_id,
-            platform=event.platform
+            platform=event.platform,
+            last_updated_at=now
         )
         stats_dict = new_stats.model_dump()
         stats_dict['last_updated_at'] = stats_dict['last_updated_at'].isoformat()
         stats_dict['platform'] = event.platform.value
+        stats_dict[field_to_update] = 1
         
-        if event.event_type == EventType.VIEW:
-            stats_dict['views'] = 1
-        else:
-            stats_dict['clicks'] = 1
-        
-        await db.social_stats.insert_one(stats_dict)
-    else:
+        if not await storage.stats.insert(stats_dict):
+            # Créées entre-temps par un événement concurrent (index unique)
+            stats = await storage.stats.get(event.project_id, event.platform.value)
+    
+    if stats:
         # Incrémenter les stats existantes
-        from datetime import datetime
-        field_to_update = "views" if event.event_type == EventType.VIEW else "clicks"
-        await db.social_stats.update_one(
-            {"id": stats["id"]},
-            {
-                "$inc": {field_to_update: 1},
-                "$set": {"last_updated_at": datetime.utcnow().isoformat()}
-            }
-        )
+        await storage.stats.increment(stats["id"], field_to_update, now.isoformat())
+    
+    # Bucket mensuel pour le classement
+    await leaderboard.record_event(storage, event.project_id, event.platform.value, field_to_update, now)
+    stats_hub.publish(event.project_id)
     
     return {"success": True, "message": f"{event.event_type.value} tracked successfully"}
 
+def _resolve_period(period: Optional[str]) -> str:
+    """Valide la période demandée (mois en cours par défaut)"""
+    current = leaderboard.current_period()
+    try:
+        period = leaderboard.parse_period(period) if period else current
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if period > current:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Période future"
+        )
+    return period
+
+async def _ensure_closed(storage: Storage, period: str):
+    if not await leaderboard.is_closed(storage, period):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Classement non encore clôturé pour cette période"
+        )
+
 @api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard():
+async def get_leaderboard(
+    request: Request,
+    response: Response,
+    period: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    storage: Storage = Depends(get_storage)
+):
     """
     Obtenir le classement mensuel des porteurs les plus actifs.
     Récompenses :
     - 1er : +500 VISUpoints
     - 2e-5e : +200 VISUpoints
     - 6e-10e : +100 VISUpoints
+    
+    `period` (YYYY-MM) vaut par défaut le mois en cours, servi par le store de
+    scores indexé. Les mois passés sont servis depuis leur snapshot figé.
+    La pagination est en keyset : passer l'en-tête `X-Next-Cursor` reçu dans `after`.
     """
-    # Agréger les statistiques par utilisateur
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "projects",
-                "localField": "project_id",
-                "foreignField": "id",
-                "as": "project"
-            }
-        },
-        {"$unwind": "$project"},
-        {
-            "$group": {
-                "_id": "$project.user_id",
-                "total_views": {"$sum": "$views"},
-                "total_clicks": {"$sum": "$clicks"}
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "_id",
-                "foreignField": "id",
-                "as": "user"
-            }
-        },
-        {"$unwind": "$user"},
-        {
-            "$project": {
-                "user_id": "$_id",
-                "full_name": "$user.full_name",
-                "visupoints": "$user.visupoints",
-                "badges": "$user.badges",
-                "total_views": 1,
-                "total_clicks": 1
-            }
-        },
-        {"$sort": {"total_views": -1, "total_clicks": -1}},
-        {"$limit": 20}
-    ]
+    period = _resolve_period(period)
+    live = period == leaderboard.current_period()
+    
+    # Un snapshot est immuable : son ETag ne dépend que de la page demandée
+    snapshot_etag = None if live else make_etag("leaderboard", period, after, limit)
+    if snapshot_etag and etag_matches(request, snapshot_etag):
+        return not_modified(snapshot_etag, public=True)
+    
+    async def load_page():
+        try:
+            if live:
+                entries = await leaderboard.get_live_page(storage, period, after=after, limit=limit)
+            else:
+                await _ensure_closed(storage, period)
+                entries = await leaderboard.get_snapshot_page(storage, period, after=after, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return {"etag": snapshot_etag or body_etag(entries), "entries": entries}
+    
+    # Les snapshots sont immuables : seule la page en cours a un TTL court
+    cache_key = f"{period}:{after or ''}:{limit}"
+    page = await singleflight.do(
+        ("leaderboard", period, after, limit),
+        lambda: cache.get_or_set(
+            "leaderboard", cache_key, load_page,
+            ttl=settings.CACHE_LEADERBOARD_TTL_SECONDS if live else None
+        )
+    )
+    
+    if etag_matches(request, page["etag"]):
+        return not_modified(page["etag"], public=True)
+    
+    results = page["entries"]
+    set_validators(response, page["etag"], public=True)
+    if len(results) == limit:
+        response.headers["X-Next-Cursor"] = leaderboard.encode_cursor(results[-1])
     
-    results = await db.social_stats.aggregate(pipeline).to_list(20)
+    return [LeaderboardEntry(**entry) for entry in results]
+
+@api_router.get("/leaderboard/me", response_model=LeaderboardEntry)
+async def get_my_rank(
+    period: Optional[str] = None,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """Obtenir la position de l'utilisateur connecté dans le classement"""
+    period = _resolve_period(period)
     
-    leaderboard = []
-    for rank, entry in enumerate(results, start=1):
-        leaderboard.append(LeaderboardEntry(
-            user_id=entry["user_id"],
-            full_name=entry["full_name"],
-            visupoints=entry["visupoints"],
-            total_views=entry["total_views"],
-            total_clicks=entry["total_clicks"],
-            badges=entry.get("badges", []),
-            rank=rank
-        ))
+    if period == leaderboard.current_period():
+        entry = await leaderboard.get_live_entry(storage, period, current_user.id)
+    else:
+        await _ensure_closed(storage, period)
+        entry = await leaderboard.get_snapshot_entry(storage, period, current_user.id)
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aucun score pour cette période"
+        )
     
-    return leaderboard
+    return LeaderboardEntry(**entry)
 
 # ============================================================================
-# ADMIN ROUTES (Publication sur les réseaux)
+# ANALYTICS ROUTES
 # ============================================================================
 
-@api_router.post("/admin/publish")
-async def publish_to_social(
-    project_id: str,
-    platforms: List[SocialPlatform],
-    current_user: User = Depends(get_current_user_dep)
+async def _analytics_response(
+    request: Request,
+    response: Response,
+    name: str,
+    params: tuple,
+    scope: AnalyticsScope,
+    current_user: User,
+    storage: Storage,
+    compute
 ):
     """
-    [ADMIN] Publier un projet sur les réseaux sociaux officiels VISUAL.
-    Cette route sera utilisée pour déclencher la publication automatique.
+    Sert une analyse mise en cache par version des données : la dernière mise
+    à jour des stats de la portée (et la version des projets de
+    l'utilisateur). Tant qu'aucune stat ne change, l'analyse n'est pas
+    recalculée et l'ETag reste le même. Sur toute la plateforme, la version
+    est arrondie à ANALYTICS_PLATFORM_REFRESH_SECONDS, et réservée aux
+    administrateurs.
+
+    `compute(project_ids, projects)` reçoit les projets de l'utilisateur
+    (id, date de création) déjà chargés, ou None sur toute la plateforme.
+    """
+    if scope == AnalyticsScope.ME:
+        projects = await storage.projects.list_created(current_user.id)
+        project_ids = [p["id"] for p in projects]
+        owner = current_user.id
+        version = (current_user.projects_version, await storage.stats.latest_update_in(project_ids))
+    else:
+        if not current_user.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Accès réservé aux administrateurs"
+            )
+        projects, project_ids, owner = None, None, "platform"
+        latest = await storage.stats.latest_update_in(None)
+        version = (analytics.version_bucket(latest, settings.ANALYTICS_PLATFORM_REFRESH_SECONDS),)
+    
+    etag = make_etag("analytics", name, owner, *params, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    cache_key = etag.strip('"')
+    result = await singleflight.do(
+        ("analytics", name, cache_key),
+        lambda: cache.get_or_set(
+            "analytics", cache_key,
+            lambda: compute(project_ids, projects),
+            ttl=settings.ANALYTICS_CACHE_TTL_SECONDS
+        )
+    )
+    set_validators(response, etag)
+    return {"scope": scope.value, **result}
+
+@api_router.get("/analytics/platforms")
+async def get_platform_analytics(
+    request: Request,
+    response: Response,
+    scope: AnalyticsScope = AnalyticsScope.ME,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    Vues, clics et CTR par plateforme, avec les percentiles du CTR des projets.
+    `scope` : les projets de l'utilisateur (`me`) ou toute la plateforme
+    (administrateurs).
+    """
+    return await _analytics_response(
+        request, response, "platforms", (), scope, current_user, storage,
+        lambda project_ids, projects: analytics.platform_report(storage, project_ids)
+    )
+
+@api_router.get("/analytics/trends")
+async def get_trend_analytics(
+    request: Request,
+    response: Response,
+    scope: AnalyticsScope = AnalyticsScope.ME,
+    months: int = Query(12, ge=2, le=36),
+    window: int = Query(3, ge=1, le=12),
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
     """
+    Séries mensuelles (mois en cours inclus) par plateforme : vues, clics, CTR,
+    croissance d'un mois sur l'autre et moyennes mobiles sur `window` mois.
+    """
+    periods = analytics.periods_ending(leaderboard.current_period(), months)
+    return await _analytics_response(
+        request, response, "trends", (periods[-1], months, window), scope, current_user, storage,
+        lambda project_ids, projects: analytics.trends_report(storage, project_ids, periods, window)
+    )
+
+@api_router.get("/analytics/cohorts")
+async def get_cohort_analytics(
+    request: Request,
+    response: Response,
+    scope: AnalyticsScope = AnalyticsScope.ME,
+    metric: CohortMetric = CohortMetric.VIEWS,
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """Percentiles (p25 à p99) d'une métrique par projet, par mois de création des projets"""
+    return await _analytics_response(
+        request, response, "cohorts", (metric.value,), scope, current_user, storage,
+        lambda project_ids, projects: analytics.cohort_report(storage, projects, metric.value)
+    )
+
+# ============================================================================
+# ADMIN ROUTES (Publication sur les réseaux)
+# ============================================================================
+
+async def _publish_to_social(project_id: str, platforms: List[SocialPlatform], storage: Storage) -> dict:
     # Vérifier que le projet existe et est autorisé
-    project = await db.projects.find_one({"id": project_id})
+    project = await storage.projects.get(project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Projet non trouvé"
         )
     
-    auth = await db.social_authorizations.find_one({
-        "project_id": project_id,
-        "revoked": False
-    })
+    auth = await storage.authorizations.get_active_for_project(project_id)
     
     if not auth:
         raise HTTPException(
@@ -540,10 +1026,136 @@ async def publish_to_social(
         "message": "Publication effectuée (mock pour l'instant - API keys à configurer)"
     }
 
+@api_router.post("/admin/publish")
+async def publish_to_social(
+    request: Request,
+    project_id: str,
+    platforms: List[SocialPlatform],
+    current_user: User = Depends(get_current_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    [ADMIN] Publier un projet sur les réseaux sociaux officiels VISUAL.
+    Cette route sera utilisée pour déclencher la publication automatique.
+    Avec l'en-tête Idempotency-Key, une nouvelle tentative ne republie pas.
+    """
+    return await idempotency.run(
+        request, storage, current_user.id,
+        lambda: _publish_to_social(project_id, platforms, storage)
+    )
+
+@api_router.post("/admin/leaderboard/close")
+async def close_leaderboard_period(
+    period: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """
+    [ADMIN] Clôturer une période du classement (par défaut le mois précédent).
+    Fige le classement et distribue les récompenses ; idempotent par période.
+    """
+    try:
+        period = leaderboard.parse_period(period) if period else leaderboard.previous_period()
+        return await leaderboard.close_period(storage, period)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@api_router.post("/admin/leaderboard/rebuild")
+async def rebuild_leaderboard_scores(
+    period: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user_dep),
+    storage: Storage = Depends(get_storage)
+):
+    """[ADMIN] Reconstruire le store de scores d'une période depuis les buckets mensuels"""
+    period = _resolve_period(period)
+    count = await leaderboard.rebuild_scores(storage, period)
+    await cache.invalidate("leaderboard")
+    return {"period": period, "users": count}
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin_user: User = Depends(get_admin_user_dep)):
+    """[ADMIN] Compteurs internes du worker : cache, coalescence, compression, tracking, admission, idempotence, recherche"""
+    return {
+        "namespaces": await cache.report(),
+        "coalescing": singleflight.report(),
+        "stats_stream": stats_hub.report(),
+        "compression": compressor.report(),
+        "track_rate_limit": track_limiter.report(),
+        "authorization_index": authorization_index.report(),
+        "admission": admission.report(),
+        "idempotency": idempotency.report(),
+        "search_index": search_index.report()
+    }
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(admin_user: User = Depends(get_admin_user_dep)):
+    """
+    [ADMIN] Requêtes MongoDB lentes de ce worker, agrégées par forme de filtre.
+    Les entrées échantillonnées portent leur plan d'exécution (COLLSCAN signalés).
+    """
+    return slow_query_log.report()
+
+@api_router.post("/admin/profiler/start")
+async def start_profiler(
+    seconds: float = Query(30, gt=0),
+    mode: str = Query("duration", pattern="^(duration|header)$"),
+    admin_user: User = Depends(get_admin_user_dep)
+):
+    """
+    [ADMIN] Démarrer le profileur statistique sur le worker qui reçoit l'appel.
+    
+    - mode=duration : échantillonne toute l'activité pendant `seconds`
+    - mode=header : n'échantillonne que pendant les requêtes portant
+      l'en-tête `X-Profile: <token>` (jeton retourné par cet appel)
+    """
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Durée maximale : {settings.PROFILER_MAX_SECONDS} secondes"
+        )
+    try:
+        return profiler.start(seconds, mode)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@api_router.post("/admin/profiler/stop")
+async def stop_profiler(admin_user: User = Depends(get_admin_user_dep)):
+    """[ADMIN] Arrêter le profileur et écrire le fichier collapsed-stack"""
+    output = await asyncio.to_thread(profiler.stop)
+    return {**profiler.status(), "output": output}
+
+@api_router.get("/admin/profiler")
+async def get_profiler_status(admin_user: User = Depends(get_admin_user_dep)):
+    """[ADMIN] État du profileur sur ce worker"""
+    return profiler.status()
+
 # ============================================================================
-# Root route
+# SANTÉ (sondes de l'orchestrateur)
 # ============================================================================
 
+@api_router.get("/health")
+async def health():
+    """
+    Liveness : le worker répond. Le ping MongoDB est indicatif et ne fait
+    jamais échouer la sonde (un redémarrage ne réparerait pas la base).
+    """
+    return {
+        "status": "ok",
+        "mongo": await mongo_status(client, settings.HEALTH_PING_TIMEOUT_SECONDS)
+    }
+
+@api_router.get("/health/ready")
+async def readiness(response: Response):
+    """
+    Readiness : pool préchauffé, index vérifiés et MongoDB joignable.
+    Répond 503 tant que le worker ne doit pas recevoir de trafic.
+    """
+    mongo = await mongo_status(client, settings.HEALTH_PING_TIMEOUT_SECONDS)
+    ready = getattr(app.state, "ready", False) and mongo["ok"]
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not_ready", "mongo": mongo}
+
 @api_router.get("/")
 async def root():
     return {
@@ -552,9 +1164,30 @@ async def root():
         "documentation": "/docs"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques Prometheus (latences par route, MongoDB, boucle d'événements)"""
+    return metrics_response()
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Déclenchement du profileur par en-tête (no-op si non armé)
+app.add_middleware(ProfilerTriggerMiddleware, profiler=profiler)
+
+# Compression gzip/brotli (sous Server-Timing, qui en mesure donc le coût)
+app.add_middleware(CompressionMiddleware, compressor=compressor, enabled=settings.COMPRESSION_ENABLED)
+
+# Server-Timing (no-op si désactivé)
+app.add_middleware(
+    ServerTimingMiddleware,
+    enabled=settings.SERVER_TIMING_ENABLED,
+    debug_enabled=settings.SERVER_TIMING_DEBUG_ENABLED
+)
+
+# Admission par classe de routes (délestage avant tout autre traitement)
+app.add_middleware(AdmissionMiddleware, controller=admission, enabled=settings.ADMISSION_ENABLED)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -562,8 +1195,13 @@ app.add_middleware(
     allow_origins=settings.CORS_ORIGINS.split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # En-têtes lus par le frontend (pagination keyset, validateurs, délestage, timings)
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After", "Server-Timing"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# Identifiant de corrélation des logs (X-Request-ID), middleware le plus externe
+app.add_middleware(RequestIdMiddleware)
+
+async def ensure_indexes():
+    """Crée les index nécessaires aux requêtes de l'API"""
+    await storage.ensure_indexes()
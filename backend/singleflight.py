@@ -0,0 +1,72 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from config import settings
+
+class FlightStats:
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self.recent_hits = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "recent_hits": self.recent_hits
+        }
+
+class SingleFlight:
+    """
+    Coalescence des lectures identiques concurrentes.
+
+    Le premier appel pour une clé (le leader) exécute la requête ; les appels
+    concurrents pour la même clé attendent son résultat ou son erreur au lieu
+    de relancer la requête. Avec `ttl` > 0, le résultat est en plus conservé
+    quelques instants en mémoire. La clé est un tuple dont le premier élément
+    (le nom de la route) sert de namespace aux métriques.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_recent: int = 1000):
+        self.ttl = ttl
+        self.max_recent = max_recent
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.stats: Dict[str, FlightStats] = defaultdict(FlightStats)
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self.stats[key[0]]
+
+        if self.ttl:
+            recent = self._recent.get(key)
+            if recent is not None and recent[1] > time.monotonic():
+                stats.recent_hits += 1
+                return recent[0]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats.coalesced += 1
+        else:
+            stats.leaders += 1
+            # La requête tourne dans sa propre tâche : l'annulation du leader
+            # (client déconnecté) n'interrompt pas les requêtes qui l'attendent
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._land(key, t))
+        return await asyncio.shield(task)
+
+    def _land(self, key: Hashable, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.ttl:
+            self._recent[key] = (task.result(), time.monotonic() + self.ttl)
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    def report(self) -> Dict[str, Dict]:
+        return {name: stats.as_dict() for name, stats in list(self.stats.items())}
+
+singleflight = SingleFlight(ttl=settings.SINGLEFLIGHT_TTL_SECONDS)
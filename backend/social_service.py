@@ -9,23 +9,46 @@ class SocialMediaService:
     """Service pour gérer les publications sur les réseaux sociaux"""
     
     def __init__(self):
-        self.youtube_api_key = settings.YOUTUBE_API_KEY
-        self.tiktok_api_key = settings.TIKTOK_API_KEY
-        self.facebook_access_token = settings.FACEBOOK_ACCESS_TOKEN
+        self._link_templates: Dict[SocialPlatform, str] = {}
+        # Clients d'API des plateformes, construits à la première publication
+        self._clients: Dict[SocialPlatform, Optional[Dict]] = {}
+    
+    def _client(self, platform: SocialPlatform) -> Optional[Dict]:
+        """Client de la plateforme, ou None si ses identifiants ne sont pas configurés"""
+        if platform not in self._clients:
+            self._clients[platform] = self._build_client(platform)
+        return self._clients[platform]
+    
+    def _build_client(self, platform: SocialPlatform) -> Optional[Dict]:
+        # Les SDK des plateformes seront importés ici, jamais au démarrage du worker
+        credential, placeholder = {
+            SocialPlatform.YOUTUBE: (settings.YOUTUBE_API_KEY, "your-youtube-api-key-here"),
+            SocialPlatform.TIKTOK: (settings.TIKTOK_API_KEY, "your-tiktok-api-key-here"),
+            SocialPlatform.FACEBOOK: (settings.FACEBOOK_ACCESS_TOKEN, "your-facebook-access-token-here"),
+        }[platform]
+        if not credential or credential == placeholder:
+            return None
+        return {"credential": credential}
+    
+    def _link_template(self, platform: SocialPlatform) -> str:
+        """Retourne (et mémorise) le gabarit de lien UTM d'une plateforme"""
+        template = self._link_templates.get(platform)
+        if template is None:
+            template = (
+                f"{settings.VISUAL_BASE_URL}/project/{{project_id}}"
+                f"?utm_source={platform.value}"
+                "&utm_medium=official_social"
+                "&utm_campaign=project_{project_id}"
+            )
+            self._link_templates[platform] = template
+        return template
     
     def generate_share_links(self, project_id: str, platforms: List[SocialPlatform]) -> Dict[str, str]:
         """Génère les liens de partage avec tracking UTM"""
-        base_url = settings.VISUAL_BASE_URL
-        links = {}
-        
-        for platform in platforms:
-            url = f"{base_url}/project/{project_id}"
-            url += f"?utm_source={platform.value}"
-            url += "&utm_medium=official_social"
-            url += f"&utm_campaign=project_{project_id}"
-            links[platform.value] = url
-        
-        return links
+        return {
+            platform.value: self._link_template(platform).format(project_id=project_id)
+            for platform in platforms
+        }
     
     def get_video_specs(self, platform: SocialPlatform) -> VideoExcerpt:
         """Retourne les spécifications vidéo pour chaque plateforme"""
@@ -53,7 +76,7 @@ class SocialMediaService:
     
     async def publish_to_youtube(self, video_path: str, title: str, description: str, project_id: str) -> Dict:
         """Publie une vidéo sur YouTube (MOCK pour l'instant)"""
-        if not self.youtube_api_key or self.youtube_api_key == "your-youtube-api-key-here":
+        if self._client(SocialPlatform.YOUTUBE) is None:
             logger.warning("YouTube API key not configured. Using mock response.")
             return {
                 "success": True,
@@ -64,7 +87,7 @@ class SocialMediaService:
             }
         
         # TODO: Implémenter la vraie intégration YouTube API v3
-        logger.info(f"Publishing to YouTube: {title}")
+        logger.info("Publishing to YouTube: %s", title)
         return {
             "success": True,
             "video_id": "real_youtube_id",
@@ -73,7 +96,7 @@ class SocialMediaService:
     
     async def publish_to_tiktok(self, video_path: str, title: str, description: str, project_id: str) -> Dict:
         """Publie une vidéo sur TikTok (MOCK pour l'instant)"""
-        if not self.tiktok_api_key or self.tiktok_api_key == "your-tiktok-api-key-here":
+        if self._client(SocialPlatform.TIKTOK) is None:
             logger.warning("TikTok API key not configured. Using mock response.")
             return {
                 "success": True,
@@ -84,7 +107,7 @@ class SocialMediaService:
             }
         
         # TODO: Implémenter la vraie intégration TikTok Upload API
-        logger.info(f"Publishing to TikTok: {title}")
+        logger.info("Publishing to TikTok: %s", title)
         return {
             "success": True,
             "video_id": "real_tiktok_id",
@@ -93,7 +116,7 @@ class SocialMediaService:
     
     async def publish_to_facebook(self, video_path: str, title: str, description: str, project_id: str) -> Dict:
         """Publie une vidéo sur Facebook (MOCK pour l'instant)"""
-        if not self.facebook_access_token or self.facebook_access_token == "your-facebook-access-token-here":
+        if self._client(SocialPlatform.FACEBOOK) is None:
             logger.warning("Facebook access token not configured. Using mock response.")
             return {
                 "success": True,
@@ -104,7 +127,7 @@ class SocialMediaService:
             }
         
         # TODO: Implémenter la vraie intégration Meta Graph API
-        logger.info(f"Publishing to Facebook: {title}")
+        logger.info("Publishing to Facebook: %s", title)
         return {
             "success": True,
             "video_id": "real_facebook_id",
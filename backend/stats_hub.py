@@ -0,0 +1,172 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = "visual:stats:dirty"
+# Attente avant de se réabonner après une coupure Redis (doublée à chaque échec)
+RECONNECT_DELAY_SECONDS = 1.0
+RECONNECT_MAX_DELAY_SECONDS = 30.0
+
+class Subscription:
+    """File bornée d'un abonné : les trames les plus anciennes sont écartées"""
+
+    def __init__(self, project_id: str, maxsize: int):
+        self.project_id = project_id
+        self.frames: deque = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, frame: bytes):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """Prochaine trame, ou None si rien n'est arrivé avant `timeout`"""
+        if not self.frames:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.frames.popleft()
+
+class StatsHub:
+    """
+    Hub pub/sub en mémoire pour la diffusion des statistiques en direct.
+
+    `publish` se contente de marquer le projet comme modifié (O(1) par
+    événement). Une tâche de fond, à chaque intervalle, recharge une seule fois
+    les stats de chaque projet modifié, encode la trame une fois, puis la
+    distribue à tous ses abonnés. Avec Redis, les projets modifiés sont relayés
+    aux autres workers en un message par intervalle.
+    """
+
+    def __init__(self, interval: float = 1.0, queue_size: int = 16):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._dirty: Set[str] = set()
+        self._to_broadcast: Set[str] = set()
+        self._redis: Any = None
+        self._origin = uuid.uuid4().hex
+        self.frames_sent = 0
+
+    def subscribe(self, project_id: str) -> Subscription:
+        subscription = Subscription(project_id, self.queue_size)
+        self._subscribers.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.project_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.project_id]
+
+    def publish(self, project_id: str):
+        """Signale une mise à jour des stats d'un projet"""
+        if project_id in self._subscribers:
+            self._dirty.add(project_id)
+        if self._redis is not None:
+            self._to_broadcast.add(project_id)
+
+    @staticmethod
+    def encode(payload: Dict) -> bytes:
+        return f"event: stats\ndata: {json.dumps(payload, default=str)}\n\n".encode()
+
+    async def _flush(self, loader: Callable[[str], Awaitable[Dict]]):
+        if self._to_broadcast:
+            dirty, self._to_broadcast = self._to_broadcast, set()
+            try:
+                message = {"origin": self._origin, "projects": list(dirty)}
+                await self._redis.publish(REDIS_CHANNEL, json.dumps(message))
+            except Exception:
+                logger.warning("Stats hub: Redis publish failed", exc_info=True)
+
+        dirty, self._dirty = self._dirty, set()
+        for project_id in dirty:
+            subscribers = self._subscribers.get(project_id)
+            if not subscribers:
+                continue
+            try:
+                frame = self.encode(await loader(project_id))
+            except Exception:
+                # Les autres projets sont diffusés ; celui-ci est retenté au prochain intervalle
+                logger.warning(f"Stats hub: loading stats of {project_id} failed", exc_info=True)
+                self._dirty.add(project_id)
+                continue
+            for subscription in list(subscribers):
+                subscription.push(frame)
+            self.frames_sent += len(subscribers)
+
+    def _receive(self, message: Dict):
+        try:
+            data = json.loads(message["data"])
+            origin, projects = data["origin"], data["projects"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Stats hub: ignoring malformed relay message")
+            return
+        if origin == self._origin:
+            return
+        for project_id in projects:
+            if project_id in self._subscribers:
+                self._dirty.add(project_id)
+
+    async def _listen(self):
+        """Relais Redis, réabonné après une coupure tant que le hub tourne"""
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(REDIS_CHANNEL)
+                delay = RECONNECT_DELAY_SECONDS
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._receive(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(f"Stats hub: Redis relay lost, resubscribing in {delay:.0f}s", exc_info=True)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+
+    async def run(self, loader: Callable[[str], Awaitable[Dict]], redis_client: Any = None):
+        """Boucle de diffusion ; `redis_client` active le relais entre workers"""
+        self._redis = redis_client
+        listener = asyncio.create_task(self._listen()) if redis_client is not None else None
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self._flush(loader)
+                except Exception:
+                    logger.exception("Stats hub flush failed")
+        finally:
+            if listener is not None:
+                listener.cancel()
+
+    def report(self) -> Dict:
+        return {
+            "projects": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "frames_sent": self.frames_sent,
+            "dropped": sum(sub.dropped for subs in self._subscribers.values() for sub in subs)
+        }
+
+stats_hub = StatsHub(
+    interval=settings.STATS_STREAM_INTERVAL_SECONDS,
+    queue_size=settings.STATS_STREAM_QUEUE_SIZE
+)
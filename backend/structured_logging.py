@@ -0,0 +1,215 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from config import settings
+
+# Identifiant de corrélation de la requête en cours
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Gabarits suivis par la limitation de débit (les plus anciens sont oubliés)
+MAX_RATE_LIMIT_BUCKETS = 1024
+
+# Attributs standards d'un LogRecord (le reste vient de `extra=`)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id", "suppressed"}
+
+def parse_rules(spec: str) -> Dict[str, float]:
+    """"social_service=1,leaderboard=0.5" -> {"social_service": 1.0, "leaderboard": 0.5}"""
+    rules = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            rules[name.strip()] = float(value)
+    return rules
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement (champs `extra=` inclus)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class HotPathFilter(logging.Filter):
+    """
+    Échantillonnage et limitation de débit par logger.
+    `sample_rates` : fraction des enregistrements gardés ; `rate_limits` :
+    messages par seconde et par gabarit de message (seau à jetons). Le
+    gabarit est le message avant formatage des arguments : les appels des
+    loggers limités passent leurs valeurs en arguments (`%s`), pas en
+    f-string. Le nombre de messages écartés est reporté sur le suivant
+    (`suppressed`). Les règles d'un logger s'appliquent à ses descendants.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limits: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self._rules: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        # (logger, gabarit) -> [jetons, dernier remplissage, écartés], LRU borné
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+
+    def _rule(self, name: str) -> Tuple[Optional[float], Optional[float]]:
+        rule = self._rules.get(name)
+        if rule is None:
+            sample, limit, current = None, None, name
+            while current and (sample is None or limit is None):
+                if sample is None:
+                    sample = self.sample_rates.get(current)
+                if limit is None:
+                    limit = self.rate_limits.get(current)
+                current = current.rpartition(".")[0]
+            rule = self._rules[name] = (sample, limit)
+        return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Les erreurs ne sont jamais écartées
+        if record.levelno >= logging.ERROR:
+            return True
+        sample, limit = self._rule(record.name)
+        if sample is not None and random.random() >= sample:
+            return False
+        if limit is None:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [limit, now, 0]
+            if len(self._buckets) > MAX_RATE_LIMIT_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler dont le coût sur le chemin de la requête se limite à un
+    put_nowait : le formatage est fait par le thread du QueueListener. Quand
+    la file est pleine, l'enregistrement est abandonné et compté.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+
+def _stop_listener():
+    """Vide la file à la sortie du processus (enregistré une seule fois)"""
+    if _listener is not None:
+        _listener.stop()
+
+def setup_logging() -> NonBlockingQueueHandler:
+    """
+    Installe le pipeline : logger racine -> file bornée -> thread d'écriture.
+    Les logs d'uvicorn passent par la même file.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    else:
+        atexit.register(_stop_listener)
+
+    output = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+        ))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(HotPathFilter(
+        parse_rules(settings.LOG_SAMPLE_RATES),
+        parse_rules(settings.LOG_RATE_LIMITS)
+    ))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return handler
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI : reprend l'en-tête `X-Request-ID` entrant (ou en génère
+    un), le rend disponible aux logs de la requête et le renvoie au client.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,196 @@
+import functools
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from starlette.datastructures import MutableHeaders
+
+# Span parent courant ; None quand l'instrumentation est désactivée
+_parent: ContextVar[Optional["Span"]] = ContextVar("timing_parent", default=None)
+
+DEBUG_HEADER = b"x-debug-timing"
+
+class Span:
+    __slots__ = ("name", "start", "duration", "children", "marks", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.children: List["Span"] = []
+        self.marks: Dict[str, float] = {}
+
+    def __enter__(self):
+        self._token = _parent.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.duration = time.perf_counter() - self.start
+        _parent.reset(self._token)
+        return False
+
+    def totals(self) -> Dict[str, List[float]]:
+        """Durée cumulée et nombre d'occurrences par nom de span (descendants)"""
+        totals: Dict[str, List[float]] = {}
+        stack = list(self.children)
+        while stack:
+            span = stack.pop()
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.duration
+            entry[1] += 1
+            stack.extend(span.children)
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [
+            f'{name};dur={duration * 1000:.2f};desc="x{count}"'
+            for name, (duration, count) in self.totals().items()
+        ]
+        parts.append(f"total;dur={self.duration * 1000:.2f}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "ms": round(self.duration * 1000, 3),
+            "children": [child.as_dict() for child in self.children]
+        }
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(name: str):
+    """
+    Ouvre un span enfant du span courant. Sans requête instrumentée en cours,
+    retourne un context manager partagé qui ne fait rien (coût : une lecture
+    de ContextVar).
+    """
+    parent = _parent.get()
+    if parent is None:
+        return _NULL_SPAN
+    child = Span(name)
+    parent.children.append(child)
+    return child
+
+def mark(name: str):
+    """Horodate un point de passage sur le span racine de la requête"""
+    parent = _parent.get()
+    if parent is not None:
+        parent.marks[name] = time.perf_counter()
+
+def record_since(name: str, mark_name: str):
+    """Ajoute un span `name` couvrant le temps écoulé depuis `mark(mark_name)`"""
+    parent = _parent.get()
+    if parent is None or mark_name not in parent.marks:
+        return
+    child = Span(name)
+    child.start = parent.marks.pop(mark_name)
+    child.duration = time.perf_counter() - child.start
+    parent.children.append(child)
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """Enveloppe une fonction de route : span `handler` puis marque de fin"""
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        if _parent.get() is None:
+            return await endpoint(*args, **kwargs)
+        with span("handler"):
+            result = await endpoint(*args, **kwargs)
+        mark("handler_end")
+        return result
+    return wrapper
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI : ouvre un span racine par requête et renvoie les durées
+    cumulées dans l'en-tête `Server-Timing`. Si `debug_enabled` est vrai
+    (SERVER_TIMING_DEBUG_ENABLED, jamais en production), `X-Debug-Timing: 1`
+    renvoie aussi l'arbre complet des spans (JSON) dans `X-Timing-Tree` ;
+    sinon l'en-tête client est ignoré.
+    """
+
+    def __init__(self, app, enabled: bool = False, debug_enabled: bool = False):
+        self.app = app
+        self.enabled = enabled
+        self.debug_enabled = debug_enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        debug = self.debug_enabled and (DEBUG_HEADER, b"1") in scope["headers"]
+        root = Span("request")
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.duration = time.perf_counter() - root.start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", root.server_timing())
+                if debug:
+                    headers.append("X-Timing-Tree", json.dumps(root.as_dict()))
+            await send(message)
+
+        token = _parent.set(root)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _parent.reset(token)
+
+# ============================================================================
+# Proxy MongoDB : un span par appel (activé seulement avec SERVER_TIMING_ENABLED)
+# ============================================================================
+
+TIMED_METHODS = {
+    "find_one", "insert_one", "insert_many", "update_one", "update_many",
+    "delete_one", "delete_many", "replace_one", "count_documents",
+    "estimated_document_count", "find_one_and_update", "bulk_write",
+    "create_index", "distinct", "to_list",
+}
+CURSOR_METHODS = {"find", "aggregate", "sort", "limit", "skip"}
+
+class _Timed:
+    def __init__(self, target: Any, label: str):
+        self._target = target
+        self._label = label
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if name in TIMED_METHODS:
+            label = f"db.{self._label}.{name}" if name != "to_list" else f"db.{self._label}"
+
+            async def timed(*args, **kwargs):
+                with span(label):
+                    return await attr(*args, **kwargs)
+            return timed
+        if name in CURSOR_METHODS:
+            label = self._label if name in ("sort", "limit", "skip") else f"{self._label}.{name}"
+
+            def cursor(*args, **kwargs):
+                return _Timed(attr(*args, **kwargs), label)
+            return cursor
+        return attr
+
+    def __aiter__(self):
+        return self._target.__aiter__()
+
+class TimedDatabase:
+    """Enveloppe une base Motor pour ouvrir un span autour de chaque appel"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name: str):
+        return _Timed(self._database[name], name)
+
+    def __getattr__(self, name: str):
+        # Méthodes de la base (command, client...) : pas d'enveloppe
+        if name.startswith("_") or hasattr(type(self._database), name):
+            return getattr(self._database, name)
+        return _Timed(self._database[name], name)
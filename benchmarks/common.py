@@ -0,0 +1,79 @@
+"""
+Outils partagés par les bancs de mesure : accès au backend, métadonnées
+d'exécution, écriture des résultats JSON et comparaison avec une référence.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Les settings sont lus à l'import des modules du backend
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "visual_bench")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-not-for-production")
+# Tous les événements simulés viennent de la même IP : pas de limitation du tracking
+os.environ.setdefault("TRACK_RATE_LIMIT_EVENTS", "0")
+# Débit brut : pas de délestage (ADMISSION_ENABLED=true pour le mesurer)
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+sys.path.insert(0, str(ROOT / "backend"))
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_metadata(**extra) -> Dict:
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **extra
+    }
+
+def write_results(results: Dict, output: Optional[str], prefix: str) -> Path:
+    path = Path(output) if output else RESULTS_DIR / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    print(f"\nRésultats écrits dans {path}")
+    return path
+
+def compare(current: Dict, baseline_path: str, section: str,
+            metrics: Sequence[Tuple[str, bool]], tolerance: float) -> List[str]:
+    """
+    Affiche l'écart avec une exécution de référence et retourne les régressions.
+    `metrics` liste les couples (métrique, plus_grand_est_meilleur) ; un écart
+    défavorable supérieur à `tolerance` % est signalé comme régression.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    regressions = []
+    print(f"\nComparaison avec {baseline['meta'].get('revision') or '?'} ({baseline['meta']['started_at']})")
+    for name, result in current[section].items():
+        reference = baseline[section].get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in metrics:
+            before, after = reference.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  <-- régression"
+                regressions.append(f"{name}.{metric}")
+            print(f"  {name:<28} {metric:<15} {before:>10} -> {after:>10} ({change:+.1f}%){flag}")
+    return regressions
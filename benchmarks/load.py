@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Banc de charge local du backend VISUAL
+
+L'application FastAPI est démarrée dans le processus (httpx + ASGITransport),
+sans réseau : par défaut sur une base MongoDB simulée (mongomock-motor), ou
+sur un vrai mongod avec --mongo-url. Avec --storage memory, utilisateurs,
+projets, autorisations et stats sont servis par le stockage en mémoire
+(le classement reste sur la base). Les utilisateurs, projets et stats sont
+générés à l'échelle demandée, puis chaque scénario est joué en concurrence.
+
+Exemples :
+    python benchmarks/load.py
+    python benchmarks/load.py --users 500 --projects-per-user 4 --requests 5000 --concurrency 64
+    python benchmarks/load.py --mongo-url mongodb://localhost:27017 --scenarios track,stats
+    python benchmarks/load.py --storage memory
+    python benchmarks/load.py --compare benchmarks/results/baseline.json
+
+Les résultats (débit, latences p50/p95/p99) sont écrits en JSON dans
+benchmarks/results/ pour comparer les exécutions entre elles.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from common import compare, run_metadata, write_results
+
+import httpx
+
+BENCH_DB_NAME = "visual_bench"
+PASSWORD = "bench-password"
+PLATFORMS = ["youtube", "tiktok", "facebook"]
+
+# Un scénario reçoit le client HTTP et le jeu de données, et retourne la réponse
+Scenario = Callable[[httpx.AsyncClient, "Dataset"], Awaitable[httpx.Response]]
+
+class Dataset:
+    """Données générées : identifiants et jetons utilisés par les scénarios"""
+
+    def __init__(self):
+        self.users: List[Dict] = []
+        self.projects: List[Dict] = []
+        self.tokens: Dict[str, str] = {}
+
+    def random_user(self) -> Dict:
+        return random.choice(self.users)
+
+    def random_project(self) -> Dict:
+        return random.choice(self.projects)
+
+    def auth_headers(self, user_id: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+# ============================================================================
+# Base de données et génération des données
+# ============================================================================
+
+def open_database(mongo_url: Optional[str], storage_backend: str):
+    """Remplace la base et le stockage du serveur : vrai mongod ou base simulée"""
+    import server
+    from repositories import MemoryStorage, MongoStorage
+
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_url)
+        backend = "mongodb"
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("mongomock-motor est requis sans --mongo-url (pip install mongomock-motor)")
+        client = AsyncMongoMockClient()
+        backend = "mongomock"
+
+    server.client = client
+    server.db = client[BENCH_DB_NAME]
+    server.storage = MemoryStorage() if storage_backend == "memory" else MongoStorage(server.db)
+    return server, backend
+
+async def seed(db, storage, users: int, projects_per_user: int, stats_max: int) -> Dataset:
+    """Insère les données synthétiques par lots et reconstruit les scores"""
+    from auth import create_access_token, get_password_hash
+    from models import User, Project
+    import leaderboard
+
+    for name in ("users", "projects", "social_authorizations", "social_stats",
+                 "social_stats_monthly", "leaderboard_scores"):
+        await db[name].delete_many({})
+
+    dataset = Dataset()
+    # bcrypt est volontairement lent : un seul hash pour tous les comptes
+    hashed_password = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+    period = leaderboard.current_period(now)
+
+    user_docs, project_docs, auth_docs, stats_docs, monthly_docs = [], [], [], [], []
+    for i in range(users):
+        user = User(email=f"bench{i}@example.com", full_name=f"Bench User {i}", hashed_password=hashed_password)
+        user_dict = user.model_dump()
+        user_dict["created_at"] = user_dict["created_at"].isoformat()
+        user_docs.append(user_dict)
+        dataset.users.append({"id": user.id, "email": user.email})
+        dataset.tokens[user.id] = create_access_token({"sub": user.id})
+
+        for j in range(projects_per_user):
+            project = Project(user_id=user.id, title=f"Projet {i}-{j}", description="Projet de test de charge")
+            project_dict = project.model_dump()
+            project_dict["created_at"] = project_dict["created_at"].isoformat()
+            project_dict["updated_at"] = project_dict["updated_at"].isoformat()
+            project_docs.append(project_dict)
+            dataset.projects.append({"id": project.id, "user_id": user.id})
+
+            auth_docs.append({
+                "id": f"auth-{project.id}",
+                "user_id": user.id,
+                "project_id": project.id,
+                "platforms": PLATFORMS,
+                "authorized_at": now.isoformat(),
+                "authorized_ip": "127.0.0.1",
+                "revoked": False,
+                "revoked_at": None
+            })
+            for platform in PLATFORMS:
+                views = random.randint(0, stats_max)
+                clicks = random.randint(0, views)
+                stats_docs.append({
+                    "id": f"stats-{project.id}-{platform}",
+                    "project_id": project.id,
+                    "platform": platform,
+                    "views": views,
+                    "clicks": clicks,
+                    "last_updated_at": now.isoformat()
+                })
+                monthly_docs.append({
+                    "period": period,
+                    "project_id": project.id,
+                    "platform": platform,
+                    "views": views,
+                    "clicks": clicks,
+                    "last_updated_at": now.isoformat()
+                })
+
+    for insert_many, docs in ((storage.users.insert_many, user_docs), (storage.projects.insert_many, project_docs),
+                              (storage.authorizations.insert_many, auth_docs), (storage.stats.insert_many, stats_docs),
+                              (storage.leaderboard.insert_buckets, monthly_docs)):
+        for start in range(0, len(docs), 1000):
+            await insert_many(docs[start:start + 1000])
+
+    await leaderboard.rebuild_scores(storage, period)
+    return dataset
+
+# ============================================================================
+# Scénarios
+# ============================================================================
+
+async def scenario_track(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    return await client.post("/api/social/track", json={
+        "project_id": dataset.random_project()["id"],
+        "platform": random.choice(PLATFORMS),
+        "event_type": random.choice(["view", "view", "view", "click"])
+    })
+
+async def scenario_login(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    return await client.post("/api/auth/login", json={
+        "email": dataset.random_user()["email"],
+        "password": PASSWORD
+    })
+
+async def scenario_leaderboard(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    return await client.get("/api/leaderboard", params={"limit": 20})
+
+async def scenario_stats(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    project = dataset.random_project()
+    return await client.get(
+        f"/api/social/stats/{project['id']}",
+        headers=dataset.auth_headers(project["user_id"])
+    )
+
+async def scenario_authorize(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    project = dataset.random_project()
+    return await client.post(
+        "/api/social/authorize",
+        # Toutes les plateformes : le tracking des autres scénarios reste accepté
+        json={"project_id": project["id"], "platforms": PLATFORMS},
+        headers=dataset.auth_headers(project["user_id"])
+    )
+
+SCENARIOS: Dict[str, Scenario] = {
+    "track": scenario_track,
+    "login": scenario_login,
+    "leaderboard": scenario_leaderboard,
+    "stats": scenario_stats,
+    "authorize": scenario_authorize,
+}
+
+# Répartition approximative du trafic réel pour le scénario "mixed"
+MIXED_WEIGHTS = {"track": 60, "stats": 20, "leaderboard": 15, "authorize": 3, "login": 2}
+
+async def scenario_mixed(client: httpx.AsyncClient, dataset: Dataset) -> httpx.Response:
+    name = random.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+    return await SCENARIOS[name](client, dataset)
+
+SCENARIOS["mixed"] = scenario_mixed
+
+# ============================================================================
+# Exécution et mesures
+# ============================================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile au rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(client: httpx.AsyncClient, dataset: Dataset, scenario: Scenario,
+                       requests: int, concurrency: int) -> Dict:
+    """Joue `requests` requêtes avec `concurrency` clients simultanés"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, dataset)
+                code = str(response.status_code)
+            except Exception as e:
+                code = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[code] = statuses.get(code, 0) + 1
+            if not code.isdigit() or int(code) >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "errors": errors,
+        "statuses": statuses
+    }
+
+async def main(args: argparse.Namespace) -> int:
+    random.seed(args.seed)
+    server, backend = open_database(args.mongo_url, args.storage)
+    # Une ligne de log par requête fausserait les mesures
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"Génération : {args.users} utilisateurs x {args.projects_per_user} projets ({backend}, stockage {args.storage})")
+    dataset = await seed(server.db, server.storage, args.users, args.projects_per_user, args.stats_max)
+
+    results = {
+        "meta": run_metadata(
+            backend=backend,
+            storage=args.storage,
+            users=args.users,
+            projects=len(dataset.projects),
+            seed=args.seed
+        ),
+        "scenarios": {}
+    }
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                # Échauffement : caches, index et imports paresseux
+                await run_scenario(client, dataset, SCENARIOS[name], min(args.warmup, args.requests), args.concurrency)
+                result = await run_scenario(client, dataset, SCENARIOS[name], args.requests, args.concurrency)
+                results["scenarios"][name] = result
+                print(
+                    f"{name:<12} {result['throughput_rps']:>8} req/s  "
+                    f"p50 {result['p50_ms']:>7} ms  p95 {result['p95_ms']:>7} ms  "
+                    f"p99 {result['p99_ms']:>7} ms  erreurs {result['errors']}"
+                )
+
+    write_results(results, args.output, "load")
+
+    if args.compare:
+        metrics = (("throughput_rps", True), ("p95_ms", False), ("p99_ms", False))
+        if compare(results, args.compare, "scenarios", metrics, args.tolerance):
+            return 1
+    return 0
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Banc de charge local du backend VISUAL")
+    parser.add_argument("--mongo-url", help="mongod à utiliser (base simulée en mémoire par défaut)")
+    parser.add_argument("--storage", choices=["mongo", "memory"], default="mongo",
+                        help="stockage des utilisateurs, projets, autorisations, stats et du classement")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--projects-per-user", type=int, default=3)
+    parser.add_argument("--stats-max", type=int, default=1000, help="vues maximales par projet et plateforme")
+    parser.add_argument("--scenarios", default="track,stats,leaderboard,authorize,login,mixed",
+                        help=f"liste séparée par des virgules parmi : {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=1000, help="requêtes mesurées par scénario")
+    parser.add_argument("--warmup", type=int, default=100, help="requêtes d'échauffement non mesurées")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="fichier JSON de résultats")
+    parser.add_argument("--compare", help="résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="dégradation tolérée en %% avant de signaler une régression")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"scénarios inconnus : {', '.join(unknown)}")
+    return args
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks des chemins CPU par requête du backend VISUAL
+
+Mesure la construction des modèles pydantic, la création et le décodage des
+jetons JWT, la génération des liens de partage, les calculs d'analytics
+et l'autocomplétion des titres sur 100 000 projets. Chaque benchmark est
+calibré pour qu'un échantillon dure au moins --min-time secondes, puis
+répété --repeat fois (GC désactivé pendant la mesure, comme timeit). La
+médiane par opération sert de référence : elle est peu sensible aux
+échantillons perturbés.
+
+Exemples :
+    python benchmarks/micro.py --output benchmarks/results/micro-baseline.json
+    python benchmarks/micro.py --compare benchmarks/results/micro-baseline.json
+    python benchmarks/micro.py --filter jwt --repeat 30
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from common import compare, run_metadata, write_results
+
+import analytics
+import search_index
+from auth import create_access_token, decode_token
+from models import Project, SocialPlatform, SocialStats, User
+from social_service import SocialMediaService
+
+PLATFORMS = list(SocialPlatform)
+ANALYTICS_PROJECTS = 100_000
+
+def analytics_dataset(projects: int) -> Dict:
+    """Compteurs, projets et buckets mensuels synthétiques (graine fixe)"""
+    rng = random.Random(42)
+    periods = analytics.periods_ending("2026-01", 12)
+    return {
+        "projects": [
+            {"id": f"project-{i}", "created_at": f"{periods[i % 12]}-01T00:00:00"}
+            for i in range(projects)
+        ],
+        "counters": [
+            {"project_id": f"project-{i}", "platform": p.value, "views": rng.randint(0, 5000), "clicks": rng.randint(0, 300)}
+            for i in range(projects) for p in PLATFORMS
+        ],
+        "buckets": [
+            {"period": period, "platform": p.value, "views": rng.randint(0, 10**6), "clicks": rng.randint(0, 10**5)}
+            for period in periods for p in PLATFORMS
+        ],
+        "periods": periods
+    }
+
+def search_dataset(projects: int) -> List[Dict]:
+    """Titres synthétiques de 2 à 5 mots tirés d'un vocabulaire de 5 000 mots (graine fixe)"""
+    rng = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choices(letters, k=rng.randint(3, 10))) for _ in range(5000)]
+    return [
+        {"id": f"project-{i}", "user_id": f"user-{i % 1000}", "title": " ".join(rng.choices(words, k=rng.randint(2, 5)))}
+        for i in range(projects)
+    ]
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    """Fonctions mesurées, préparées une fois (hors mesure)"""
+    user = User(email="bench@example.com", full_name="Bench User", hashed_password="$2b$12$" + "x" * 53)
+    user_doc = user.model_dump()
+    user_doc["created_at"] = user_doc["created_at"].isoformat()
+    project = Project(user_id=user.id, title="Projet", description="Description du projet")
+    project_doc = project.model_dump()
+    token = create_access_token({"sub": user.id})
+    service = SocialMediaService()
+    project_ids = [f"project-{i}" for i in range(100)]
+    data = analytics_dataset(ANALYTICS_PROJECTS)
+    titles = search_index.ProjectPrefixIndex(refresh_interval=0)
+    titles._state = search_index._build(search_dataset(ANALYTICS_PROJECTS))
+
+    return {
+        # Modèles : les default_factory (uuid4, utcnow) sont inclus dans la mesure
+        "models.user_new": lambda: User(
+            email="bench@example.com", full_name="Bench User", hashed_password=user.hashed_password
+        ),
+        "models.user_from_doc": lambda: User(**user_doc),
+        "models.user_dump": user.model_dump,
+        "models.project_new": lambda: Project(user_id=user.id, title="Projet", description="Description"),
+        "models.project_from_doc": lambda: Project(**project_doc),
+        "models.social_stats_new": lambda: SocialStats(project_id=project.id, platform=SocialPlatform.YOUTUBE),
+        # JWT (HS256)
+        "jwt.create_access_token": lambda: create_access_token({"sub": user.id}),
+        "jwt.decode_token": lambda: decode_token(token),
+        # Liens de partage
+        "share_links.one_project": lambda: service.generate_share_links(project.id, PLATFORMS),
+        "share_links.batch_100": lambda: [service.generate_share_links(pid, PLATFORMS) for pid in project_ids],
+        # Analytics (colonnes extraites des documents chargés, puis numpy)
+        "analytics.platforms_100k": lambda: analytics.compute_platforms(data["counters"]),
+        "analytics.cohorts_ctr_100k": lambda: analytics.compute_cohorts(data["projects"], data["counters"], "ctr"),
+        "analytics.trends_12_months": lambda: analytics.compute_trends(data["buckets"], data["periods"], 3),
+        # Autocomplétion (index des titres en mémoire)
+        "search.prefix_1_char_100k": lambda: titles.complete("m", None, 0, 10),
+        "search.prefix_2_words_100k": lambda: titles.complete("ab c", None, 0, 10),
+        "search.prefix_user_100": lambda: titles.complete("ab", "user-7", 0, 10),
+    }
+
+def calibrate(timer: timeit.Timer, min_time: float) -> int:
+    """Nombre de boucles pour qu'un échantillon dure au moins `min_time`"""
+    loops = 1
+    while True:
+        if timer.timeit(loops) >= min_time:
+            return loops
+        loops *= 2
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    timer = timeit.Timer(fn)
+    loops = calibrate(timer, min_time)
+    # Échauffement : caches, imports paresseux
+    timer.timeit(loops)
+    samples = [timer.timeit(loops) / loops * 1e6 for _ in range(repeat)]
+    median = statistics.median(samples)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": round(median, 3),
+        "min_us": round(min(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if repeat > 1 else 0.0,
+        "ops_per_s": round(1e6 / median, 1) if median else 0.0
+    }
+
+def main(args: argparse.Namespace) -> int:
+    benchmarks = build_benchmarks()
+    selected = [name for name in benchmarks if not args.filter or any(f in name for f in args.filter)]
+    if not selected:
+        print("Aucun benchmark ne correspond au filtre")
+        return 2
+
+    results = {
+        "meta": run_metadata(repeat=args.repeat, min_time=args.min_time),
+        "benchmarks": {}
+    }
+    for name in selected:
+        result = measure(benchmarks[name], args.repeat, args.min_time)
+        results["benchmarks"][name] = result
+        print(
+            f"{name:<28} {result['median_us']:>10} µs  "
+            f"(min {result['min_us']}, écart-type {result['stdev_us']}, {result['loops']} boucles)"
+        )
+
+    write_results(results, args.output, "micro")
+
+    if args.compare:
+        if compare(results, args.compare, "benchmarks", (("median_us", False),), args.tolerance):
+            return 1
+    return 0
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmarks du backend VISUAL")
+    parser.add_argument("--filter", action="append", help="ne garder que les benchmarks contenant ce texte")
+    parser.add_argument("--repeat", type=int, default=15, help="échantillons par benchmark")
+    parser.add_argument("--min-time", type=float, default=0.1, help="durée minimale d'un échantillon (s)")
+    parser.add_argument("--output", help="fichier JSON de résultats")
+    parser.add_argument("--compare", help="résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="ralentissement toléré en %% avant de signaler une régression")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Budget de démarrage d'un worker du backend VISUAL
+
+Chaque mesure est faite dans un processus neuf, comme au redémarrage d'un
+worker uvicorn :
+- temps d'import de `server` (`python -X importtime`), avec le détail des
+  imports directs les plus coûteux ;
+- démarrage à froid : import, lifespan (connexion, préchauffage du pool,
+  index), puis première réponse de /api/health/ready.
+
+Les modules lourds ou optionnels (HEAVY_MODULES) ne doivent pas être chargés
+à l'import : ils le sont au premier usage. Le script échoue (code 1) si un
+budget est dépassé ou si l'un d'eux est importé au démarrage.
+
+Exemples :
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 5 --import-budget-ms 800 --ready-budget-ms 1500
+    python benchmarks/startup.py --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from common import ROOT, compare, run_metadata, write_results
+
+BACKEND_DIR = ROOT / "backend"
+
+# Chargés uniquement au premier usage (analytics, SDK, exports)
+HEAVY_MODULES = ["numpy", "pandas", "boto3", "botocore", "googleapiclient"]
+
+def importtime(env: Dict[str, str]) -> Dict:
+    """Un import de `server` sous -X importtime, dans un processus neuf"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    direct: Dict[str, int] = {}
+    children: Dict[str, int] = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        loaded.add(module.split(".")[0])
+        # Les imports d'un module sont listés avant lui
+        if depth == 1:
+            children[module] = int(cumulative)
+        elif depth == 0:
+            if module == "server":
+                total_us, direct = int(cumulative), children
+            children = {}
+    return {"total_us": total_us, "direct": direct, "loaded": loaded}
+
+def child(mongo_url: Optional[str]) -> Dict:
+    """Processus fils : import, lifespan et première requête (sortie JSON)"""
+    start = time.perf_counter()
+    import server
+    import httpx
+    imported = time.perf_counter()
+
+    if not mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+        server.use_database(AsyncMongoMockClient())
+
+    async def serve_first_request():
+        async with server.app.router.lifespan_context(server.app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+                response = await client.get("/api/health/ready")
+            return ready, time.perf_counter(), response.status_code
+
+    ready, first_response, status_code = asyncio.run(serve_first_request())
+    return {
+        "import_ms": (imported - start) * 1000,
+        "lifespan_ms": (ready - imported) * 1000,
+        "first_response_ms": (first_response - ready) * 1000,
+        "status": status_code
+    }
+
+def cold_start(env: Dict[str, str], mongo_url: Optional[str]) -> Dict:
+    command = [sys.executable, os.path.abspath(__file__), "--child"]
+    if mongo_url:
+        command += ["--mongo-url", mongo_url]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    total_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        sys.exit(f"Échec du démarrage :\n{result.stderr[-2000:]}")
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    if phases.pop("status") != 200:
+        sys.exit("Le worker démarré ne se déclare pas prêt (/api/health/ready)")
+    # Inclut le démarrage de l'interpréteur et l'arrêt du worker
+    phases["process_ms"] = total_ms
+    return phases
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1)
+    }
+
+def main(args: argparse.Namespace) -> int:
+    env = dict(os.environ)
+    if args.mongo_url:
+        env["MONGO_URL"] = args.mongo_url
+
+    imports = [importtime(env) for _ in range(args.runs)]
+    starts = [cold_start(env, args.mongo_url) for _ in range(args.runs)]
+
+    phases = {"server_import": summarize([i["total_us"] / 1000 for i in imports])}
+    for phase in ("import_ms", "lifespan_ms", "first_response_ms", "process_ms"):
+        phases[phase.replace("_ms", "")] = summarize([s[phase] for s in starts])
+    startup_to_response = [s["import_ms"] + s["lifespan_ms"] + s["first_response_ms"] for s in starts]
+    phases["startup_to_first_response"] = summarize(startup_to_response)
+
+    direct = {
+        module: round(statistics.median(i["direct"].get(module, 0) for i in imports) / 1000, 1)
+        for module in imports[0]["direct"]
+    }
+    heaviest = sorted(direct.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    eager_heavy = sorted(set(HEAVY_MODULES) & set.union(*(i["loaded"] for i in imports)))
+
+    print(f"Imports directs les plus coûteux de server (médiane sur {args.runs} processus) :")
+    for module, ms in heaviest:
+        print(f"  {module:<32} {ms:>8} ms")
+    print()
+    for name, summary in phases.items():
+        print(f"{name:<28} {summary['median_ms']:>8} ms  (min {summary['min_ms']}, max {summary['max_ms']})")
+
+    results = {
+        "meta": run_metadata(runs=args.runs, backend="mongodb" if args.mongo_url else "mongomock"),
+        "phases": phases,
+        "heaviest_imports": dict(heaviest),
+        "eager_heavy_modules": eager_heavy
+    }
+    write_results(results, args.output, "startup")
+
+    failures = []
+    if eager_heavy:
+        failures.append(f"modules lourds importés au démarrage : {', '.join(eager_heavy)}")
+    if phases["server_import"]["median_ms"] > args.import_budget_ms:
+        failures.append(f"import de server > {args.import_budget_ms} ms")
+    if phases["startup_to_first_response"]["median_ms"] > args.ready_budget_ms:
+        failures.append(f"démarrage jusqu'à la première réponse > {args.ready_budget_ms} ms")
+    if args.compare:
+        regressions = compare(results, args.compare, "phases", (("median_ms", False),), args.tolerance)
+        failures += [f"régression : {name}" for name in regressions]
+
+    for failure in failures:
+        print(f"ÉCHEC : {failure}")
+    return 1 if failures else 0
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Budget de démarrage d'un worker du backend VISUAL")
+    parser.add_argument("--mongo-url", help="mongod à utiliser (base simulée en mémoire par défaut)")
+    parser.add_argument("--runs", type=int, default=3, help="processus mesurés")
+    parser.add_argument("--top", type=int, default=15, help="imports directs détaillés")
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--ready-budget-ms", type=float, default=3000.0,
+                        help="budget du démarrage jusqu'à la première réponse")
+    parser.add_argument("--output", help="fichier JSON de résultats")
+    parser.add_argument("--compare", help="résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=20.0,
+                        help="ralentissement toléré en %% avant de signaler une régression")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.child:
+        print(json.dumps(child(arguments.mongo_url)))
+    else:
+        sys.exit(main(arguments))
@@ -0,0 +1,57 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Les settings sont lus à l'import des modules du backend
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "visual_test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-not-for-production")
+# Tous les clients de test ont la même IP : pas de limitation du tracking
+os.environ.setdefault("TRACK_RATE_LIMIT_EVENTS", "0")
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+PASSWORD = "motdepasse"
+
+@pytest.fixture(params=["mongo", "memory"])
+def client(request, monkeypatch):
+    """Client de l'API sur MongoDB simulé (mongomock) puis sur le stockage en mémoire"""
+    import server
+    from cache import MemoryBackend, cache
+    from config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", request.param)
+    # Cache du processus de test : rien ne passe d'un test à l'autre
+    monkeypatch.setattr(cache, "backend", MemoryBackend())
+    for name in ("client", "db", "storage"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    server.use_database(AsyncMongoMockClient())
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+def register(client: TestClient, email: str, full_name: str = "Porteur de test") -> dict:
+    """Crée un compte et retourne ses en-têtes d'authentification"""
+    response = client.post("/api/auth/register", json={"email": email, "password": PASSWORD, "full_name": full_name})
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def register_admin(client: TestClient, email: str = "admin@example.com") -> dict:
+    """Compte administrateur inséré directement dans le stockage du serveur"""
+    import server
+    from auth import create_access_token, get_password_hash
+    from models import User
+
+    user = User(email=email, full_name="Admin", hashed_password=get_password_hash(PASSWORD), is_admin=True)
+    user_dict = user.model_dump()
+    user_dict["created_at"] = user_dict["created_at"].isoformat()
+    client.portal.call(server.storage.users.insert, user_dict)
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.id})}"}
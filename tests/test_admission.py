@@ -0,0 +1,84 @@
+"""Admission par classe de routes et délestage (admission)"""
+
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from admission import AdmissionController, AdmissionMiddleware, Lane, classify
+
+def test_classify_routes():
+    assert classify("POST", "/api/social/track") == "track"
+    assert classify("POST", "/api/auth/login") == "auth"
+    assert classify("GET", "/api/admin/cache/stats") == "admin"
+    assert classify("GET", "/api/projects") == "api"
+    assert classify("GET", "/api/social/stats/p1/stream") is None
+    assert classify("GET", "/api/health") is None
+    assert classify("GET", "/metrics") is None
+
+def test_queue_timeout_sheds_with_retry_after():
+    release = asyncio.Event()
+
+    async def endpoint(request):
+        if request.query_params.get("bloque"):
+            await release.wait()
+        return PlainTextResponse("ok")
+
+    controller = AdmissionController([Lane("api", 1, limit=1, target_ms=20)], global_limit=10, max_queue=10, retry_after=7)
+    app = AdmissionMiddleware(Starlette(routes=[Route("/api/projects", endpoint)]), controller)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/projects", params={"bloque": "1"}))
+            await asyncio.sleep(0.01)
+            shed = await client.get("/api/projects")
+            release.set()
+            return await slow, shed, await client.get("/api/projects")
+
+    slow, shed, after = asyncio.run(scenario())
+    assert slow.status_code == 200
+    assert shed.status_code == 503 and shed.headers["Retry-After"] == "7"
+    assert after.status_code == 200
+    lane = controller.lanes["api"]
+    assert lane.shed == {"queue_timeout": 1}
+    assert (controller.active, lane.active, len(lane.waiters)) == (0, 0, 0)
+
+def test_freed_slots_go_to_the_highest_priority_lane():
+    async def scenario():
+        admin, track = Lane("admin", 0, limit=5, target_ms=1000), Lane("track", 3, limit=5, target_ms=1000)
+        controller = AdmissionController([admin, track], global_limit=1, max_queue=10, retry_after=1)
+        assert await controller.acquire(track)
+        order = []
+
+        async def request(lane):
+            assert await controller.acquire(lane)
+            order.append(lane.name)
+            controller.release(lane)
+
+        waiting = [asyncio.create_task(request(track)), asyncio.create_task(request(admin))]
+        await asyncio.sleep(0.01)
+        controller.release(track)
+        await asyncio.gather(*waiting)
+        return order, controller
+
+    order, controller = asyncio.run(scenario())
+    assert order == ["admin", "track"]
+    assert controller.active == 0
+
+def test_full_queue_is_shed_immediately():
+    async def scenario():
+        lane = Lane("api", 1, limit=1, target_ms=1000)
+        controller = AdmissionController([lane], global_limit=10, max_queue=1, retry_after=1)
+        assert await controller.acquire(lane)
+        queued = asyncio.create_task(controller.acquire(lane))
+        await asyncio.sleep(0)
+        rejected = await controller.acquire(lane)
+        controller.release(lane)
+        return rejected, await queued, lane
+
+    rejected, queued, lane = asyncio.run(scenario())
+    assert rejected is False and queued is True
+    assert lane.shed == {"queue_full": 1}
@@ -0,0 +1,258 @@
+"""Routes principales de l'API, sur chacun des deux stockages (fixture `client`)"""
+
+import json
+
+from .conftest import register, register_admin
+
+PLATFORMS = ["youtube", "tiktok", "facebook"]
+
+def create_project(client, headers, title="Festival d'été", **extra):
+    response = client.post("/api/projects", json={"title": title, "description": "Court métrage", **extra}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def authorize(client, headers, project_id, platforms=PLATFORMS):
+    response = client.post("/api/social/authorize", json={"project_id": project_id, "platforms": platforms}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def track(client, project_id, platform="youtube", event_type="view"):
+    return client.post("/api/social/track", json={"project_id": project_id, "platform": platform, "event_type": event_type})
+
+def test_register_login_and_me(client):
+    headers = register(client, "alice@example.com", "Alice")
+    me = client.get("/api/auth/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["email"] == "alice@example.com"
+
+    duplicate = client.post("/api/auth/register", json={"email": "alice@example.com", "password": "x", "full_name": "A"})
+    assert duplicate.status_code == 400
+    wrong = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "faux"})
+    assert wrong.status_code == 401
+
+def test_projects_are_private_and_versioned(client):
+    alice = register(client, "alice@example.com")
+    bob = register(client, "bob@example.com")
+    project = create_project(client, alice)
+
+    listing = client.get("/api/projects", headers=alice)
+    assert [p["id"] for p in listing.json()] == [project["id"]]
+    assert client.get("/api/projects", headers={**alice, "If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+    assert client.get(f"/api/projects/{project['id']}", headers=alice).status_code == 200
+    assert client.get(f"/api/projects/{project['id']}", headers=bob).status_code == 404
+    assert client.get("/api/projects", headers=bob).json() == []
+
+def test_project_etag_never_hides_a_missing_project(client):
+    import server
+    from conditional import make_etag
+
+    alice = register(client, "alice@example.com")
+    project = create_project(client, alice)
+    first = client.get(f"/api/projects/{project['id']}", headers=alice)
+    assert client.get(f"/api/projects/{project['id']}", headers={**alice, "If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    me = client.portal.call(server.storage.users.get_by_email, "alice@example.com")
+    forged = make_etag("project", me["id"], "inconnu", me["projects_version"])
+    assert client.get("/api/projects/inconnu", headers={**alice, "If-None-Match": forged}).status_code == 404
+
+def test_create_project_is_idempotent(client):
+    headers = register(client, "alice@example.com")
+    keyed = {**headers, "Idempotency-Key": "creation-1"}
+    first = client.post("/api/projects", json={"title": "Un", "description": "d"}, headers=keyed)
+    replay = client.post("/api/projects", json={"title": "Un", "description": "d"}, headers=keyed)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == first.json()["id"]
+    assert len(client.get("/api/projects", headers=headers).json()) == 1
+
+    reused = client.post("/api/projects", json={"title": "Deux", "description": "d"}, headers=keyed)
+    assert reused.status_code == 422
+
+def test_bulk_import_reports_each_item(client):
+    headers = register(client, "alice@example.com")
+    body = "\n".join([
+        json.dumps({"title": "Premier", "description": "a"}),
+        "{pas du json",
+        json.dumps({"title": "Sans description"}),
+        json.dumps({"title": "Dernier", "description": "b"}),
+    ])
+    response = client.post("/api/projects/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["status"] for line in lines[:-1]] == ["created", "error", "error", "created"]
+    assert lines[-1]["summary"] == {"received": 4, "created": 2, "failed": 2, "aborted": None}
+    assert len(client.get("/api/projects", headers=headers).json()) == 2
+
+def test_search_by_prefix(client):
+    alice = register(client, "alice@example.com")
+    bob = register(client, "bob@example.com")
+    create_project(client, alice, "Été à Paris")
+    create_project(client, alice, "Hiver à Lyon")
+    create_project(client, bob, "Été à Nice")
+
+    response = client.get("/api/projects/search", params={"q": "ete par", "prefix": True}, headers=alice)
+    assert response.status_code == 200
+    assert [r["title"] for r in response.json()["results"]] == ["Été à Paris"]
+
+def test_authorize_track_and_stats(client):
+    alice = register(client, "alice@example.com")
+    bob = register(client, "bob@example.com")
+    project = create_project(client, alice)
+
+    # Sans autorisation, le tracking est refusé avant tout accès à la base
+    assert track(client, project["id"]).status_code == 404
+
+    result = authorize(client, alice, project["id"])
+    assert set(result["links"]) == set(PLATFORMS)
+    for event_type in ("view", "view", "click"):
+        assert track(client, project["id"], "youtube", event_type).status_code == 200
+
+    stats = client.get(f"/api/social/stats/{project['id']}", headers=alice)
+    assert stats.status_code == 200
+    youtube = next(s for s in stats.json()["by_platform"] if s["platform"] == "youtube")
+    assert (youtube["views"], youtube["clicks"]) == (2, 1)
+
+    etag = stats.headers["ETag"]
+    assert client.get(f"/api/social/stats/{project['id']}", headers={**alice, "If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/social/stats/{project['id']}", headers={**bob, "If-None-Match": etag}).status_code == 404
+
+def test_batch_share_links(client):
+    alice = register(client, "alice@example.com")
+    bob = register(client, "bob@example.com")
+    authorized = create_project(client, alice, "Autorisé")
+    pending = create_project(client, alice, "Sans autorisation")
+    foreign = create_project(client, bob, "Chez Bob")
+    authorize(client, alice, authorized["id"], ["youtube"])
+
+    ids = [authorized["id"], pending["id"], foreign["id"], authorized["id"]]
+    response = client.post("/api/social/links/batch", json={"project_ids": ids}, headers=alice)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["project_id"] for r in results] == ids[:3]
+    assert set(results[0]["links"]) == {"youtube"}
+    assert results[1]["error"] == "Aucune autorisation active pour ce projet"
+    assert results[2]["error"] == "Projet non trouvé"
+
+    def batch(size):
+        return client.post("/api/social/links/batch", json={"project_ids": [f"p{n}" for n in range(size)]}, headers=alice)
+
+    assert batch(0).status_code == 422
+    assert batch(1).status_code == 200
+    assert len(batch(500).json()["results"]) == 500
+    assert batch(501).status_code == 422
+
+def test_track_sees_authorizations_from_other_workers(client):
+    import server
+    from authorization_index import authorization_index
+    from models import SocialAuthorization
+
+    alice = register(client, "alice@example.com")
+    project = create_project(client, alice)
+    assert track(client, project["id"], "tiktok").status_code == 404
+
+    # Autorisation écrite par un autre worker : pas de relais Redis, l'index l'ignore
+    authorization = SocialAuthorization(user_id="autre", project_id=project["id"], platforms=["tiktok"])
+    auth_dict = authorization.model_dump(mode="json")
+    client.portal.call(server.storage.authorizations.insert, auth_dict)
+
+    lookups = authorization_index.fallback_lookups
+    assert track(client, project["id"], "tiktok").status_code == 200
+    assert track(client, project["id"], "tiktok").status_code == 200
+    assert authorization_index.fallback_lookups == lookups + 1
+    assert track(client, project["id"], "youtube").status_code == 404
+
+def test_live_leaderboard_follows_tracking(client):
+    alice = register(client, "alice@example.com", "Alice")
+    bob = register(client, "bob@example.com", "Bob")
+    carol = register(client, "carol@example.com", "Carol")
+    for headers, views in ((alice, 1), (bob, 3), (carol, 2)):
+        project = create_project(client, headers)
+        authorize(client, headers, project["id"])
+        for _ in range(views):
+            track(client, project["id"], "tiktok")
+
+    first = client.get("/api/leaderboard", params={"limit": 2})
+    assert first.status_code == 200
+    assert [(e["full_name"], e["rank"], e["total_views"]) for e in first.json()] == [("Bob", 1, 3), ("Carol", 2, 2)]
+    assert first.json()[0]["reward"] == 500
+
+    rest = client.get("/api/leaderboard", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    assert [(e["full_name"], e["rank"]) for e in rest.json()] == [("Alice", 3)]
+    assert "X-Next-Cursor" not in rest.headers
+
+    me = client.get("/api/leaderboard/me", headers=alice)
+    assert (me.json()["rank"], me.json()["total_views"]) == (3, 1)
+
+def test_close_period_snapshots_and_rewards_once(client):
+    import analytics
+    import leaderboard
+    import server
+
+    admin = register_admin(client)
+    alice = register(client, "alice@example.com", "Alice")
+    bob = register(client, "bob@example.com", "Bob")
+    # Le mois précédent est clôturé par la tâche de fond dès le démarrage
+    period = analytics.periods_ending(leaderboard.current_period(), 3)[0]
+    buckets = []
+    for headers, views in ((alice, 4), (bob, 9)):
+        project = create_project(client, headers)
+        buckets.append({"period": period, "project_id": project["id"], "platform": "youtube", "views": views, "clicks": 1})
+    client.portal.call(server.storage.leaderboard.insert_buckets, buckets)
+
+    assert client.get("/api/leaderboard", params={"period": period}).status_code == 404
+    assert client.post("/api/admin/leaderboard/close", params={"period": period}, headers=alice).status_code == 403
+
+    closed = client.post("/api/admin/leaderboard/close", params={"period": period}, headers=admin)
+    assert closed.json() == {"period": period, "status": "closed", "entries": 2, "rewarded": 2}
+    again = client.post("/api/admin/leaderboard/close", params={"period": period}, headers=admin)
+    assert again.json()["already_processed"] is True
+
+    snapshot = client.get("/api/leaderboard", params={"period": period})
+    assert [(e["full_name"], e["rank"], e["reward"]) for e in snapshot.json()] == [("Bob", 1, 500), ("Alice", 2, 200)]
+    assert client.get("/api/leaderboard/me", params={"period": period}, headers=alice).json()["rank"] == 2
+    assert client.get("/api/auth/me", headers=bob).json()["visupoints"] == 500
+
+def test_rebuild_scores_from_monthly_buckets(client):
+    import leaderboard
+    import server
+
+    admin = register_admin(client)
+    alice = register(client, "alice@example.com", "Alice")
+    project = create_project(client, alice)
+    period = leaderboard.current_period()
+    client.portal.call(server.storage.leaderboard.insert_buckets, [
+        {"period": period, "project_id": project["id"], "platform": platform, "views": 5, "clicks": 2}
+        for platform in PLATFORMS
+    ])
+    assert client.get("/api/leaderboard").json() == []
+
+    rebuilt = client.post("/api/admin/leaderboard/rebuild", headers=admin)
+    assert rebuilt.json() == {"period": period, "users": 1}
+    entry = client.get("/api/leaderboard").json()[0]
+    assert (entry["full_name"], entry["total_views"], entry["total_clicks"]) == ("Alice", 15, 6)
+
+def test_analytics_reports(client):
+    alice = register(client, "alice@example.com")
+    project = create_project(client, alice)
+    authorize(client, alice, project["id"])
+    for platform, event_type in (("youtube", "view"), ("youtube", "view"), ("youtube", "click"), ("facebook", "view")):
+        track(client, project["id"], platform, event_type)
+
+    platforms = client.get("/api/analytics/platforms", headers=alice)
+    assert platforms.status_code == 200
+    assert (platforms.json()["total_views"], platforms.json()["total_clicks"]) == (3, 1)
+
+    trends = client.get("/api/analytics/trends", params={"months": 3}, headers=alice).json()
+    assert trends["series"]["all"]["views"] == [0, 0, 3]
+    assert trends["series"]["youtube"]["clicks"] == [0, 0, 1]
+
+    cohorts = client.get("/api/analytics/cohorts", headers=alice).json()
+    assert cohorts["cohorts"][0]["projects"] == 1
+
+    assert client.get("/api/analytics/trends", params={"months": 3, "scope": "platform"}, headers=alice).status_code == 403
+    admin = register_admin(client)
+    platform_wide = client.get("/api/analytics/trends", params={"months": 3, "scope": "platform"}, headers=admin)
+    assert platform_wide.json()["series"]["all"]["views"][-1] == 3
+    platform_cohorts = client.get("/api/analytics/cohorts", params={"scope": "platform"}, headers=admin).json()
+    assert platform_cohorts["cohorts"][0]["projects"] == 1
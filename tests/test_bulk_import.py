@@ -0,0 +1,47 @@
+"""Analyse du corps et réponse progressive de l'import en masse"""
+
+import asyncio
+import json
+
+import pytest
+
+from bulk_import import ImportAborted, NdjsonParser, ProjectImport, iter_items
+from repositories import MemoryStorage
+
+def parse(chunks, max_item_bytes=32):
+    parser = NdjsonParser(max_item_bytes)
+    items = []
+    try:
+        for chunk in chunks:
+            items.extend(parser.feed(chunk))
+        items.extend(parser.close())
+    except ImportAborted as e:
+        return items, str(e)
+    return items, None
+
+@pytest.mark.parametrize("chunks", [
+    ['{"a": 1}\n{"long": "' + "x" * 40 + '"}\n{"b": 2}\n'],
+    ['{"a": 1}\n{"long": "', "x" * 40, '"}\n{"b": 2}\n'],
+    ['{"a": 1}\n{"long": "' + "x" * 40 + '"}'],
+])
+def test_long_ndjson_line_aborts_whatever_the_chunking(chunks):
+    items, aborted = parse(chunks)
+    assert items == [({"a": 1}, None)]
+    assert aborted == "Ligne de plus de 32 octets"
+
+def test_progress_lines_while_the_body_is_read():
+    async def body():
+        for title in ("Un", "Deux"):
+            await asyncio.sleep(0.05)
+            yield (json.dumps({"title": title, "description": "d"}) + "\n").encode()
+
+    async def scenario():
+        job = ProjectImport(MemoryStorage(), "u1")
+        return [line async for line in job.stream(iter_items(body(), NdjsonParser(1024)), 0.01)]
+
+    lines = [json.loads(line) for line in b"".join(asyncio.run(scenario())).splitlines()]
+    progress = [line["progress"] for line in lines if "progress" in line]
+    assert progress and progress[0]["received"] == 0
+    results = [line for line in lines if "progress" not in line]
+    assert [r.get("status") for r in results[:-1]] == ["created", "created"]
+    assert results[-1]["summary"] == {"received": 2, "created": 2, "failed": 0, "aborted": None}
@@ -0,0 +1,78 @@
+"""Cache versionné par namespace (cache.Cache)"""
+
+import asyncio
+import logging
+
+from cache import Cache, MemoryBackend
+from structured_logging import HotPathFilter
+
+def test_invalidate_drops_every_key_of_the_namespace():
+    async def scenario():
+        cache = Cache(MemoryBackend())
+        await cache.set("share_links", "alice:p1", {"youtube": "a"})
+        await cache.set("share_links", "bob:p2", {"youtube": "b"})
+        await cache.set("stats", "alice:p1", {"views": 1})
+        assert await cache.get("share_links", "alice:p1") == {"youtube": "a"}
+
+        await cache.invalidate("share_links")
+        assert await cache.get("share_links", "alice:p1") is None
+        assert await cache.get("share_links", "bob:p2") is None
+        assert await cache.get("stats", "alice:p1") == {"views": 1}
+        assert (cache.stats["share_links"].hits, cache.stats["share_links"].misses) == (1, 2)
+
+    asyncio.run(scenario())
+
+def test_invalidation_during_load_is_not_masked():
+    async def scenario():
+        cache = Cache(MemoryBackend())
+        await cache.set("share_links", "alice:p1", {"youtube": "ancien"})
+        await cache.invalidate("share_links")
+
+        async def slow_loader():
+            # L'autorisation change pendant le chargement
+            await cache.invalidate("share_links")
+            return {"youtube": "ancien"}
+
+        assert await cache.get_or_set("share_links", "alice:p1", slow_loader) == {"youtube": "ancien"}
+        # Valeur étiquetée avec la version lue avant le chargement : obsolète
+        assert await cache.get("share_links", "alice:p1") is None
+
+        async def loader():
+            return {"youtube": "nouveau"}
+
+        assert await cache.get_or_set("share_links", "alice:p1", loader) == {"youtube": "nouveau"}
+        assert await cache.get("share_links", "alice:p1") == {"youtube": "nouveau"}
+
+    asyncio.run(scenario())
+
+class BrokenBackend(MemoryBackend):
+    async def mget(self, keys):
+        raise ConnectionError("redis indisponible")
+
+    async def set(self, key, value, ttl=None, nx=False):
+        raise ConnectionError("redis indisponible")
+
+def test_backend_errors_are_counted_and_rate_limited(caplog):
+    async def scenario():
+        cache = Cache(BrokenBackend())
+
+        async def loader():
+            return {"views": 1}
+
+        for _ in range(20):
+            assert await cache.get_or_set("stats", "alice:p1", loader) == {"views": 1}
+        await cache.invalidate("stats")
+        return cache
+
+    logger = logging.getLogger("cache")
+    hot_path = HotPathFilter({}, {"cache": 1})
+    logger.addFilter(hot_path)
+    try:
+        with caplog.at_level(logging.WARNING, logger="cache"):
+            cache = asyncio.run(scenario())
+    finally:
+        logger.removeFilter(hot_path)
+
+    assert cache.stats["stats"].errors == 41
+    # Un message par gabarit (get, set, invalidate) malgré 41 erreurs
+    assert len(caplog.records) == 3
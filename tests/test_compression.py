@@ -0,0 +1,53 @@
+"""Négociation de l'encodage et cache des réponses précompressées (compression)"""
+
+import gzip
+
+from compression import ResponseCompressor, negotiate
+
+from .conftest import register
+
+def test_negotiate_follows_q_values_then_server_preference():
+    assert negotiate("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert negotiate("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("gzip;q=0, *;q=0.1", ["br", "gzip"]) == "br"
+    assert negotiate("identity", ["br", "gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+    assert negotiate("br;q=abc, gzip;q=0.2", ["br", "gzip"]) == "gzip"
+
+def test_cache_is_keyed_by_etag_and_checks_the_body():
+    compressor = ResponseCompressor(minimum_size=0, gzip_level=6, brotli_quality=4, cache_max_bytes=1 << 20)
+    body = b'{"entries": []}' * 100
+    first = compressor.compress_cached("/api/leaderboard", '"v1"', body, "gzip")
+    assert compressor.compress_cached("/api/leaderboard", '"v1"', body, "gzip") is first
+    assert compressor.stats["gzip"].cache_hits == 1
+
+    # Même ETag mais corps différent : l'entrée n'est pas resservie
+    other = b'{"entries": [1]}' * 100
+    assert gzip.decompress(compressor.compress_cached("/api/leaderboard", '"v1"', other, "gzip")) == other
+    assert compressor.stats["gzip"].cache_hits == 1
+
+def test_compressed_listing_keeps_conditional_requests(client):
+    import server
+
+    headers = register(client, "alice@example.com")
+    for n in range(20):
+        client.post("/api/projects", json={"title": f"Projet {n}", "description": "Court métrage " * 5}, headers=headers)
+
+    gzip_headers = {**headers, "Accept-Encoding": "gzip"}
+    hits = server.compressor.stats["gzip"].cache_hits
+    first = client.get("/api/projects", headers=gzip_headers)
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in first.headers["Vary"]
+    assert first.headers["ETag"].startswith("W/")
+    assert len(first.json()) == 20
+
+    again = client.get("/api/projects", headers=gzip_headers)
+    assert again.content == first.content
+    assert server.compressor.stats["gzip"].cache_hits == hits + 1
+
+    not_modified = client.get("/api/projects", headers={**gzip_headers, "If-None-Match": first.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert "Content-Encoding" not in not_modified.headers
+
+    plain = client.get("/api/projects", headers={**headers, "Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
@@ -0,0 +1,34 @@
+"""Réservations d'Idempotency-Key, sur chacun des deux repositories"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from repositories import MemoryIdempotencyRepository, MongoIdempotencyRepository
+
+@pytest.fixture(params=["mongo", "memory"])
+def repository(request):
+    if request.param == "mongo":
+        return MongoIdempotencyRepository(AsyncMongoMockClient()["visual_test"])
+    return MemoryIdempotencyRepository()
+
+def test_late_leader_cannot_touch_a_reclaimed_key(repository):
+    async def scenario():
+        await repository.ensure_indexes()
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        assert await repository.claim("u1", "cle", "empreinte", "jeton-a", expired) is None
+        # La réservation de A a expiré : B reprend la clé
+        assert await repository.claim("u1", "cle", "empreinte", "jeton-b", datetime.utcnow() + timedelta(seconds=30)) is None
+
+        await repository.complete("u1", "cle", "jeton-a", {"body": "réponse de A"})
+        await repository.release("u1", "cle", "jeton-a")
+        record = await repository.get("u1", "cle")
+        assert (record["status"], record["token"]) == ("pending", "jeton-b")
+
+        await repository.complete("u1", "cle", "jeton-b", {"body": "réponse de B", "expires_at": datetime.utcnow() + timedelta(hours=1)})
+        record = await repository.get("u1", "cle")
+        assert (record["status"], record["body"]) == ("completed", "réponse de B")
+
+    asyncio.run(scenario())
@@ -0,0 +1,29 @@
+"""Store de scores en mémoire : index trié du classement"""
+
+import asyncio
+import random
+
+from repositories import MemoryLeaderboardRepository, MemoryProjectRepository, MemoryUserRepository, _score_key
+
+def test_memory_score_index_matches_a_full_sort():
+    repository = MemoryLeaderboardRepository(MemoryProjectRepository(), MemoryUserRepository())
+
+    async def scenario():
+        rng = random.Random(7)
+        for _ in range(2000):
+            await repository.increment_score("2026-01", f"u{rng.randint(0, 80):02d}", rng.choice(["views", "views", "clicks"]))
+        expected = sorted(repository._scores["2026-01"].values(), key=_score_key)
+
+        pages, after = [], None
+        while True:
+            page = await repository.score_page("2026-01", after, 25)
+            if not page:
+                break
+            pages += page
+            after = (page[-1]["total_views"], page[-1]["total_clicks"], page[-1]["user_id"])
+        assert [s["user_id"] for s in pages] == [s["user_id"] for s in expected]
+
+        for rank, score in enumerate(expected):
+            assert await repository.count_better("2026-01", score) == rank
+
+    asyncio.run(scenario())
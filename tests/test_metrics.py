@@ -0,0 +1,24 @@
+"""Label `status` des métriques HTTP (InstrumentedRoute)"""
+
+from prometheus_client import REGISTRY
+
+from .conftest import register
+
+def observed(method, route, status):
+    value = REGISTRY.get_sample_value(
+        "visual_http_request_duration_seconds_count",
+        {"method": method, "route": route, "status": status},
+    )
+    return value or 0
+
+def test_status_label_follows_handled_errors(client):
+    headers = register(client, "alice@example.com")
+
+    before = observed("GET", "/api/projects/{project_id}", "404")
+    assert client.get("/api/projects/inconnu", headers=headers).status_code == 404
+    assert observed("GET", "/api/projects/{project_id}", "404") == before + 1
+
+    before = observed("POST", "/api/projects", "422")
+    assert client.post("/api/projects", json={"description": "sans titre"}, headers=headers).status_code == 422
+    assert observed("POST", "/api/projects", "422") == before + 1
+    assert observed("POST", "/api/projects", "500") == 0
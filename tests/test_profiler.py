@@ -0,0 +1,52 @@
+"""Profileur statistique à la demande (profiler)"""
+
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from profiler import ProfilerTriggerMiddleware, SamplingProfiler
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def test_duration_mode_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    status = profiler.start(seconds=5)
+    assert status["running"] and status["mode"] == "duration" and status["token"] is None
+    with pytest.raises(RuntimeError):
+        profiler.start(seconds=5)
+
+    busy_wait(0.1)
+    output = profiler.stop()
+    assert not profiler.running and profiler.mode is None
+    lines = open(output).read().splitlines()
+    assert profiler.samples > 0
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.samples
+    assert any("busy_wait (test_profiler.py:" in line for line in lines)
+
+def test_header_mode_samples_only_marked_requests(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    seen = []
+
+    async def endpoint(request):
+        seen.append(profiler.active_requests)
+        return PlainTextResponse("ok")
+
+    app = ProfilerTriggerMiddleware(Starlette(routes=[Route("/", endpoint)]), profiler)
+    with TestClient(app) as client:
+        client.get("/", headers={"X-Profile": "quelconque"})
+        token = profiler.start(seconds=5, mode="header")["token"]
+        assert not profiler.should_sample()
+        client.get("/")
+        client.get("/", headers={"X-Profile": "mauvais"})
+        client.get("/", headers={"X-Profile": token})
+        profiler.stop()
+
+    assert seen == [0, 0, 0, 1]
+    assert profiler.active_requests == 0 and profiler.token is None
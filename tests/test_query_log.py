@@ -0,0 +1,38 @@
+"""Journal des requêtes lentes (query_log)"""
+
+from types import SimpleNamespace
+
+from query_log import SlowQueryLog, plan_stages, query_shape, winning_plan
+
+def test_shape_keeps_structure_and_hides_values():
+    query = {"user_id": "u1", "revoked": False, "project_id": {"$in": ["p1", "p2", "p3"]}, "$or": [{"views": {"$gt": 3}}, {"clicks": 1}]}
+    assert query_shape(query) == {
+        "user_id": "str", "revoked": "bool",
+        "project_id": {"$in": ["str"]}, "$or": [{"views": {"$gt": "int"}}],
+    }
+    assert query_shape({"id": {"$in": []}}) == {"id": {"$in": []}}
+
+def test_plan_stages_from_find_and_aggregate_explains():
+    find = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    assert plan_stages(winning_plan(find)) == ["FETCH", "IXSCAN"]
+    aggregate = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}, {"$group": {}}]}
+    assert plan_stages(winning_plan(aggregate)) == ["COLLSCAN"]
+
+def command_events(connection, request_id, name, command, duration_ms):
+    started = SimpleNamespace(connection_id=connection, request_id=request_id, command_name=name, command=command, database_name="visual")
+    succeeded = SimpleNamespace(connection_id=connection, request_id=request_id, command_name=name, duration_micros=duration_ms * 1000)
+    return started, succeeded
+
+def test_slow_commands_are_grouped_by_shape():
+    log = SlowQueryLog(threshold_ms=50, capacity=10, explain_sample_rate=0)
+    for request_id, (user_id, duration) in enumerate((("u1", 80), ("u2", 120), ("u3", 10))):
+        started, succeeded = command_events(1, request_id, "find", {"find": "projects", "filter": {"user_id": user_id}}, duration)
+        log.started(started)
+        log.succeeded(succeeded)
+
+    report = log.report()
+    assert [entry["duration_ms"] for entry in report["recent"]] == [80, 120]
+    assert len(report["shapes"]) == 1
+    shape = report["shapes"][0]
+    assert (shape["collection"], shape["shape"], shape["count"], shape["max_ms"]) == ("projects", {"filter": {"user_id": "str"}}, 2, 120)
+    assert not log._pending
@@ -0,0 +1,65 @@
+"""Limitation du tracking par fenêtre glissante (rate_limit)"""
+
+import asyncio
+
+import fakeredis
+import pytest
+
+from rate_limit import RedisSlidingWindowLimiter, SlidingWindowLimiter, TrackRateLimiter
+
+def test_window_boundaries_are_exact():
+    limiter = SlidingWindowLimiter(limit=3, window=10, max_keys=100)
+    assert [limiter.hit("ip:p1", now)[0] for now in (0, 1, 2)] == [True, True, True]
+
+    allowed, retry_after = limiter.hit("ip:p1", 9.5)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    # Le plus ancien événement (t=0) sort de la fenêtre à t=10 exactement
+    assert limiter.hit("ip:p1", 10) == (True, 0.0)
+    assert not limiter.hit("ip:p1", 10.5)[0]
+    assert limiter.hit("ip:p1", 11) == (True, 0.0)
+    # Un refus n'occupe pas de place dans la fenêtre
+    assert limiter.hit("ip:p1", 12) == (True, 0.0)
+    assert limiter.hit("ip:p2", 12) == (True, 0.0)
+
+def test_inactive_keys_are_evicted_first():
+    limiter = SlidingWindowLimiter(limit=1, window=10, max_keys=2)
+    limiter.hit("a", 0)
+    limiter.hit("b", 0)
+    limiter.hit("a", 1)
+    limiter.hit("c", 2)
+    assert len(limiter) == 2 and limiter.evicted == 1
+    # "a", récemment vue, est toujours limitée ; "b" évincée repart de zéro
+    assert not limiter.hit("a", 3)[0]
+    assert limiter.hit("b", 3)[0]
+
+def test_shared_window_weights_the_previous_one():
+    async def scenario():
+        limiter = RedisSlidingWindowLimiter(fakeredis.FakeAsyncRedis(), limit=4, window=10)
+        previous = [(await limiter.hit("ip:p1", 5 + n))[0] for n in range(4)]
+        # À t=12.5, 75 % de la fenêtre précédente (4 événements) compte encore : 3 + 1
+        at_boundary = await limiter.hit("ip:p1", 12.5)
+        refused = await limiter.hit("ip:p1", 12.5)
+        return previous, at_boundary, refused
+
+    previous, at_boundary, refused = asyncio.run(scenario())
+    assert previous == [True] * 4
+    assert at_boundary == (True, 0.0)
+    assert refused == (False, pytest.approx(7.5))
+
+class BrokenRedis:
+    def pipeline(self, transaction=False):
+        raise ConnectionError("redis indisponible")
+
+def test_track_limiter_falls_back_to_the_local_window():
+    async def scenario():
+        limiter = TrackRateLimiter(limit=2, window=60, max_keys=100)
+        limiter.use_redis(BrokenRedis())
+        return [(await limiter.hit("10.0.0.1", "p1"))[0] for _ in range(3)], limiter
+
+    results, limiter = asyncio.run(scenario())
+    assert results == [True, True, False]
+    assert (limiter.allowed, limiter.rejected, limiter.shared_errors) == (2, 1, 3)
+
+def test_disabled_limiter_accepts_everything():
+    limiter = TrackRateLimiter(limit=0, window=60, max_keys=100)
+    assert asyncio.run(limiter.hit(None, "p1")) == (True, 0.0)
@@ -0,0 +1,81 @@
+"""Coalescence des lectures concurrentes (singleflight.SingleFlight)"""
+
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"views": 3}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do(("stats", "p1"), load) for _ in range(5)))
+        other = await flight.do(("stats", "p2"), load)
+        return flight, results, other
+
+    flight, results, other = asyncio.run(scenario())
+    assert results == [{"views": 3}] * 5 and other == {"views": 3}
+    assert len(calls) == 2
+    assert (flight.stats["stats"].leaders, flight.stats["stats"].coalesced) == (2, 4)
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("base indisponible")
+
+    async def scenario():
+        flight = SingleFlight(ttl=60)
+        results = await asyncio.gather(*(flight.do(("stats", "p1"), failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do(("stats", "p1"), failing)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 2
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def load():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do(("leaderboard", "p"), load))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do(("leaderboard", "p"), load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, flight
+
+    result, flight = asyncio.run(scenario())
+    assert result == "ok"
+    assert flight.stats["leaderboard"].coalesced == 1
+    assert not flight._inflight
+
+def test_ttl_serves_recent_results():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        flight = SingleFlight(ttl=60)
+        return [await flight.do(("leaderboard", "p"), load) for _ in range(3)], flight
+
+    results, flight = asyncio.run(scenario())
+    assert results == [1, 1, 1]
+    assert flight.stats["leaderboard"].recent_hits == 2
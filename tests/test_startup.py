@@ -0,0 +1,18 @@
+"""Budget d'import de `server`, mesuré comme benchmarks/startup.py"""
+
+import os
+import statistics
+
+import startup
+
+RUNS = 3
+
+def test_server_import_is_lazy_and_within_budget():
+    imports = [startup.importtime(dict(os.environ)) for _ in range(RUNS)]
+
+    eager_heavy = set(startup.HEAVY_MODULES) & set.union(*(i["loaded"] for i in imports))
+    assert not eager_heavy, f"modules lourds importés au démarrage : {sorted(eager_heavy)}"
+
+    budget_ms = startup.parse_args([]).import_budget_ms
+    median_ms = statistics.median(i["total_us"] for i in imports) / 1000
+    assert median_ms <= budget_ms, f"import de server : {median_ms:.0f} ms > {budget_ms:.0f} ms"
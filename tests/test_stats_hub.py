@@ -0,0 +1,49 @@
+"""Diffusion SSE des stats en direct (stats_hub)"""
+
+import asyncio
+
+from stats_hub import StatsHub, Subscription
+
+def test_full_queue_drops_the_oldest_frames():
+    async def scenario():
+        subscription = Subscription("p1", maxsize=3)
+        for n in range(5):
+            subscription.push(f"trame {n}".encode())
+        frames = [await subscription.next(timeout=0.01) for _ in range(4)]
+        return subscription, frames
+
+    subscription, frames = asyncio.run(scenario())
+    assert frames == [b"trame 2", b"trame 3", b"trame 4", None]
+    assert subscription.dropped == 2
+
+def test_next_wakes_up_on_push():
+    async def scenario():
+        subscription = Subscription("p1", maxsize=3)
+        waiter = asyncio.create_task(subscription.next(timeout=1))
+        await asyncio.sleep(0)
+        subscription.push(b"trame")
+        return await waiter
+
+    assert asyncio.run(scenario()) == b"trame"
+
+def test_flush_loads_each_dirty_project_once():
+    loads = []
+
+    async def loader(project_id):
+        loads.append(project_id)
+        return {"project_id": project_id, "views": len(loads)}
+
+    async def scenario():
+        hub = StatsHub(queue_size=4)
+        first, second = hub.subscribe("p1"), hub.subscribe("p1")
+        for _ in range(10):
+            hub.publish("p1")
+        hub.publish("sans-abonne")
+        await hub._flush(loader)
+        hub.unsubscribe(second)
+        return hub, first, second
+
+    hub, first, second = asyncio.run(scenario())
+    assert loads == ["p1"]
+    assert list(first.frames) == list(second.frames) == [StatsHub.encode({"project_id": "p1", "views": 1})]
+    assert hub.report() == {"projects": 1, "subscribers": 1, "frames_sent": 2, "dropped": 0}
@@ -0,0 +1,46 @@
+"""Index créés au démarrage et clés uniques des collections de base"""
+
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from repositories import MemoryStorage, MongoStorage
+
+def index_keys(information) -> dict:
+    return {tuple(index["key"]): index.get("unique", False) for index in information.values()}
+
+def test_hot_path_lookups_are_indexed():
+    db = AsyncMongoMockClient()["visual_test"]
+
+    async def scenario():
+        await MongoStorage(db).ensure_indexes()
+        return {
+            name: index_keys(await db[name].index_information())
+            for name in ("users", "projects", "social_authorizations", "social_stats")
+        }
+
+    indexes = asyncio.run(scenario())
+    assert indexes["users"][(("id", 1),)] is True
+    assert indexes["users"][(("email", 1),)] is True
+    assert indexes["projects"][(("id", 1),)] is True
+    assert (("user_id", 1),) in indexes["projects"]
+    assert (("user_id", 1), ("project_id", 1)) in indexes["social_authorizations"]
+    assert (("project_id", 1), ("revoked", 1)) in indexes["social_authorizations"]
+    assert indexes["social_stats"][(("project_id", 1), ("platform", 1))] is True
+
+@pytest.mark.parametrize("backend", ["mongo", "memory"])
+def test_duplicate_keys_are_refused(backend):
+    storage = MongoStorage(AsyncMongoMockClient()["visual_test"]) if backend == "mongo" else MemoryStorage()
+    user = {"id": "u1", "email": "alice@example.com", "full_name": "Alice"}
+    stats = {"id": "s1", "project_id": "p1", "platform": "youtube", "views": 1, "clicks": 0, "last_updated_at": "2026-01-01T00:00:00"}
+
+    async def scenario():
+        await storage.ensure_indexes()
+        assert await storage.users.insert(user) is True
+        assert await storage.users.insert({**user, "id": "u2"}) is False
+        assert await storage.stats.insert(stats) is True
+        assert await storage.stats.insert({**stats, "id": "s2"}) is False
+        assert [s["id"] for s in await storage.stats.list_by_project("p1")] == ["s1"]
+
+    asyncio.run(scenario())
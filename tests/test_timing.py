@@ -0,0 +1,41 @@
+"""En-têtes Server-Timing et arbre de debug (ServerTimingMiddleware)"""
+
+import json
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import timing
+
+async def endpoint(request):
+    with timing.span("db.projects"):
+        pass
+    with timing.span("db.projects"):
+        pass
+    return PlainTextResponse("ok")
+
+def make_client(**options):
+    app = Starlette(routes=[Route("/", endpoint)])
+    return TestClient(timing.ServerTimingMiddleware(app, **options))
+
+def test_server_timing_sums_spans_by_name():
+    response = make_client(enabled=True).get("/")
+    header = response.headers["Server-Timing"]
+    assert 'db.projects;dur=' in header and 'desc="x2"' in header
+    assert header.rsplit(", ", 1)[-1].startswith("total;dur=")
+
+def test_disabled_middleware_adds_nothing():
+    response = make_client(enabled=False).get("/", headers={"X-Debug-Timing": "1"})
+    assert "Server-Timing" not in response.headers
+    assert "X-Timing-Tree" not in response.headers
+
+def test_debug_tree_requires_server_setting():
+    ignored = make_client(enabled=True).get("/", headers={"X-Debug-Timing": "1"})
+    assert "X-Timing-Tree" not in ignored.headers
+
+    response = make_client(enabled=True, debug_enabled=True).get("/", headers={"X-Debug-Timing": "1"})
+    tree = json.loads(response.headers["X-Timing-Tree"])
+    assert tree["name"] == "request"
+    assert [child["name"] for child in tree["children"]] == ["db.projects", "db.projects"]